@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for subtitle normalization over large synthetic transcripts.
+Compares the shared single-pass normalizer against the old per-line regex parsers.
+
+Usage: python bench_subtitle_normalizer.py [--hours 2] [--repeat 5]
+"""
+import sys
+import os
+import re
+import json
+import argparse
+import timeit
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator.subtitle_normalizer import normalize_subtitles, clean_subtitle_text
+
+
+WORDS = ("so today we are going to look at how python functions work and why "
+         "closures capture variables from the enclosing scope").split()
+
+
+def _clock(ms: int) -> str:
+    hours, rest = divmod(ms, 3600000)
+    minutes, rest = divmod(rest, 60000)
+    seconds, millis = divmod(rest, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{millis:03d}"
+
+
+def _sentence(i: int) -> str:
+    return ' '.join(WORDS[(i + j) % len(WORDS)] for j in range(9))
+
+
+def build_samples(hours: float) -> dict:
+    """Generate one transcript per format with a cue every 2 seconds."""
+    cue_count = int(hours * 3600 / 2)
+    vtt = ["WEBVTT\nKind: captions\nLanguage: en\n"]
+    srv3 = ['<?xml version="1.0" encoding="utf-8" ?><timedtext format="3"><body>']
+    ttml = ['<?xml version="1.0" encoding="utf-8" ?><tt xmlns="http://www.w3.org/ns/ttml"><body><div>']
+    events = []
+    for i in range(cue_count):
+        start, end = i * 2000, i * 2000 + 2000
+        text = _sentence(i)
+        # Auto-captions repeat the previous line in styled form
+        vtt.append(f"{_clock(start)} --> {_clock(end)} align:start position:0%\n"
+                   f"{_sentence(i - 1)}\n<c>{text}</c><00:00:01.000>\n")
+        srv3.append(f'<p t="{start}" d="2000">{text.replace(" ", " <s>", 3)}</p>')
+        ttml.append(f'<p begin="{_clock(start)}" end="{_clock(end)}">{text}<br/>{text}</p>')
+        events.append({'tStartMs': start, 'dDurationMs': 2000, 'segs': [{'utf8': word + ' '} for word in text.split()]})
+    srv3.append('</body></timedtext>')
+    ttml.append('</div></body></tt>')
+    return {
+        'vtt': '\n'.join(vtt),
+        'srv3': ''.join(srv3),
+        'ttml': ''.join(ttml),
+        'json3': json.dumps({'events': events}),
+    }
+
+
+# --- Previous implementations, kept here only as the benchmark baseline ---
+
+def legacy_parse_vtt(vtt_content: str) -> str:
+    lines = vtt_content.split('\n')
+    subtitle_text = []
+    for line in lines:
+        line = line.strip()
+        if (line and
+            not line.startswith('WEBVTT') and
+            not line.startswith('NOTE') and
+            not '-->' in line and
+            not line.isdigit()):
+            import re as inner_re
+            clean_line = inner_re.sub(r'<[^>]+>', '', line)
+            if clean_line:
+                subtitle_text.append(clean_line)
+    return ' '.join(subtitle_text)[:5000]
+
+
+def legacy_parse_json3(json_content: str) -> str:
+    data = json.loads(json_content)
+    subtitle_text = []
+    if 'events' in data:
+        for event in data['events']:
+            if 'segs' in event:
+                for seg in event['segs']:
+                    if 'utf8' in seg:
+                        subtitle_text.append(seg['utf8'])
+    return ' '.join(subtitle_text)[:5000]
+
+
+def legacy_clean(raw_content: str) -> str:
+    content = re.sub(r'\d{2}:\d{2}:\d{2}[.,]\d{3}\s*-->\s*\d{2}:\d{2}:\d{2}[.,]\d{3}', '', raw_content)
+    content = re.sub(r'\d+\s*\n', '', content)
+    content = re.sub(r'<[^>]+>', '', content)
+    content = re.sub(r'\n+', ' ', content)
+    content = re.sub(r'\s+', ' ', content)
+    return content.strip()[:5000]
+
+
+LEGACY = {
+    'vtt': legacy_parse_vtt,
+    'srv3': legacy_clean,
+    'ttml': legacy_clean,
+    'json3': legacy_parse_json3,
+}
+
+
+def _best_ms(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1000
+
+
+def run_benchmarks(hours: float, repeat: int) -> None:
+    samples = build_samples(hours)
+
+    print(f"📊 Subtitle normalization benchmarks ({hours}h transcripts, best of {repeat})")
+    print("=" * 95)
+    print(f"{'format':<8}{'size':>10}{'legacy ms':>12}{'capped ms':>12}{'speedup':>10}"
+          f"{'capped+cues ms':>17}{'full+cues ms':>15}")
+    print("-" * 95)
+
+    for ext, content in samples.items():
+        legacy_ms = _best_ms(lambda: LEGACY[ext](content), repeat)
+        capped_ms = _best_ms(lambda: normalize_subtitles(content, ext), repeat)
+        cues_ms = _best_ms(lambda: normalize_subtitles(content, ext, cues_out=[]), repeat)
+        full_ms = _best_ms(lambda: normalize_subtitles(content, ext, max_chars=None, cues_out=[]), repeat)
+        size_kb = f"{len(content) // 1024} KB"
+        print(f"{ext:<8}{size_kb:>10}{legacy_ms:>12.2f}{capped_ms:>12.2f}"
+              f"{legacy_ms / capped_ms:>9.1f}x{cues_ms:>17.2f}{full_ms:>15.2f}")
+
+    raw = samples['vtt']
+    legacy_ms = _best_ms(lambda: legacy_clean(raw), repeat)
+    single_ms = _best_ms(lambda: clean_subtitle_text(raw), repeat)
+    print(f"{'clean':<8}{str(len(raw) // 1024) + ' KB':>10}{legacy_ms:>12.2f}{single_ms:>12.2f}"
+          f"{legacy_ms / single_ms:>9.1f}x{'-':>17}{'-':>15}")
+    print("=" * 95)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark subtitle normalization")
+    parser.add_argument('--hours', type=float, default=2.0, help="Transcript length in hours")
+    parser.add_argument('--repeat', type=int, default=5, help="Repetitions per measurement")
+    args = parser.parse_args()
+    run_benchmarks(args.hours, args.repeat)
@@ -6,7 +6,7 @@ Takes subject and difficulty level, returns complete course path.
 import os
 import sys
 from typing import Dict, Any, Optional
-from fastapi import FastAPI, HTTPException, BackgroundTasks, status
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -15,23 +15,156 @@ from dotenv import load_dotenv
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'course_path_generator'))
 
 # Import our course creation function
-from src.course_path_generator.main_course_creator import create_complete_course
+from src.course_path_generator.main_course_creator import create_complete_course, create_course_outline, fill_course_outline
 from src.db.mongo_client import get_database
+from src.db.generation_jobs import get_job_store
+from src.course_path_generator.deadline import make_deadline
+from src.course_path_generator.bulkheads import run_in_bulkhead, get_bulkhead_stats, BulkheadFull
+from src.course_path_generator.pipeline import get_pipeline_stats
+from src.course_path_generator.heuristic_ranker import get_heuristic_stats
+from src.course_path_generator.gemini_router import get_gemini_router_stats
+from src.course_path_generator.search_race import get_race_stats
+from src.course_path_generator.json_repair import get_repair_stats
+from src.course_path_generator.fan_out import get_fan_out_stats
+from src.course_path_generator.ytdlp_rate_controller import get_ytdlp_controller
+from src.course_path_generator.video_search_backends import get_backend_selector
+from functools import partial
 import time
 import uuid
+import threading
 from datetime import datetime
 
 # Collections names (constants)
 COURSE_COLLECTION = "content_coursePath"
 TOPIC_COLLECTION = "content_topic"
+# Lazy topic resolution: topics resolved ahead of the one opened, how long a claim
+# is honoured, and how long a request waits for a topic someone else is resolving
+TOPIC_LOOKAHEAD = int(os.getenv("TOPIC_LOOKAHEAD", "3"))
+TOPIC_CLAIM_TTL_SEC = int(os.getenv("TOPIC_CLAIM_TTL_SEC", "120"))
+TOPIC_RESOLVE_WAIT_SEC = float(os.getenv("TOPIC_RESOLVE_WAIT_SEC", "60"))
+# Store background-generated courses topic by topic instead of all at the end
+PERSIST_INCREMENTALLY = os.getenv("PERSIST_INCREMENTALLY", "true").lower() in ("1", "true", "yes")
 # Best-guess defaults for user and progress collections; adjust via env if needed
 USER_COLLECTION = os.getenv("USER_COLLECTION", "user")
 PROGRESS_COLLECTION = os.getenv("PROGRESS_COLLECTION", "content_userCourseProgress")
 
+def _in_mongo_bulkhead(write, *args, **kwargs):
+    """Run a Mongo write on the mongo bulkhead, so slow searches or Gemini calls cannot starve persistence.
+
+    Raises BulkheadFull when the bulkhead has no slot in time; callers decide whether that fails their job.
+    """
+    return run_in_bulkhead("mongo", write, *args, **kwargs)
+
+def _topic_document(t: dict, course_id: str) -> dict:
+    """Topic entity as stored in TOPIC_COLLECTION."""
+    video_info = t.get("videoInfo", {})
+    topic_doc = {
+        "_id": t.get("id") or f"topic-{uuid.uuid4()}",
+        "name": t.get("name"),
+        "description": t.get("description"),
+        "videoInfo": {
+            "youtubeUrl": video_info.get("youtubeUrl"),
+            "title": video_info.get("title"),
+            "startTime": video_info.get("startTime"),
+            "endTime": video_info.get("endTime"),
+        },
+        "prerequisites": t.get("prerequisites", []),
+        "estimatedTimeMin": None,
+        "tags": t.get("tags", [])
+    }
+    if "videoStatus" in t:
+        # Outline topics: the video is selected later, in the background or on first access
+        topic_doc["videoStatus"] = t["videoStatus"]
+        topic_doc["coursePathId"] = course_id
+    return topic_doc
+
+def _find_user(db, email: Optional[str]):
+    """(user id, display name) for the creator's email, (None, None) when unknown."""
+    if not email:
+        return None, None
+    try:
+        user_doc = db[USER_COLLECTION].find_one({"email": email})
+        if user_doc:
+            return user_doc.get("_id") or user_doc.get("id"), user_doc.get("name") or user_doc.get("fullName") or email
+    except Exception as ue:
+        print(f"⚠️ User lookup failed for {email}: {ue}")
+    return None, None
+
+def _course_document(course_id: str, course_meta: dict, subject: str, difficulty: str,
+                     user_id, user_display: Optional[str], topic_ids: list) -> dict:
+    """Course entity matching the Spring Boot CoursePathEntity shape."""
+    return {
+        "_id": course_id,
+        "creatorId": user_id,
+        "title": course_meta.get("title", f"{subject} Learning Path"),
+        "description": course_meta.get("description"),
+        "targetLevel": course_meta.get("targetLevel", difficulty),
+        "createdAt": int(time.time() * 1000),
+        "createdBy": user_display or "analyzer-service",
+        "topics": topic_ids,
+        "reviews": [],
+        "averageRating": None,
+    }
+
+def _link_user(db, user_id, course_id: str, topic_ids: list):
+    """Add back-references from the creator to the course and seed their progress."""
+    try:
+        # Add course to user's createdCoursePaths without duplicates
+        db[USER_COLLECTION].update_one(
+            {"_id": user_id},
+            {"$addToSet": {"createdCoursePaths": course_id}}
+        )
+    except Exception as ue:
+        print(f"⚠️ Failed to update user's createdCoursePaths for {user_id}: {ue}")
+
+    # Enroll user into the newly created course
+    try:
+        db[USER_COLLECTION].update_one(
+            {"_id": user_id},
+            {"$addToSet": {"enrolledCoursePaths": course_id}}
+        )
+        print(f"📝 Enrolled user {user_id} into course {course_id}")
+    except Exception as ue_enroll:
+        print(f"⚠️ Failed to enroll user {user_id} into course {course_id}: {ue_enroll}")
+
+    try:
+        now_ms = int(time.time() * 1000)
+        progress_entries = [
+            {
+                "topicId": tid,
+                "isCovered": False,
+                "lastUpdated": now_ms
+            }
+            for tid in topic_ids
+        ]
+        progress_doc = {
+            "_id": f"progress-{uuid.uuid4()}",
+            "startedAt": now_ms,
+            "readiness": 0,
+            "progress": progress_entries
+        }
+        # One progress per user and course, so a replayed finish() reuses it
+        progress_key = {"userId": user_id, "coursePathId": course_id}
+        db[PROGRESS_COLLECTION].update_one(progress_key, {"$setOnInsert": progress_doc}, upsert=True)
+        progress_id = (db[PROGRESS_COLLECTION].find_one(progress_key) or progress_doc)["_id"]
+        print(f"🧭 Progress {progress_id} for user {user_id} on course {course_id}")
+
+        # Add progress reference to user's progress list
+        try:
+            db[USER_COLLECTION].update_one(
+                {"_id": user_id},
+                {"$addToSet": {"courseProgressList": progress_id}}
+            )
+        except Exception as ue2:
+            print(f"⚠️ Failed to update user's courseProgressList for {user_id}: {ue2}")
+    except Exception as pe:
+        print(f"⚠️ Failed to create progress for user {user_id}: {pe}")
+
 def _persist_course_path(generation_result: dict, subject: str, difficulty: str, request_id: str, email: Optional[str] = None):
     """Transform and store the generated course path & topics into MongoDB.
 
     Mirrors the Spring Boot entity structure provided by user without changing generation logic.
+    Raises when the course could not be stored.
     """
     try:
         db = get_database()
@@ -39,130 +172,269 @@ def _persist_course_path(generation_result: dict, subject: str, difficulty: str,
         course_meta = data.get("coursePath", {})
         topics = data.get("topics", [])
 
-        # Insert topics first and collect their IDs
-        topic_ids = []
-        topic_documents = []
-        for t in topics:
-            topic_id = t.get("id") or f"topic-{uuid.uuid4()}"
-            video_info = t.get("videoInfo", {})
-            topic_doc = {
-                "_id": topic_id,
-                "name": t.get("name"),
-                "description": t.get("description"),
-                "videoInfo": {
-                    "youtubeUrl": video_info.get("youtubeUrl"),
-                    "title": video_info.get("title"),
-                    "startTime": video_info.get("startTime"),
-                    "endTime": video_info.get("endTime"),
-                },
-                "prerequisites": t.get("prerequisites", []),
-                "estimatedTimeMin": None,
-                "tags": t.get("tags", [])
-            }
-            topic_documents.append(topic_doc)
-            topic_ids.append(topic_id)
+        course_id = course_meta.get("id") or f"course-{uuid.uuid4()}"
 
+        # Insert topics first and collect their IDs
+        topic_documents = [_topic_document(t, course_id) for t in topics]
+        topic_ids = [topic_doc["_id"] for topic_doc in topic_documents]
         if topic_documents:
             db[TOPIC_COLLECTION].insert_many(topic_documents)
 
         # Optional: find user by email to link creator and seed progress
-        user_doc = None
-        user_id = None
-        user_display = None
-        if email:
-            try:
-                user_doc = db[USER_COLLECTION].find_one({"email": email})
-                if user_doc:
-                    user_id = user_doc.get("_id") or user_doc.get("id")
-                    user_display = user_doc.get("name") or user_doc.get("fullName") or email
-            except Exception as ue:
-                print(f"⚠️ User lookup failed for {email}: {ue}")
-
-        # Build course document matching Spring Boot CoursePathEntity shape
-        course_id = course_meta.get("id") or f"course-{uuid.uuid4()}"
-        course_doc = {
-            "_id": course_id,
-            "creatorId": user_id,
-            "title": course_meta.get("title", f"{subject} Learning Path"),
-            "description": course_meta.get("description"),
-            "targetLevel": course_meta.get("targetLevel", difficulty),
-            "createdAt": int(time.time() * 1000),
-            "createdBy": user_display or "analyzer-service",
-            "topics": topic_ids,
-            "reviews": [],
-            "averageRating": None,
-        }
+        user_id, user_display = _find_user(db, email)
+
+        course_doc = _course_document(course_id, course_meta, subject, difficulty, user_id, user_display, topic_ids)
+        if any("videoStatus" in t for t in topics):
+            # Needed to resolve outline topics later
+            course_doc["subject"] = subject
+        if course_meta.get("degradation"):
+            course_doc["degradation"] = course_meta["degradation"]
         db[COURSE_COLLECTION].insert_one(course_doc)
         print(f"📦 Stored course {course_id} with {len(topic_ids)} topics in MongoDB")
 
         # If we have a user, add back-references and create progress document
         if user_id:
-            try:
-                # Add course to user's createdCoursePaths without duplicates
-                db[USER_COLLECTION].update_one(
-                    {"_id": user_id},
-                    {"$addToSet": {"createdCoursePaths": course_id}}
-                )
-            except Exception as ue:
-                print(f"⚠️ Failed to update user's createdCoursePaths for {user_id}: {ue}")
-
-            # Enroll user into the newly created course
-            try:
-                db[USER_COLLECTION].update_one(
-                    {"_id": user_id},
-                    {"$addToSet": {"enrolledCoursePaths": course_id}}
-                )
-                print(f"📝 Enrolled user {user_id} into course {course_id}")
-            except Exception as ue_enroll:
-                print(f"⚠️ Failed to enroll user {user_id} into course {course_id}: {ue_enroll}")
-
-            try:
-                now_ms = int(time.time() * 1000)
-                progress_id = f"progress-{uuid.uuid4()}"
-                progress_entries = [
-                    {
-                        "topicId": tid,
-                        "isCovered": False,
-                        "lastUpdated": now_ms
-                    }
-                    for tid in topic_ids
-                ]
-                progress_doc = {
-                    "_id": progress_id,
-                    "userId": user_id,
-                    "coursePathId": course_id,
-                    "startedAt": now_ms,
-                    "readiness": 0,
-                    "progress": progress_entries
-                }
-                db[PROGRESS_COLLECTION].insert_one(progress_doc)
-                print(f"🧭 Created progress {progress_id} for user {user_id} on course {course_id}")
-
-                # Add progress reference to user's progress list
-                try:
-                    db[USER_COLLECTION].update_one(
-                        {"_id": user_id},
-                        {"$addToSet": {"courseProgressList": progress_id}}
-                    )
-                except Exception as ue2:
-                    print(f"⚠️ Failed to update user's courseProgressList for {user_id}: {ue2}")
-            except Exception as pe:
-                print(f"⚠️ Failed to create progress for user {user_id}: {pe}")
+            _link_user(db, user_id, course_id, topic_ids)
     except Exception as e:
         print(f"❌ Persistence error: {e}")
+        raise
+
+class IncrementalCoursePersister:
+    """Stores a course while it is generated, so partial courses are readable.
+
+    The course document is created up front with status 'generating', each
+    topic is upserted and appended to it as soon as it is analyzed, and the
+    course is marked 'complete' (or 'failed') at the end. Every write is
+    idempotent, so a resumed job can replay checkpointed topics safely.
+    Failed writes are logged and raised.
+    """
+
+    def __init__(self, course_id: str, subject: str, difficulty: str, email: Optional[str] = None):
+        self.course_id = course_id
+        self.subject = subject
+        self.difficulty = difficulty
+        self.email = email
+
+    def start(self):
+        try:
+            db = get_database()
+            user_id, user_display = _find_user(db, self.email)
+            course_doc = _course_document(self.course_id, {
+                "description": f"A step-by-step learning path for mastering {self.subject} at {self.difficulty} level.",
+            }, self.subject, self.difficulty, user_id, user_display, [])
+            course_doc.pop("_id")
+            # Needed to resolve topics left as outline topics by the deadline
+            course_doc["subject"] = self.subject
+            db[COURSE_COLLECTION].update_one(
+                {"_id": self.course_id},
+                {"$setOnInsert": course_doc, "$set": {"status": "generating"}},
+                upsert=True
+            )
+            print(f"📦 Created course {self.course_id} in generating state")
+        except Exception as e:
+            print(f"❌ Persistence error for course {self.course_id}: {e}")
+            raise
+
+    def add_topic(self, topic: dict):
+        """Upsert one analyzed topic and append it to the course, once."""
+        try:
+            db = get_database()
+            topic_doc = _topic_document(topic, self.course_id)
+            topic_id = topic_doc.pop("_id")
+            db[TOPIC_COLLECTION].update_one({"_id": topic_id}, {"$set": topic_doc}, upsert=True)
+            db[COURSE_COLLECTION].update_one(
+                {"_id": self.course_id, "topics": {"$ne": topic_id}},
+                {"$push": {"topics": topic_id}}
+            )
+            print(f"📦 Stored topic {topic_id} for course {self.course_id}")
+        except Exception as e:
+            print(f"❌ Persistence error for topic {topic.get('id')}: {e}")
+            raise
+
+    def finish(self, status: str = "complete", degradation: Optional[dict] = None, topic_ids: Optional[list] = None):
+        """Mark the course 'complete' or 'failed', linking it to its creator once complete.
+
+        topic_ids, when given, is the final course order (retried topics were appended late).
+        Safe to replay: the creator links use $addToSet and their progress is upserted.
+        """
+        try:
+            db = get_database()
+            fields = {"status": status}
+            if degradation:
+                fields["degradation"] = degradation
+            if topic_ids is not None:
+                fields["topics"] = topic_ids
+            db[COURSE_COLLECTION].update_one({"_id": self.course_id}, {"$set": fields})
+            course_doc = db[COURSE_COLLECTION].find_one({"_id": self.course_id}) or {}
+            print(f"📦 Course {self.course_id} {status} with {len(course_doc.get('topics', []))} topics")
+            if status == "complete" and course_doc.get("creatorId"):
+                _link_user(db, course_doc["creatorId"], self.course_id, course_doc.get("topics", []))
+        except Exception as e:
+            print(f"❌ Persistence error for course {self.course_id}: {e}")
+            raise
+
+def _background_generate_and_store(subject: str, difficulty: str, request_id: str, email: Optional[str] = None,
+                                   latency_critical: bool = False, time_budget_sec: Optional[float] = None):
+    """Background task wrapper that generates and persists the course path.
 
-def _background_generate_and_store(subject: str, difficulty: str, request_id: str, email: Optional[str] = None):
-    """Background task wrapper that generates and persists the course path."""
+    Progress is checkpointed under the request id, so a job interrupted by a
+    restart resumes where it stopped (see _resume_orphaned_jobs). With
+    PERSIST_INCREMENTALLY the course is stored topic by topic under a course id
+    kept in the job, otherwise all at once when generation is done. Generation
+    degrades as the time budget runs out (see deadline.py).
+    """
     print(f"🛠️ Background generation started for request {request_id}")
+    job_store = get_job_store()
+    # The lease keeps the job's heartbeat fresh however long a topic takes
+    with job_store.lease(request_id):
+        _generate_and_store(job_store, subject, difficulty, request_id, email, latency_critical, time_budget_sec)
+    print(f"✅ Background generation finished for request {request_id}")
+
+def _generate_and_store(job_store, subject: str, difficulty: str, request_id: str, email: Optional[str],
+                        latency_critical: bool, time_budget_sec: Optional[float]):
+    checkpoint = job_store.start_job(request_id, {
+        "subject": subject, "difficulty": difficulty, "email": email, "latencyCritical": latency_critical,
+        "courseId": f"course-{uuid.uuid4()}", "timeBudgetSec": time_budget_sec,
+    })
+    deadline = make_deadline(time_budget_sec)
+    persister = None
+    unsaved = []
+    if PERSIST_INCREMENTALLY:
+        # A resumed job keeps the course id from its first run
+        persister = IncrementalCoursePersister(checkpoint.params["courseId"], subject, difficulty, email)
+
+    def store_topic(topic: dict):
+        # A topic that could not be stored is retried once generation is done
+        try:
+            _in_mongo_bulkhead(persister.add_topic, topic)
+        except Exception:
+            unsaved.append(topic)
+
     try:
-        result = create_complete_course(subject=subject, difficulty_level=difficulty)
+        if persister:
+            _in_mongo_bulkhead(persister.start)
+        result = create_complete_course(subject=subject, difficulty_level=difficulty, latency_critical=latency_critical,
+                                        checkpoint=checkpoint,
+                                        course_id=persister.course_id if persister else None,
+                                        on_topic_done=store_topic if persister else None,
+                                        deadline=deadline)
         if result.get("success"):
-            _persist_course_path(result, subject, difficulty, request_id, email=email)
+            if persister:
+                # Raises if a topic still cannot be stored, failing the job instead of completing it short
+                for topic in unsaved:
+                    _in_mongo_bulkhead(persister.add_topic, topic)
+                _in_mongo_bulkhead(persister.finish, "complete", result["data"]["coursePath"].get("degradation"),
+                                   [topic["id"] for topic in result["data"]["topics"]])
+            else:
+                _in_mongo_bulkhead(_persist_course_path, result, subject, difficulty, request_id, email=email)
+            job_store.finish_job(request_id, "completed")
         else:
             print(f"⚠️ Generation failed for {request_id}: {result.get('error')}")
+            _mark_course_failed(persister)
+            job_store.finish_job(request_id, "failed", result.get("error"))
     except Exception as e:
         print(f"💥 Unhandled error during background generation {request_id}: {e}")
-    print(f"✅ Background generation finished for request {request_id}")
+        _mark_course_failed(persister)
+        job_store.finish_job(request_id, "failed", str(e))
+
+def _mark_course_failed(persister: Optional[IncrementalCoursePersister]):
+    if persister is None:
+        return
+    try:
+        _in_mongo_bulkhead(persister.finish, "failed")
+    except Exception:
+        pass  # Already logged; the job itself is still marked failed
+
+def _resume_orphaned_jobs():
+    """Resume generation jobs whose worker died, checking again every stale period.
+
+    Jobs are claimed one at a time, right before they run, so no claimed job
+    waits without a heartbeat for another replica to take over.
+    """
+    while True:
+        job = get_job_store().claim_orphaned_job()
+        if job is None:
+            time.sleep(max(30, get_job_store().stale_seconds // 2))
+            continue
+        params = job.get("params", {})
+        print(f"♻️ Resuming generation job {job['_id']} ({len(job.get('checkpoints') or {})} topics checkpointed)")
+        _background_generate_and_store(params.get("subject"), params.get("difficulty"), job["_id"],
+                                       params.get("email"), params.get("latencyCritical", False),
+                                       params.get("timeBudgetSec"))
+
+def _update_outline_topic(topic: dict):
+    """Store the video selected for an outline topic."""
+    try:
+        video_info = topic.get("videoInfo", {})
+        get_database()[TOPIC_COLLECTION].update_one(
+            {"_id": topic["id"]},
+            {"$set": {
+                "description": topic.get("description"),
+                "videoInfo": {
+                    "youtubeUrl": video_info.get("youtubeUrl"),
+                    "title": video_info.get("title"),
+                    "startTime": video_info.get("startTime"),
+                    "endTime": video_info.get("endTime"),
+                },
+                "tags": topic.get("tags", []),
+                "videoStatus": topic.get("videoStatus"),
+            }}
+        )
+        print(f"📦 Stored {topic.get('videoStatus')} topic {topic['id']}")
+    except Exception as e:
+        print(f"❌ Persistence error for topic {topic.get('id')}: {e}")
+        raise
+
+def _claim_topic(topic: dict) -> bool:
+    """Atomically mark an unresolved topic as being resolved; False when someone else holds it.
+
+    Pending and failed topics can be claimed, as can a claim older than
+    TOPIC_CLAIM_TTL_SEC (its resolver presumably died).
+    """
+    now_ms = int(time.time() * 1000)
+    try:
+        claimed = get_database()[TOPIC_COLLECTION].find_one_and_update(
+            {"_id": topic["id"], "$or": [
+                {"videoStatus": {"$in": ["pending", "failed"]}},
+                {"videoStatus": "resolving", "claimedAt": {"$lt": now_ms - TOPIC_CLAIM_TTL_SEC * 1000}},
+            ]},
+            {"$set": {"videoStatus": "resolving", "claimedAt": now_ms}}
+        )
+        return claimed is not None
+    except Exception as e:
+        print(f"⚠️ Could not claim topic {topic.get('id')}: {e}")
+        return False
+
+def _release_topic(topic: dict):
+    """Mark a claimed topic 'failed' so the next access retries it instead of waiting out the claim."""
+    try:
+        # Straight to Mongo: the release must not queue behind the writes that just failed
+        get_database()[TOPIC_COLLECTION].update_one(
+            {"_id": topic["id"], "videoStatus": "resolving"},
+            {"$set": {"videoStatus": "failed"}}
+        )
+    except Exception as e:
+        print(f"⚠️ Could not release topic {topic.get('id')}: {e}")
+
+def _background_fill_outline(outline_topics: list, subject: str, difficulty: str, request_id: str,
+                             latency_critical: bool = False, time_budget_sec: Optional[float] = None,
+                             course_id: Optional[str] = None):
+    """Background task that selects videos for an outline's topics, storing each as it is done.
+
+    Topics still pending when the time budget runs out are resolved on first access.
+    """
+    print(f"🛠️ Background video selection started for outline {request_id}")
+    try:
+        deadline = make_deadline(time_budget_sec)
+        ready = fill_course_outline(outline_topics, subject, difficulty, partial(_in_mongo_bulkhead, _update_outline_topic),
+                                    latency_critical=latency_critical, claim=_claim_topic, deadline=deadline,
+                                    release=_release_topic)
+        print(f"✅ Filled {ready}/{len(outline_topics)} topics for outline {request_id}")
+        if deadline is not None and course_id:
+            get_database()[COURSE_COLLECTION].update_one({"_id": course_id},
+                                                         {"$set": {"degradation": deadline.summary()}})
+    except Exception as e:
+        print(f"💥 Unhandled error while filling outline {request_id}: {e}")
 
 # Load environment variables
 load_dotenv()
@@ -174,6 +446,12 @@ app = FastAPI(
     version="1.0.0"
 )
 
+@app.on_event("startup")
+def start_job_resumer():
+    """RESUME_GENERATION_JOBS: pick up jobs interrupted by a restart (default true)."""
+    if os.getenv("RESUME_GENERATION_JOBS", "true").lower() in ("1", "true", "yes"):
+        threading.Thread(target=_resume_orphaned_jobs, name="job-resumer", daemon=True).start()
+
 # Configure CORS
 cors_origins = os.getenv('CORS_ORIGINS', 'http://localhost:3000,http://localhost:8080').split(',')
 
@@ -190,6 +468,8 @@ class CourseRequest(BaseModel):
     subject: str
     difficulty: str
     email: str | None = None  # Optional user email to link creator and initialize progress
+    latencyCritical: bool = False  # Race YouTube Data API against yt-dlp for each search
+    timeBudgetSec: float | None = None  # Degrade quality rather than run longer (default GENERATION_TIME_BUDGET_SEC)
     
     class Config:
         json_schema_extra = {
@@ -200,6 +480,9 @@ class CourseRequest(BaseModel):
             }
         }
 
+class CourseOutlineRequest(CourseRequest):
+    fillInBackground: bool = True  # Select each topic's video in the background after responding
+
 # Response model for success
 class CourseResponse(BaseModel):
     success: bool
@@ -215,6 +498,8 @@ async def root():
         "status": "healthy",
         "endpoints": {
             "generate_course_path": "POST /api/v1/generate-course-path",
+            "course_outline": "POST /api/v1/course-outline",
+            "resolve_topic": "POST /api/v1/course-paths/{courseId}/topics/{topicId}/resolve",
             "health": "GET /api/v1/health",
             "docs": "GET /docs"
         }
@@ -229,6 +514,32 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/api/v1/metrics")
+async def metrics():
+    """Saturation of each bulkhead, time spent per pipeline stage, and the counters of
+    local ranking (including its shadow-mode agreement with Gemini), the Gemini
+    router, search races, JSON repair, fan-out, yt-dlp pacing and backend selection."""
+    return {
+        "bulkheads": get_bulkhead_stats(),
+        "pipeline": get_pipeline_stats(),
+        "heuristicRanking": get_heuristic_stats(),
+        "geminiRouter": get_gemini_router_stats(),
+        "searchRace": get_race_stats(),
+        "jsonRepair": get_repair_stats(),
+        "fanOut": get_fan_out_stats(),
+        "ytdlpRateController": get_ytdlp_controller().snapshot(),
+        "searchBackends": get_backend_selector().snapshot(),
+    }
+
+def _validate_course_request(request: CourseRequest):
+    valid_difficulties = ["beginner", "intermediate", "advanced"]
+    if request.difficulty.lower() not in valid_difficulties:
+        raise HTTPException(status_code=400, detail=f"Invalid difficulty level. Must be one of: {', '.join(valid_difficulties)}")
+    if not request.subject or not request.subject.strip():
+        raise HTTPException(status_code=400, detail="Subject cannot be empty")
+    if request.timeBudgetSec is not None and request.timeBudgetSec <= 0:
+        raise HTTPException(status_code=400, detail="timeBudgetSec must be positive")
+
 @app.post("/api/v1/generate-course-path", status_code=status.HTTP_202_ACCEPTED)
 async def create_course_endpoint(request: CourseRequest, background_tasks: BackgroundTasks):
     """Accept course generation request and process asynchronously.
@@ -237,11 +548,7 @@ async def create_course_endpoint(request: CourseRequest, background_tasks: Backg
     correlate stored course documents in MongoDB.
     """
     try:
-        valid_difficulties = ["beginner", "intermediate", "advanced"]
-        if request.difficulty.lower() not in valid_difficulties:
-            raise HTTPException(status_code=400, detail=f"Invalid difficulty level. Must be one of: {', '.join(valid_difficulties)}")
-        if not request.subject or not request.subject.strip():
-            raise HTTPException(status_code=400, detail="Subject cannot be empty")
+        _validate_course_request(request)
 
         request_id = str(uuid.uuid4())
         print(f"⚡ Accepted generation request {request_id} for '{request.subject}' ({request.difficulty})")
@@ -250,7 +557,9 @@ async def create_course_endpoint(request: CourseRequest, background_tasks: Backg
             request.subject.strip(),
             request.difficulty.lower(),
             request_id,
-            request.email
+            request.email,
+            request.latencyCritical,
+            request.timeBudgetSec
         )
 
         return {
@@ -268,6 +577,125 @@ async def create_course_endpoint(request: CourseRequest, background_tasks: Backg
         print(f"API Error (accept phase): {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/api/v1/course-outline", status_code=status.HTTP_201_CREATED)
+def create_course_outline_endpoint(request: CourseOutlineRequest, background_tasks: BackgroundTasks):
+    """Generate and store the topic outline synchronously (seconds, not minutes).
+
+    Topics are stored with videoStatus 'pending'; their videos are selected in a
+    background task and each topic is updated as soon as its video is chosen.
+    """
+    _validate_course_request(request)
+    subject = request.subject.strip()
+    difficulty = request.difficulty.lower()
+    request_id = str(uuid.uuid4())
+
+    try:
+        outline = create_course_outline(subject, difficulty)
+    except Exception as e:
+        print(f"API Error (outline phase): {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if not outline.get("success"):
+        raise HTTPException(status_code=502, detail=f"Outline generation failed: {outline.get('error')}")
+
+    try:
+        # The background fill and /resolve need the stored outline, so a failed write fails the request
+        _in_mongo_bulkhead(_persist_course_path, outline, subject, difficulty, request_id, email=request.email)
+    except BulkheadFull as e:
+        print(f"API Error (outline storage): {e}")
+        raise HTTPException(status_code=503, detail="Storage is busy, please retry")
+    except Exception as e:
+        print(f"API Error (outline storage): {e}")
+        raise HTTPException(status_code=500, detail="Could not store the course outline")
+    topics = outline["data"]["topics"]
+    if request.fillInBackground:
+        background_tasks.add_task(
+            _background_fill_outline,
+            topics,
+            subject,
+            difficulty,
+            request_id,
+            request.latencyCritical,
+            request.timeBudgetSec,
+            outline["data"]["coursePath"]["id"]
+        )
+
+    return {
+        "success": True,
+        "requestId": request_id,
+        "status": "outlined",
+        "courseId": outline["data"]["coursePath"]["id"],
+        "coursePath": outline["data"]["coursePath"],
+        "topics": topics,
+        "message": "Outline stored. Topic videos are being selected." if request.fillInBackground
+                   else "Outline stored. Topic videos are resolved when each topic is first opened.",
+    }
+
+def _outline_topic(topic_doc: dict) -> dict:
+    """A stored topic in the shape fill_course_outline works on, marked for resolution."""
+    return {
+        "id": topic_doc["_id"],
+        "name": topic_doc.get("name"),
+        "description": topic_doc.get("description"),
+        "videoInfo": topic_doc.get("videoInfo") or {},
+        "prerequisites": topic_doc.get("prerequisites", []),
+        "tags": topic_doc.get("tags", []),
+        "videoStatus": "pending",
+    }
+
+def _resolve_topics(topic_docs: list, subject: str, difficulty: str):
+    """Claim and resolve stored topics, storing each as soon as it is done."""
+    fill_course_outline([_outline_topic(doc) for doc in topic_docs], subject, difficulty,
+                        partial(_in_mongo_bulkhead, _update_outline_topic), claim=_claim_topic,
+                        release=_release_topic)
+
+@app.post("/api/v1/course-paths/{course_id}/topics/{topic_id}/resolve")
+def resolve_topic_endpoint(course_id: str, topic_id: str, response: Response, background_tasks: BackgroundTasks,
+                           lookahead: Optional[int] = None):
+    """Resolve a topic's video on first access, and the next few topics in the background.
+
+    Resolved topics are returned as stored. Concurrent first accesses are safe:
+    only the request that claims the topic resolves it, the others wait for
+    its result (202 if it is still being resolved after TOPIC_RESOLVE_WAIT_SEC).
+    """
+    db = get_database()
+    course = db[COURSE_COLLECTION].find_one({"_id": course_id})
+    if not course or topic_id not in course.get("topics", []):
+        raise HTTPException(status_code=404, detail="Topic not found in this course path")
+    topics = db[TOPIC_COLLECTION]
+    topic = topics.find_one({"_id": topic_id})
+    if not topic:
+        raise HTTPException(status_code=404, detail="Topic not found")
+
+    subject = course.get("subject") or course.get("title", "").replace(" Learning Path", "")
+    difficulty = course.get("targetLevel", "beginner")
+
+    if topic.get("videoStatus") in ("pending", "failed", "resolving"):
+        # A no-op unless this request wins the claim
+        _resolve_topics([topic], subject, difficulty)
+        topic = topics.find_one({"_id": topic_id})
+        deadline = time.time() + TOPIC_RESOLVE_WAIT_SEC
+        while topic.get("videoStatus") == "resolving" and time.time() < deadline:
+            time.sleep(0.5)
+            topic = topics.find_one({"_id": topic_id})
+
+    # Lookahead: resolve the next pending topics before the learner gets there
+    lookahead = TOPIC_LOOKAHEAD if lookahead is None else max(0, min(lookahead, 10))
+    position = course["topics"].index(topic_id)
+    upcoming = [topics.find_one({"_id": next_id}) for next_id in course["topics"][position + 1:position + 1 + lookahead]]
+    upcoming = [doc for doc in upcoming if doc and doc.get("videoStatus") == "pending"]
+    if upcoming:
+        background_tasks.add_task(_resolve_topics, upcoming, subject, difficulty)
+
+    video_status = topic.get("videoStatus", "ready")
+    if video_status == "resolving":
+        response.status_code = status.HTTP_202_ACCEPTED
+    return {
+        "success": video_status == "ready",
+        "status": video_status,
+        "topic": topic,
+        "lookahead": [doc["_id"] for doc in upcoming],
+    }
+
 # Optional: Add more endpoints if needed
 
 if __name__ == "__main__":
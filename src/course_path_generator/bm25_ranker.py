@@ -0,0 +1,90 @@
+"""
+Offline BM25 ranking of a topic's candidate videos.
+
+When every Gemini key fails, a topic would otherwise be dropped from the course.
+Instead the candidates' titles, descriptions and transcripts are indexed in
+memory and ranked with BM25 against the topic (and, more weakly, the subject).
+The resulting selection is marked contentQuality 'heuristic'.
+"""
+import math
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+from .segment_locator import extract_keywords
+from .video_record import Video
+
+# Okapi BM25 parameters
+K1 = 1.5
+B = 0.75
+# Title terms count this many times in a video's document
+TITLE_BOOST = 3
+# Subject terms weigh less than topic terms in the query
+SUBJECT_WEIGHT = 0.5
+
+
+class BM25Index:
+    """In-memory BM25 index over one candidate set."""
+
+    def __init__(self, documents: List[List[str]]):
+        self.term_counts = [Counter(document) for document in documents]
+        self.lengths = [len(document) for document in documents]
+        self.average_length = sum(self.lengths) / len(documents) if documents else 0.0
+        self.document_frequency = Counter(term for counts in self.term_counts for term in counts)
+
+    def idf(self, term: str) -> float:
+        n = len(self.term_counts)
+        df = self.document_frequency.get(term, 0)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def score(self, query: Dict[str, float], index: int) -> float:
+        counts = self.term_counts[index]
+        norm = K1 * (1 - B + B * self.lengths[index] / self.average_length) if self.average_length else K1
+        total = 0.0
+        for term, weight in query.items():
+            tf = counts.get(term, 0)
+            if tf:
+                total += weight * self.idf(term) * tf * (K1 + 1) / (tf + norm)
+        return total
+
+
+def video_document(video: Video) -> List[str]:
+    """Terms of a video: boosted title, description and transcript."""
+    return (extract_keywords(video.title) * TITLE_BOOST
+            + extract_keywords(video.description)
+            + extract_keywords(video.subtitles))
+
+
+def build_query(topic_name: str, subject: str) -> Dict[str, float]:
+    query = {term: SUBJECT_WEIGHT for term in extract_keywords(subject)}
+    query.update({term: 1.0 for term in extract_keywords(topic_name)})
+    return query
+
+
+def bm25_selection(topic_name: str, subject: str, videos: List[Any]) -> Optional[Dict[str, Any]]:
+    """A selectedVideo analysis for the best BM25 match, None only when there are no videos."""
+    if not videos:
+        return None
+    videos = [Video.from_raw(video, 'unknown') for video in videos]
+    query = build_query(topic_name, subject)
+    index = BM25Index([video_document(video) for video in videos])
+    scores = [index.score(query, i) for i in range(len(videos))]
+    # Ties (including no match at all) keep the search engine's order
+    best = max(range(len(videos)), key=lambda i: (scores[i], -i))
+
+    video = videos[best]
+    matched = [term for term in query if index.term_counts[best].get(term)]
+    topic_terms = set(extract_keywords(topic_name)) or set(query)
+    coverage = len(topic_terms & set(matched)) / len(topic_terms) if topic_terms else 0.0
+    reason = (f"Offline BM25 match (Gemini unavailable): {', '.join(matched[:5]) or 'no term matches'}")
+    # No start/end times: the segment locator fills them from transcript and chapters
+    return {
+        'selectedVideo': {
+            'videoNumber': best + 1,
+            'youtubeUrl': video.url,
+            'title': video.title,
+            'reason': reason[:200],
+            'contentQuality': 'heuristic',
+            'relevanceScore': int(round(100 * coverage)),
+            'selectionSource': 'bm25',
+        }
+    }
@@ -0,0 +1,171 @@
+"""
+Bulkhead executors for the generation pipeline's dependencies.
+
+Each kind of dependency call runs on its own, separately sized thread pool with a
+bounded queue: topic generation and video analysis (Gemini), search (yt-dlp and the
+Data API), transcript downloads and Mongo writes. A flood of slow searches can then
+only fill the search bulkhead; Gemini calls and persistence keep their own threads.
+
+When a bulkhead's threads and queue are all taken, callers wait up to
+BULKHEAD_QUEUE_TIMEOUT_SEC for a slot and then get BulkheadFull.
+
+BULKHEAD_<NAME>_WORKERS / BULKHEAD_<NAME>_QUEUE: threads and queue slots per bulkhead
+BULKHEADS: 'off' runs every call in the caller's thread
+"""
+import os
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Callable
+
+# (workers, queue limit) per bulkhead
+BULKHEAD_DEFAULTS = {
+    'topics': (2, 16),
+    'search': (6, 32),
+    'transcripts': (8, 64),
+    'analysis': (4, 32),
+    'mongo': (4, 128),
+}
+
+
+class BulkheadFull(RuntimeError):
+    """A bulkhead had no free thread or queue slot in time."""
+
+
+class Bulkhead:
+    """A thread pool with a bounded queue and saturation metrics."""
+
+    def __init__(self, name: str, workers: int, queue_limit: int, queue_timeout: float = 30.0):
+        self.name = name
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self._thread_prefix = f"bulkhead-{name}"
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=self._thread_prefix)
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0,
+                      'peakActive': 0, 'peakQueued': 0, 'queueWaitSeconds': 0.0}
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Queue fn on this bulkhead; raises BulkheadFull when no slot frees up in time."""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.stats['rejected'] += 1
+            raise BulkheadFull(f"{self.name} bulkhead is full ({self.workers} threads, {self.queue_limit} queued)")
+
+        enqueued = time.monotonic()
+        with self._lock:
+            self.queued += 1
+            self.stats['submitted'] += 1
+            self.stats['peakQueued'] = max(self.stats['peakQueued'], self.queued)
+        # Workers see the caller's context (e.g. the course video registry)
+        context = contextvars.copy_context()
+
+        def task():
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self.stats['peakActive'] = max(self.stats['peakActive'], self.active)
+                self.stats['queueWaitSeconds'] += time.monotonic() - enqueued
+            failed = False
+            try:
+                return context.run(fn, *args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.stats['completed'] += 1
+                    self.stats['failed'] += int(failed)
+                self._slots.release()
+
+        try:
+            return self._executor.submit(task)
+        except RuntimeError:
+            # Executor shut down: give the slot back
+            with self._lock:
+                self.queued -= 1
+            self._slots.release()
+            raise
+
+    def run(self, fn: Callable, *args, **kwargs):
+        """Run fn on this bulkhead and wait for its result.
+
+        A call made from one of this bulkhead's own threads runs inline, so nested
+        use cannot deadlock a saturated pool.
+        """
+        if threading.current_thread().name.startswith(self._thread_prefix):
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            active, queued = self.active, self.queued
+        waited = stats.pop('queueWaitSeconds')
+        started = stats['completed'] + active
+        return {
+            'workers': self.workers,
+            'queueLimit': self.queue_limit,
+            'active': active,
+            'queued': queued,
+            'saturation': (active + queued) / (self.workers + self.queue_limit),
+            'averageQueueWaitSeconds': waited / started if started else None,
+            **stats,
+        }
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+_bulkheads: Dict[str, Bulkhead] = {}
+_bulkheads_lock = threading.Lock()
+
+
+def get_bulkhead(name: str) -> Bulkhead:
+    """Process-wide bulkhead for one kind of call, sized from the environment."""
+    bulkhead = _bulkheads.get(name)
+    if bulkhead is None:
+        with _bulkheads_lock:
+            bulkhead = _bulkheads.get(name)
+            if bulkhead is None:
+                default_workers, default_queue = BULKHEAD_DEFAULTS.get(name, (4, 32))
+                try:
+                    queue_timeout = float(os.getenv('BULKHEAD_QUEUE_TIMEOUT_SEC', '30'))
+                except ValueError:
+                    queue_timeout = 30.0
+                bulkhead = Bulkhead(
+                    name,
+                    max(1, _env_int(f'BULKHEAD_{name.upper()}_WORKERS', default_workers)),
+                    _env_int(f'BULKHEAD_{name.upper()}_QUEUE', default_queue),
+                    queue_timeout,
+                )
+                _bulkheads[name] = bulkhead
+    return bulkhead
+
+
+def bulkheads_enabled() -> bool:
+    return (os.getenv('BULKHEADS') or 'on').strip().lower() != 'off'
+
+
+def run_in_bulkhead(name: str, fn: Callable, *args, **kwargs):
+    """Run fn on the named bulkhead and return its result (in the caller's thread when BULKHEADS=off)."""
+    if not bulkheads_enabled():
+        return fn(*args, **kwargs)
+    return get_bulkhead(name).run(fn, *args, **kwargs)
+
+
+def get_bulkhead_stats() -> Dict[str, Dict[str, Any]]:
+    """Threads, queue and saturation of every bulkhead used so far."""
+    with _bulkheads_lock:
+        bulkheads = list(_bulkheads.values())
+    return {bulkhead.name: bulkhead.snapshot() for bulkhead in bulkheads}
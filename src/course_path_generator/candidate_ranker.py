@@ -0,0 +1,68 @@
+"""
+Local pre-ranker for flat yt-dlp search results.
+
+A flat search only returns ids, titles, durations and (usually) view counts.
+These are enough to shortlist the few videos worth a full extraction with
+metadata and subtitles, which is the expensive part of a search.
+"""
+import os
+import math
+from typing import List, Dict, Any
+
+from .segment_locator import extract_keywords
+
+# Durations (seconds) that suit a course segment
+IDEAL_DURATION = (4 * 60, 45 * 60)
+ACCEPTABLE_DURATION = (2 * 60, 90 * 60)
+
+
+def get_shortlist_size() -> int:
+    """SEARCH_SHORTLIST_SIZE: videos per topic that get full extraction (default 3)."""
+    try:
+        return max(1, int(os.getenv('SEARCH_SHORTLIST_SIZE', '3')))
+    except ValueError:
+        return 3
+
+
+def _duration_fit(duration: Any) -> float:
+    if not isinstance(duration, (int, float)) or duration <= 0:
+        return 0.5  # Unknown, neither rewarded nor punished
+    if duration < 60:
+        return -1.0  # Shorts are never a course segment
+    if IDEAL_DURATION[0] <= duration <= IDEAL_DURATION[1]:
+        return 1.0
+    if ACCEPTABLE_DURATION[0] <= duration <= ACCEPTABLE_DURATION[1]:
+        return 0.5
+    return 0.0
+
+
+def score_flat_entry(entry: Dict[str, Any], topic_keywords: set, subject_keywords: set,
+                     position: int, total: int) -> float:
+    """Relevance of a flat search entry from its title, duration, views and search position."""
+    title_keywords = set(extract_keywords(entry.get('title') or ''))
+    title_score = len(topic_keywords & title_keywords) / len(topic_keywords) if topic_keywords else 0.0
+    if subject_keywords:
+        title_score += 0.5 * len(subject_keywords & title_keywords) / len(subject_keywords)
+
+    views = entry.get('view_count')
+    popularity = min(1.0, math.log10(views + 1) / 7) if isinstance(views, (int, float)) and views > 0 else 0.0
+
+    # YouTube's own ordering is a decent relevance signal, so it breaks ties
+    order_bonus = (total - position) / total if total else 0.0
+
+    return title_score + 0.5 * _duration_fit(entry.get('duration')) + 0.3 * popularity + 0.2 * order_bonus
+
+
+def shortlist_candidates(entries: List[Dict[str, Any]], topic: str, subject: str = "",
+                         k: int = None) -> List[Dict[str, Any]]:
+    """Return the k most promising flat entries, best first."""
+    k = k or get_shortlist_size()
+    entries = [entry for entry in entries if entry and entry.get('id')]
+    topic_keywords = set(extract_keywords(topic))
+    subject_keywords = set(extract_keywords(subject)) - topic_keywords
+    scored = [
+        (score_flat_entry(entry, topic_keywords, subject_keywords, position, len(entries)), -position, entry)
+        for position, entry in enumerate(entries)
+    ]
+    scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+    return [entry for _, _, entry in scored[:k]]
@@ -1,53 +1,71 @@
 import os
 import json
 import uuid
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Callable, Optional
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from .heuristic_ranker import select_or_defer, heuristic_selection
+from .bm25_ranker import bm25_selection
+from .gemini_router import generate_with_tiers, get_gemini_api_keys
+from .json_repair import loads_tolerant, coerce_selected_video
+from .video_record import Video, TopicCandidates
+from .video_registry import video_registry_scope, prompt_blocks
 
 # Load environment variables
 load_dotenv()
 
-def create_course_path(videos_data: List[Dict[str, Any]], subject: str, difficulty_level: str) -> Dict[str, Any]:
+# Response schema for Gemini's JSON mode, matching the prompt's output format
+ANALYSIS_RESPONSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'selectedVideo': {
+            'type': 'object',
+            'properties': {
+                'videoNumber': {'type': 'integer'},
+                'youtubeUrl': {'type': 'string'},
+                'title': {'type': 'string'},
+                'reason': {'type': 'string'},
+                'startTimeMs': {'type': 'integer'},
+                'endTimeMs': {'type': 'integer'},
+                'contentQuality': {'type': 'string', 'enum': ['high', 'medium', 'low']},
+                'relevanceScore': {'type': 'integer'},
+            },
+            'required': ['videoNumber', 'youtubeUrl', 'title', 'reason', 'contentQuality', 'relevanceScore'],
+        }
+    },
+    'required': ['selectedVideo'],
+}
 
+def create_course_path(videos_data: Iterable[TopicCandidates], subject: str, difficulty_level: str,
+                       search: Optional[Callable] = None) -> Dict[str, Any]:
+    """
+    Analyze each topic's candidates as they arrive. videos_data may be a list or a
+    generator such as iter_youtube_videos_for_topics; with a generator only one
+    topic's videos (descriptions, transcripts) are held in memory at a time.
+    With a search function, weak topics are widened to more candidates.
+    """
     
+    from .pipeline import TopicWork, PipelineContext, course_pipeline
+    from .get_youtube_videos import fetch_subtitle_cues
+
+    total_topics = len(videos_data) if hasattr(videos_data, '__len__') else None
     print(f"Creating course path for: {subject} ({difficulty_level} level)")
-    print(f"Analyzing {len(videos_data)} topics...")
+    print(f"Analyzing {total_topics if total_topics is not None else 'streamed'} topics...")
     
     # Generate course path ID and basic info
     course_id = f"course-{str(uuid.uuid4())}"
     
-    analyzed_topics = []
+    # Candidates are already fetched, so the pipeline's search stage passes them through
+    works = (TopicWork(i, topic_data.topic_name, total_topics, videos=list(topic_data.videos))
+             for i, topic_data in enumerate(videos_data, 1))
     
-    for i, topic_data in enumerate(videos_data, 1):
-        topic_name = topic_data['topic_name']
-        videos = topic_data['videos']
-        
-        print(f"\n[{i}/{len(videos_data)}] Analyzing topic: '{topic_name}'")
-        
-        if not videos:
-            print(f"  ⚠️ No videos found for topic '{topic_name}', skipping...")
-            continue
-        
-        try:
-            # Analyze this topic's videos with Gemini (using fallback system)
-            best_video_analysis = analyze_topic_videos_with_gemini_fallback(
-                topic_name, videos, subject, difficulty_level
-            )
-            
-            if best_video_analysis:
-                # Create topic structure
-                topic_structure = create_topic_structure(
-                    topic_name, best_video_analysis, i
-                )
-                analyzed_topics.append(topic_structure)
-                print(f"  ✅ Successfully analyzed '{topic_name}'")
-            else:
-                print(f"  ❌ Failed to analyze '{topic_name}'")
-                
-        except Exception as e:
-            print(f"  ❌ Error analyzing topic '{topic_name}': {str(e)}")
-            continue
+    # One registry per course: videos shared between topics are extracted and described once
+    with video_registry_scope() as registry:
+        context = PipelineContext(subject, difficulty_level, search=search, registry=registry,
+                                  fetch_cues=fetch_subtitle_cues)
+        # One worker: running ahead would only hold more topics' candidates in memory
+        analyzed_topics = [work.structure for work in course_pipeline(max_workers=1).run(works, context)
+                           if work.structure]
     
     # Create final course path structure
     course_path = {
@@ -69,27 +87,14 @@ def create_course_path(videos_data: List[Dict[str, Any]], subject: str, difficul
     return course_path
 
 
-def analyze_topic_videos_with_gemini(model, topic_name: str, videos: List[Dict], subject: str, difficulty_level: str) -> Dict[str, Any]:
-
-    
+def build_analysis_prompt(topic_name: str, videos: List[Video], subject: str, difficulty_level: str) -> str:
+    """The video selection prompt shared by every analysis path."""
     # Prepare video information for Gemini
-    videos_info = []
-    for i, video in enumerate(videos, 1):
-        video_info = f"""
-Video {i}:
-Title: {video.get('title', 'N/A')}
-URL: {video.get('url', 'N/A')}
-Description: {video.get('description', 'N/A')}
-Subtitles: {video.get('subtitles', 'N/A')}
-Views: {video.get('view_count', 0):,}
-Likes: {video.get('like_count', 0):,}
-Duration: {video.get('duration', 0)} seconds
-Channel: {video.get('channel', 'N/A')}
-"""
-        videos_info.append(video_info)
+    # Videos already described for an earlier topic of this course are referenced compactly
+    videos_info = prompt_blocks(videos, topic_name)
     
     # Create comprehensive prompt for Gemini
-    prompt = f"""You are an expert educational content curator. Analyze these 5 YouTube videos for the topic "{topic_name}" in the subject "{subject}" at {difficulty_level} level.
+    return f"""You are an expert educational content curator. Analyze these {len(videos)} YouTube videos for the topic "{topic_name}" in the subject "{subject}" at {difficulty_level} level.
 
 TASK: Select the BEST video and provide specific start/end times for the most relevant content.
 
@@ -125,21 +130,22 @@ REQUIRED OUTPUT FORMAT (JSON only, no other text):
 
 Respond with ONLY the JSON object, no additional text."""
 
+
+def analyze_topic_videos_with_gemini(model, topic_name: str, videos: List[Video], subject: str, difficulty_level: str) -> Dict[str, Any]:
+
+    
+    prompt = build_analysis_prompt(topic_name, videos, subject, difficulty_level)
+
     try:
         # Call Gemini API
-        response = model.generate_content(prompt)
+        response = model.generate_content(prompt, generation_config=analysis_generation_config())
         response_text = response.text.strip()
         
-        # Parse JSON response
-        if response_text.startswith('```json'):
-            response_text = response_text[7:-3].strip()
-        elif response_text.startswith('```'):
-            response_text = response_text[3:-3].strip()
-        
-        analysis_result = json.loads(response_text)
+        # Parse JSON response, repairing it locally if needed
+        analysis_result = coerce_selected_video(loads_tolerant(response_text))
         return analysis_result
         
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         print(f"    Error parsing Gemini response as JSON: {e}")
         print(f"    Raw response: {response_text[:200]}...")
         return None
@@ -148,123 +154,71 @@ Respond with ONLY the JSON object, no additional text."""
         return None
 
 
-def analyze_topic_videos_with_gemini_fallback(topic_name: str, videos: List[Dict], subject: str, difficulty_level: str) -> Dict[str, Any]:
+def select_best_video(topic_name: str, videos: List[Video], subject: str, difficulty_level: str) -> Dict[str, Any]:
+    """Select a topic's video locally when the heuristic ranking is decisive, otherwise with Gemini"""
+    analysis = select_or_defer(
+        topic_name, subject, videos, difficulty_level,
+        analyze_topic_videos_with_gemini_fallback
+    )
+    if analysis is None:
+        # Every Gemini key failed: rank offline rather than dropping the topic
+        analysis = bm25_selection(topic_name, subject, videos)
+        if analysis:
+            print(f"    📚 Gemini unavailable, selected video {analysis['selectedVideo']['videoNumber']} by BM25")
+    return analysis
+
+
+def select_best_video_locally(topic_name: str, videos: List[Video], subject: str, difficulty_level: str) -> Dict[str, Any]:
+    """Select a topic's video without Gemini: heuristic ranking, or BM25 when no title matches"""
+    analysis = (heuristic_selection(topic_name, subject, videos, difficulty_level, margin=0.0)
+                or bm25_selection(topic_name, subject, videos))
+    if analysis:
+        print(f"    🏎️ Selected video {analysis['selectedVideo']['videoNumber']} locally ({analysis['selectedVideo']['selectionSource']})")
+    return analysis
+
+
+def analyze_topic_videos_with_gemini_fallback(topic_name: str, videos: List[Video], subject: str, difficulty_level: str) -> Dict[str, Any]:
     """Analyze topic videos with Gemini API using fallback system for ANY error"""
     
-    # List of all available API keys (now supporting 5 keys)
-    api_keys = [
-        os.getenv('GEMINI_API_KEY'),
-        os.getenv('GEMINI_API_KEY2'), 
-        os.getenv('GEMINI_API_KEY3'),
-        os.getenv('GEMINI_API_KEY4'),
-        os.getenv('GEMINI_API_KEY5')
-    ]
-    
-    # Filter out None values
-    api_keys = [key for key in api_keys if key]
-    
-    if not api_keys:
+    if not get_gemini_api_keys():
         print("    ❌ No Gemini API keys found in environment variables")
         return None
     
-    # Prepare video information for Gemini
-    videos_info = []
-    for i, video in enumerate(videos, 1):
-        video_info = f"""
-Video {i}:
-Title: {video.get('title', 'N/A')}
-URL: {video.get('url', 'N/A')}
-Description: {video.get('description', 'N/A')}
-Subtitles: {video.get('subtitles', 'N/A')}
-Views: {video.get('view_count', 0):,}
-Likes: {video.get('like_count', 0):,}
-Duration: {video.get('duration', 0)} seconds
-Channel: {video.get('channel', 'N/A')}
-"""
-        videos_info.append(video_info)
-    
-    # Create comprehensive prompt for Gemini
-    prompt = f"""You are an expert educational content curator. Analyze these 5 YouTube videos for the topic "{topic_name}" in the subject "{subject}" at {difficulty_level} level.
+    prompt = build_analysis_prompt(topic_name, videos, subject, difficulty_level)
 
-TASK: Select the BEST video and provide specific start/end times for the most relevant content.
+    # Cheapest model tier first, escalating on unrecoverable or low-confidence answers
+    return generate_with_tiers(prompt, 'analysis', parse_analysis_response, analysis_generation_config())
 
-ANALYSIS CRITERIA (in priority order):
-1. PRIMARY: Content quality based on subtitles - analyze if the spoken content matches the topic and difficulty level
-2. SECONDARY: Video metrics (views, likes) as supporting indicators
-3. Look for timestamp information in descriptions to identify relevant segments
-4. Ensure content is appropriate for {difficulty_level} learners
 
-VIDEOS TO ANALYZE:
-{chr(10).join(videos_info)}
+def analysis_generation_config() -> Optional[Dict[str, Any]]:
+    """GEMINI_JSON_MODE: ask for schema-constrained JSON unless set to 'off'."""
+    if (os.getenv('GEMINI_JSON_MODE') or 'on').strip().lower() == 'off':
+        return None
+    return {'response_mime_type': 'application/json', 'response_schema': ANALYSIS_RESPONSE_SCHEMA}
 
-INSTRUCTIONS:
-- Analyze the subtitle content to determine which video has the highest quality explanation for "{topic_name}"
-- Look for timestamps in descriptions that indicate relevant sections
-- If no specific timestamps are mentioned, analyze the entire video duration
-- Consider the {difficulty_level} level - content should not be too basic or too advanced
-- Focus on educational value over popularity metrics
 
-REQUIRED OUTPUT FORMAT (JSON only, no other text):
-{{
-  "selectedVideo": {{
-    "videoNumber": 1,
-    "youtubeUrl": "https://www.youtube.com/watch?v=...",
-    "title": "Video Title",
-    "reason": "Why this video was selected (max 200 chars)",
-    "startTimeMs": 0,
-    "endTimeMs": 300000,
-    "contentQuality": "high|medium|low",
-    "relevanceScore": 95
-  }}
-}}
+def parse_analysis_response(response_text: str):
+    """Parse an analysis response; low relevance or quality asks for a stronger model."""
+    # Prose, fences, trailing commas and truncation are repaired locally
+    analysis_result = coerce_selected_video(loads_tolerant(response_text.strip()))
+    selected = analysis_result.get('selectedVideo') if isinstance(analysis_result, dict) else None
+    if not isinstance(selected, dict):
+        raise ValueError("response has no selectedVideo")
 
-Respond with ONLY the JSON object, no additional text."""
+    try:
+        relevance = float(selected.get('relevanceScore', 0))
+    except (TypeError, ValueError):
+        relevance = 0.0
+    confident = relevance >= get_min_relevance_score() and selected.get('contentQuality') != 'low'
+    return analysis_result, confident
 
-    # Try each API key until successful or all fail
-    for i, api_key in enumerate(api_keys):
-        try:
-            print(f"    Trying Gemini API key {i+1}/{len(api_keys)}...")
-            
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel('gemini-2.0-flash-exp')
-            response = model.generate_content(prompt)
-            response_text = response.text.strip()
-            
-            # Parse JSON response
-            if response_text.startswith('```json'):
-                response_text = response_text[7:-3].strip()
-            elif response_text.startswith('```'):
-                response_text = response_text[3:-3].strip()
-            
-            analysis_result = json.loads(response_text)
-            print(f"    ✅ Success with API key {i+1}")
-            return analysis_result
-            
-        except json.JSONDecodeError as e:
-            print(f"    ⚠️ JSON parsing error with API key {i+1}: {e}. Trying next key...")
-            if i < len(api_keys) - 1:  # Not the last key
-                continue
-            else:  # Last key, all failed
-                return None
-                
-        except Exception as e:
-            error_msg = str(e).lower()
-            
-            # Check if it's a rate limit error for specific messaging
-            if any(term in error_msg for term in ['rate limit', 'quota', 'limit exceeded', 'too many requests']):
-                print(f"    ⚠️ Rate limit hit with API key {i+1}. Trying next key...")
-            else:
-                # For any other error, also try next key
-                print(f"    ⚠️ Error with API key {i+1}: {str(e)[:100]}... Trying next key...")
-            
-            # Continue to next key for ANY error (not just rate limits)
-            if i < len(api_keys) - 1:  # Not the last key
-                continue
-            else:  # Last key, all failed
-                print(f"    ❌ All {len(api_keys)} API keys failed")
-                return None
-    
-    return None
+
+def get_min_relevance_score() -> float:
+    """GEMINI_ESCALATE_BELOW_SCORE: relevanceScore under which analysis escalates a tier (default 60)."""
+    try:
+        return float(os.getenv('GEMINI_ESCALATE_BELOW_SCORE', '60'))
+    except ValueError:
+        return 60.0
 
 
 def create_topic_structure(topic_name: str, analysis: Dict[str, Any], index: int) -> Dict[str, Any]:
@@ -312,6 +266,24 @@ def create_topic_structure(topic_name: str, analysis: Dict[str, Any], index: int
     return topic_structure
 
 
+def create_outline_topic_structure(topic_name: str, index: int) -> Dict[str, Any]:
+    """Topic structure for an outline: same shape, video selection still pending"""
+    return {
+        "id": f"topic-{str(uuid.uuid4())}",
+        "name": topic_name,
+        "description": f"Learn about {topic_name.lower()}",
+        "videoInfo": {
+            "youtubeUrl": "",
+            "title": "",
+            "startTime": 0,
+            "endTime": 0
+        },
+        "prerequisites": [f"previous-topic-{index-1}"] if index > 1 else [],
+        "tags": generate_tags_from_topic(topic_name),
+        "videoStatus": "pending"
+    }
+
+
 def generate_tags_from_topic(topic_name: str) -> List[str]:
 
     
@@ -0,0 +1,94 @@
+"""
+Deadline-aware generation.
+
+A course gets a time budget (the request's timeBudgetSec, or GENERATION_TIME_BUDGET_SEC).
+Before each topic the share of the budget already used decides how much work that
+topic may cost, one step at a time as the deadline approaches:
+
+    fewerCandidates   fewer candidates per topic, no widening
+    skipTranscripts   only search backends that do not download transcripts
+    heuristicRanking  local ranking instead of Gemini
+    outlineOnly       no video selection; the topic stays pending and is resolved on first access
+
+DEGRADATION_THRESHOLDS: comma-separated budget shares at which each level starts
+"""
+import os
+import time
+import threading
+from typing import List, Dict, Any, Optional
+
+FULL, FEWER_CANDIDATES, SKIP_TRANSCRIPTS, HEURISTIC_RANKING, OUTLINE_ONLY = range(5)
+LEVEL_NAMES = ['full', 'fewerCandidates', 'skipTranscripts', 'heuristicRanking', 'outlineOnly']
+DEFAULT_THRESHOLDS = '0.5,0.65,0.8,0.9'
+# Candidates per topic from fewerCandidates on
+REDUCED_FAN_OUT = 2
+
+
+def get_default_time_budget() -> Optional[float]:
+    """GENERATION_TIME_BUDGET_SEC: budget for requests that do not set one (default 480, 'off' for none)."""
+    value = os.getenv('GENERATION_TIME_BUDGET_SEC', '480').strip().lower()
+    if value in ('', 'off', 'none', '0'):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return 480.0
+
+
+def get_degradation_thresholds() -> List[float]:
+    try:
+        thresholds = [float(share) for share in os.getenv('DEGRADATION_THRESHOLDS', DEFAULT_THRESHOLDS).split(',')]
+    except ValueError:
+        thresholds = []
+    if len(thresholds) != OUTLINE_ONLY:
+        thresholds = [float(share) for share in DEFAULT_THRESHOLDS.split(',')]
+    return thresholds
+
+
+class GenerationDeadline:
+    """Tracks one course's time budget and the degradation levels it forced."""
+
+    def __init__(self, budget_sec: float, thresholds: Optional[List[float]] = None, clock=time.monotonic):
+        self.budget_sec = budget_sec
+        self.thresholds = thresholds or get_degradation_thresholds()
+        self.clock = clock
+        self.started = clock()
+        self.topics_per_level = [0] * len(LEVEL_NAMES)
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return self.clock() - self.started
+
+    def remaining(self) -> float:
+        return max(0.0, self.budget_sec - self.elapsed())
+
+    def level(self) -> int:
+        """Degradation level for the next topic: how many thresholds the used share has passed."""
+        used = self.elapsed() / self.budget_sec if self.budget_sec > 0 else 1.0
+        return sum(1 for threshold in self.thresholds if used >= threshold)
+
+    def next_level(self) -> int:
+        """level(), counted as applied to one topic."""
+        level = self.level()
+        with self._lock:
+            self.topics_per_level[level] += 1
+        if level:
+            print(f"    ⏳ {self.remaining():.0f}s of {self.budget_sec:.0f}s budget left: {LEVEL_NAMES[level]}")
+        return level
+
+    def summary(self) -> Dict[str, Any]:
+        """What is recorded on the course: the budget and the levels applied to its topics."""
+        with self._lock:
+            counts = list(self.topics_per_level)
+        return {
+            'timeBudgetSec': self.budget_sec,
+            'elapsedSec': round(self.elapsed(), 1),
+            'levels': [name for name, count in zip(LEVEL_NAMES, counts) if count and name != 'full'],
+            'topicsPerLevel': {name: count for name, count in zip(LEVEL_NAMES, counts) if count},
+        }
+
+
+def make_deadline(budget_sec: Optional[float] = None) -> Optional[GenerationDeadline]:
+    """Deadline for a request's budget, the server default when it has none, or None when unbounded."""
+    budget_sec = budget_sec if budget_sec is not None else get_default_time_budget()
+    return GenerationDeadline(budget_sec) if budget_sec else None
@@ -0,0 +1,122 @@
+"""
+Adaptive candidate fan-out per topic.
+
+A topic starts with a small candidate set (FAN_OUT_BEGINNER / _INTERMEDIATE /
+_ADVANCED videos). More candidates, up to FAN_OUT_MAX, are only fetched when the
+local pre-rank finds no convincing candidate, or when Gemini's analysis comes
+back with a relevanceScore under FAN_OUT_MIN_RELEVANCE. Clear topics therefore
+cost fewer extractions and shorter prompts.
+"""
+import os
+import threading
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from .heuristic_ranker import score_candidates
+from .video_record import Video
+
+DEFAULT_INITIAL_FAN_OUT = {'beginner': 3, 'intermediate': 3, 'advanced': 4}
+# Pre-rank score below which no candidate looks like it matches the topic
+MIN_PRERANK_SCORE = 0.5
+# Local selections score on their ranker's own scale, not Gemini's, and were only
+# made because one candidate clearly led the others
+LOCAL_SELECTION_SOURCES = ('heuristic', 'bm25')
+
+fan_out_stats = {'topics': 0, 'widenedBeforeAnalysis': 0, 'widenedAfterAnalysis': 0, 'candidates': 0}
+_stats_lock = threading.Lock()
+
+
+def _env_number(name: str, default, cast=int):
+    try:
+        return cast(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_max_fan_out() -> int:
+    """FAN_OUT_MAX: most candidates a topic is ever widened to (default 5)."""
+    return max(1, _env_number('FAN_OUT_MAX', 5))
+
+
+def get_initial_fan_out(difficulty_level: str) -> int:
+    """Starting candidate count for a difficulty level, FAN_OUT_<LEVEL> (defaults 3/3/4)."""
+    level = (difficulty_level or 'intermediate').lower()
+    default = DEFAULT_INITIAL_FAN_OUT.get(level, DEFAULT_INITIAL_FAN_OUT['intermediate'])
+    return max(1, min(get_max_fan_out(), _env_number(f'FAN_OUT_{level.upper()}', default)))
+
+
+def get_min_relevance() -> float:
+    """FAN_OUT_MIN_RELEVANCE: relevanceScore under which a topic is re-analyzed with more candidates (default 70)."""
+    return _env_number('FAN_OUT_MIN_RELEVANCE', 70.0, float)
+
+
+def _count(key: str, amount: int = 1) -> None:
+    with _stats_lock:
+        fan_out_stats[key] += amount
+
+
+def _relevance(analysis: Optional[Dict[str, Any]]) -> Optional[float]:
+    """Gemini's relevanceScore for the selection; None for local selections or without a score."""
+    selected = (analysis or {}).get('selectedVideo') or {}
+    if selected.get('selectionSource') in LOCAL_SELECTION_SOURCES:
+        return None
+    try:
+        return float(selected['relevanceScore'])
+    except (KeyError, TypeError, ValueError):
+        return None  # No score, no reason to widen
+
+
+def _widen(topic_name: str, subject: str, videos: List[Video], search: Callable,
+           prepare: Optional[Callable[[List[Video]], List[Video]]] = None) -> List[Video]:
+    """The current candidates plus new ones from a wider search, up to FAN_OUT_MAX."""
+    limit = get_max_fan_out()
+    try:
+        more = search(topic_name, subject, limit)
+        if prepare is not None:
+            more = prepare(more)
+    except Exception as e:
+        print(f"    ⚠️ Could not fetch more candidates: {str(e)[:100]}")
+        return videos
+    known = {video.video_id for video in videos}
+    widened = list(videos) + [video for video in more if video.video_id not in known]
+    print(f"    🔎 Widened '{topic_name}' from {len(videos)} to {len(widened[:limit])} candidates")
+    return widened[:limit]
+
+
+def select_with_fan_out(topic_name: str, videos: List[Video], subject: str, difficulty_level: str,
+                        select: Callable, search: Optional[Callable] = None,
+                        prepare: Optional[Callable[[List[Video]], List[Video]]] = None
+                        ) -> Tuple[Optional[Dict[str, Any]], List[Video]]:
+    """Run select() on the topic's candidates, widening them once when the result looks weak.
+
+    prepare, when given, is applied to the videos a wider search returns before
+    they join the candidates, as the initial candidates were (e.g. registry filtering).
+    Returns the analysis and the candidate list it refers to.
+    """
+    _count('topics')
+    widened = False
+    can_widen = search is not None and 0 < len(videos) < get_max_fan_out()
+
+    if can_widen and float(max(score_candidates(topic_name, subject, videos, difficulty_level))) < MIN_PRERANK_SCORE:
+        videos = _widen(topic_name, subject, videos, search, prepare)
+        widened = True
+        _count('widenedBeforeAnalysis')
+
+    analysis = select(topic_name, videos, subject, difficulty_level)
+
+    relevance = _relevance(analysis)
+    if can_widen and not widened and relevance is not None and relevance < get_min_relevance():
+        wider = _widen(topic_name, subject, videos, search, prepare)
+        if len(wider) > len(videos):
+            _count('widenedAfterAnalysis')
+            videos = wider
+            analysis = select(topic_name, videos, subject, difficulty_level) or analysis
+
+    _count('candidates', len(videos))
+    return analysis, videos
+
+
+def get_fan_out_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(fan_out_stats)
+    stats['averageCandidates'] = stats['candidates'] / stats['topics'] if stats['topics'] else None
+    return stats
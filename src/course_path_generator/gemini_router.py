@@ -0,0 +1,173 @@
+"""
+Tiered Gemini model routing.
+
+Each call purpose (topic generation, video analysis) has its own list of model
+tiers, cheapest and fastest first. A call starts on the first tier and only
+escalates to the next one when the response is malformed or the caller judges
+it low-confidence. Within a tier every API key is tried before giving up on it.
+Calls run on the bulkhead named after their purpose (see bulkheads.py).
+
+GEMINI_TOPIC_MODELS / GEMINI_ANALYSIS_MODELS: comma-separated model tiers
+"""
+import os
+import time
+import threading
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+import google.generativeai as genai
+import google.ai.generativelanguage as glm
+from google.generativeai.types.generation_types import to_generation_config_dict
+
+from .video_search_backends import BackendStats
+from .bulkheads import run_in_bulkhead, BulkheadFull
+
+MODEL_TIER_ENV = {'topics': 'GEMINI_TOPIC_MODELS', 'analysis': 'GEMINI_ANALYSIS_MODELS'}
+DEFAULT_MODEL_TIERS = {
+    'topics': 'gemini-2.0-flash-exp',
+    'analysis': 'gemini-2.0-flash-lite,gemini-2.0-flash-exp',
+}
+RATE_LIMIT_TERMS = ['rate limit', 'quota', 'limit exceeded', 'too many requests']
+
+_stats = {}
+_stats_lock = threading.Lock()
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_gemini_api_keys() -> List[str]:
+    """Configured Gemini API keys (GEMINI_API_KEY, GEMINI_API_KEY2 ... GEMINI_API_KEY5)."""
+    names = ['GEMINI_API_KEY'] + [f'GEMINI_API_KEY{n}' for n in range(2, 6)]
+    return [key for key in (os.getenv(name) for name in names) if key]
+
+
+def get_model_tiers(purpose: str) -> List[str]:
+    value = os.getenv(MODEL_TIER_ENV[purpose]) or DEFAULT_MODEL_TIERS[purpose]
+    return [model.strip() for model in value.split(',') if model.strip()]
+
+
+def _purpose_stats(purpose: str) -> Dict[str, Any]:
+    # Caller holds _stats_lock
+    if purpose not in _stats:
+        _stats[purpose] = {'calls': 0, 'escalations': 0, 'failures': 0, 'tiers': {}}
+    return _stats[purpose]
+
+
+def _record_tier(purpose: str, model: str, success: bool, latency: float) -> None:
+    with _stats_lock:
+        tiers = _purpose_stats(purpose)['tiers']
+        tiers.setdefault(model, BackendStats(100)).record(success, latency)
+
+
+def _count(purpose: str, key: str) -> None:
+    with _stats_lock:
+        _purpose_stats(purpose)[key] += 1
+
+
+def _client_for(api_key: str):
+    """One GenerativeServiceClient per API key, shared by every call made with that key."""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+            _clients[api_key] = client
+        return client
+
+
+def _generate_content(model_name: str, prompt: str, api_key: str,
+                      generation_config: Optional[Dict[str, Any]] = None) -> str:
+    """Response text of one generateContent call made with this key's own client.
+
+    genai.configure() sets a process-wide key that concurrent calls would overwrite,
+    so the request goes through the public google.ai.generativelanguage client;
+    the SDK still converts the generation config (e.g. the response schema) and
+    reads the response text.
+    """
+    request = glm.GenerateContentRequest(
+        model=f"models/{model_name}",
+        contents=[glm.Content(role='user', parts=[glm.Part(text=prompt)])],
+        generation_config=glm.GenerationConfig(to_generation_config_dict(generation_config)),
+    )
+    response = _client_for(api_key).generate_content(request)
+    return genai.types.GenerateContentResponse.from_response(response).text
+
+
+def _generate_on_tier(model_name: str, prompt: str, api_keys: List[str],
+                      generation_config: Optional[Dict[str, Any]] = None) -> Tuple[Optional[str], Optional[Exception]]:
+    """Response text from one model, trying every key; (None, last error) when all keys fail."""
+    last_error = None
+    for i, api_key in enumerate(api_keys):
+        try:
+            print(f"    Trying {model_name} with Gemini API key {i+1}/{len(api_keys)}...")
+            text = _generate_content(model_name, prompt, api_key, generation_config)
+            print(f"    ✅ Success with API key {i+1}")
+            return text, None
+        except Exception as e:
+            last_error = e
+            if any(term in str(e).lower() for term in RATE_LIMIT_TERMS):
+                print(f"    ⚠️ Rate limit hit with API key {i+1}. Trying next key...")
+            else:
+                print(f"    ⚠️ Error with API key {i+1}: {str(e)[:100]}... Trying next key...")
+    return None, last_error
+
+
+def generate_with_tiers(prompt: str, purpose: str, parse: Callable[[str], Tuple[Any, bool]],
+                        generation_config: Optional[Dict[str, Any]] = None) -> Any:
+    """Run a prompt up the model tiers until a response parses with confidence.
+
+    parse(text) returns (result, confident) and raises ValueError on a malformed
+    response. When no tier is confident, the last parsed result is returned;
+    None when no tier produced a usable response at all. generation_config is
+    passed to every call (e.g. JSON response mode with a response schema).
+    """
+    api_keys = get_gemini_api_keys()
+    if not api_keys:
+        raise ValueError("No Gemini API keys found in environment variables")
+
+    _count(purpose, 'calls')
+    tiers = get_model_tiers(purpose)
+    fallback = None
+    for tier, model_name in enumerate(tiers):
+        if tier:
+            _count(purpose, 'escalations')
+            print(f"    ⬆️ Escalating to {model_name}")
+        start_time = time.time()
+        try:
+            text, error = run_in_bulkhead(purpose, _generate_on_tier, model_name, prompt, api_keys, generation_config)
+        except BulkheadFull as e:
+            # Every tier shares this bulkhead: escalating would only wait for it again
+            print(f"    ❌ {e}, not trying further tiers")
+            break
+        if text is None:
+            _record_tier(purpose, model_name, False, time.time() - start_time)
+            print(f"    ❌ All {len(api_keys)} API keys failed for {model_name}: {str(error)[:100]}")
+            continue
+        try:
+            result, confident = parse(text)
+        except ValueError as e:
+            _record_tier(purpose, model_name, False, time.time() - start_time)
+            print(f"    ⚠️ Malformed response from {model_name}: {str(e)[:100]}")
+            continue
+        _record_tier(purpose, model_name, True, time.time() - start_time)
+        if confident:
+            return result
+        print(f"    🤔 Low-confidence response from {model_name}")
+        fallback = result
+
+    if fallback is None:
+        _count(purpose, 'failures')
+    return fallback
+
+
+def get_gemini_router_stats() -> Dict[str, Any]:
+    """Calls, escalation rate and per-tier success/latency for each purpose."""
+    with _stats_lock:
+        report = {}
+        for purpose, stats in _stats.items():
+            report[purpose] = {
+                'calls': stats['calls'],
+                'escalations': stats['escalations'],
+                'failures': stats['failures'],
+                'escalationRate': stats['escalations'] / stats['calls'] if stats['calls'] else None,
+                'tiers': {model: tier.snapshot() for model, tier in stats['tiers'].items()},
+            }
+        return report
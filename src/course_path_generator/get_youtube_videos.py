@@ -2,39 +2,56 @@ import yt_dlp
 import json
 import time
 import random
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
 
-# Import the simple and enhanced yt-dlp fetcher (no YouTube API)
-try:
-    from .youtube_fetcher_simple import get_youtube_videos_simple
-    SIMPLE_AVAILABLE = True
-except ImportError:
-    SIMPLE_AVAILABLE = False
+from .subtitle_normalizer import (
+    SUPPORTED_FORMATS, normalize_subtitles, parse_vtt_subtitles, parse_json3_subtitles, clean_subtitle_text
+)
 
-try:
-    from .youtube_fetcher_enhanced import search_youtube_videos_enhanced
-    ENHANCED_AVAILABLE = True
-except ImportError:
-    ENHANCED_AVAILABLE = False
+from .video_search_backends import get_backend_selector
+from .video_record import Video, TopicCandidates
+from .ytdlp_rate_controller import get_ytdlp_controller, extract_info_checked
 
 
-def get_youtube_videos_for_topics(topics: List[str], subject: str = "") -> List[Dict[str, Any]]:
-
+def iter_youtube_videos_for_topics(topics: Iterable[str], subject: str = "", max_results: int = 5) -> Iterator[TopicCandidates]:
+    """Yield each topic's candidates as soon as they are fetched, one topic in memory at a time"""
     
-    all_topics_data = []
+    topics = list(topics)
+    print(f"Processing {len(topics)} topics...")
     
-    # Configure yt-dlp options with anti-detection
-    ydl_opts = {
-        'quiet': True,  # Suppress most output
+    for i, topic in enumerate(topics, 1):
+        print(f"\n[{i}/{len(topics)}] Searching for: '{topic}'")
+        
+        try:
+            # The backend selector picks the fastest healthy fetcher and fails over to the others
+            videos_for_topic = get_backend_selector().search(topic, subject, max_results)
+            print(f"  ✓ Found {len(videos_for_topic)} videos for '{topic}'")
+            
+        except Exception as e:
+            print(f"  ✗ Error processing topic '{topic}': {str(e)}")
+            # Yield empty topic data for failed topics
+            videos_for_topic = []
+        
+        yield TopicCandidates(topic, videos_for_topic)
+
+
+def get_youtube_videos_for_topics(topics: List[str], subject: str = "") -> List[TopicCandidates]:
+
+    return list(iter_youtube_videos_for_topics(topics, subject))
+
+
+def create_basic_ydl_opts() -> Dict[str, Any]:
+    """yt-dlp options for the basic flat search, with anti-detection headers"""
+    return {
+        'quiet': True,
         'no_warnings': True,
-        'extract_flat': True,  # Only get basic info, no format processing
-        'writesubtitles': False,
-        'writeautomaticsub': False,
+        'extract_flat': True,  # Only get basic info, don't process formats
         'skip_download': True,
-        'ignoreerrors': True,
+        'ignoreerrors': True,  # Continue on errors
+        'no_check_certificate': True,  # Bypass SSL issues
         
         # Anti-detection measures
-        'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         'referer': 'https://www.youtube.com/',
         'headers': {
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -44,68 +61,17 @@ def get_youtube_videos_for_topics(topics: List[str], subject: str = "") -> List[
             'Keep-Alive': '300',
             'Connection': 'keep-alive',
         },
-        
-        # Rate limiting and retry logic
-        'sleep_interval': 1,  # Sleep 1 second between requests
+        'sleep_interval': 1,
         'max_sleep_interval': 5,
-        'retries': 2,  # Reduced retries to avoid hanging
+        'retries': 2,  # Reduced retries
         'fragment_retries': 1,  # Reduced fragment retries
         'socket_timeout': 15,  # Reduced timeout
-        
-        # Use cookies if available
-        'cookiefile': None,  # We'll handle this differently
-        
-        # Extract format options
         'noplaylist': True,
+        # Removed 'format': 'best' to avoid validation errors
     }
-    
-    print(f"Processing {len(topics)} topics...")
-    
-    for i, topic in enumerate(topics, 1):
-        print(f"\n[{i}/{len(topics)}] Searching for: '{topic}'")
-        
-        try:
-            # Try simple approach first (most reliable)
-            if SIMPLE_AVAILABLE:
-                print("    Using simple yt-dlp approach...")
-                topic_videos = get_youtube_videos_simple([topic], subject)
-                if topic_videos and topic_videos[0]['video_count'] > 0:
-                    videos_for_topic = topic_videos[0]['videos']
-                else:
-                    videos_for_topic = []
-            # Fallback to enhanced yt-dlp
-            elif ENHANCED_AVAILABLE:
-                print("    Using enhanced yt-dlp approach...")
-                videos_for_topic = search_youtube_videos_enhanced(topic, subject)
-            # Last resort: basic yt-dlp
-            else:
-                print("    Using basic yt-dlp approach...")
-                videos_for_topic = search_youtube_videos(topic, ydl_opts, subject)
-            
-            # Create topic dictionary with topic name and videos
-            topic_data = {
-                'topic_name': topic,
-                'videos': videos_for_topic,
-                'video_count': len(videos_for_topic)
-            }
-            
-            all_topics_data.append(topic_data)
-            print(f"  ✓ Found {len(videos_for_topic)} videos for '{topic}'")
-            
-        except Exception as e:
-            print(f"  ✗ Error processing topic '{topic}': {str(e)}")
-            # Add empty topic data for failed topics
-            topic_data = {
-                'topic_name': topic,
-                'videos': [],
-                'video_count': 0
-            }
-            all_topics_data.append(topic_data)
-    
-    return all_topics_data
 
 
-def search_youtube_videos(topic: str, ydl_opts: Dict, subject: str = "") -> List[Dict[str, Any]]:
+def search_youtube_videos(topic: str, ydl_opts: Dict, subject: str = "", max_results: int = 5) -> List[Video]:
 
     
     # Create search query with subject prefix if provided
@@ -115,28 +81,27 @@ def search_youtube_videos(topic: str, ydl_opts: Dict, subject: str = "") -> List
         search_query = topic
     
     # YouTube search URL - gets top results for the topic
-    search_url = f"ytsearch5:{search_query}"  # ytsearch5 means get top 5 results
+    search_url = f"ytsearch{max_results}:{search_query}"  # ytsearchN means get top N results
     
     videos_info = []
     
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        try:
-            # Extract info from search results
-            search_results = ydl.extract_info(search_url, download=False)
-            
-            if 'entries' in search_results:
-                for video in search_results['entries']:
-                    if video:  # Sometimes entries can be None
-                        video_info = extract_video_details(video, ydl)
-                        videos_info.append(video_info)
-            
-        except Exception as e:
-            print(f"    Error searching for '{search_query}': {str(e)}")
+    try:
+        # Extract info from search results, paced by the shared yt-dlp rate controller
+        search_results = get_ytdlp_controller().call(extract_info_checked, ydl_opts, search_url)
+        
+        if search_results and 'entries' in search_results:
+            for video in search_results['entries']:
+                if video:  # Sometimes entries can be None
+                    video_info = extract_video_details(video, None)
+                    videos_info.append(video_info)
+        
+    except Exception as e:
+        print(f"    Error searching for '{search_query}': {str(e)}")
     
     return videos_info
 
 
-def extract_video_details(video_data: Dict, ydl: yt_dlp.YoutubeDL) -> Dict[str, Any]:
+def extract_video_details(video_data: Dict, ydl: yt_dlp.YoutubeDL = None) -> Video:
     
     # Get basic info - Fixed URL extraction for extract_flat=True mode
     video_info = {
@@ -162,16 +127,33 @@ def extract_video_details(video_data: Dict, ydl: yt_dlp.YoutubeDL) -> Dict[str,
         # Skip full video extraction to avoid format validation issues
         # This was causing "Requested format is not available" errors
         # We'll rely on basic info from the search results instead
+        # (fetch_subtitle_cues gets the selected video's captions once its topic is ranked)
         video_info['subtitles'] = 'Available (extraction disabled to prevent errors)'
             
     except Exception as e:
         print(f"    Warning: Could not extract full details for video {video_info['title'][:50]}...: {str(e)}")
         video_info['subtitles'] = 'N/A'
     
-    return video_info
+    return Video.from_raw(video_info, 'basic')
+
+
+def fetch_subtitle_cues(video_id: str) -> List:
+    """Timed (start_ms, end_ms, text) cues of one video, for the segment locator.
+
+    Flat search entries list no caption tracks, so only the video selected for a
+    topic is extracted in full, without format selection, to find them.
+    """
+    ydl_opts = {**create_basic_ydl_opts(), 'extract_flat': False, 'ignore_no_formats_error': True}
+    video_url = f"https://www.youtube.com/watch?v={video_id}"
+    video_data = get_ytdlp_controller().call(extract_info_checked, ydl_opts, video_url)
+    cues = []
+    if video_data:
+        extract_subtitles_text(video_data, cues_out=cues)
+    return cues
 
 
-def extract_subtitles_text(video_info: Dict) -> str:
+def extract_subtitles_text(video_info: Dict, cues_out: List = None) -> str:
+    """When cues_out is given, timed (start_ms, end_ms, text) cues are appended to it."""
 
     import requests
     
@@ -190,7 +172,7 @@ def extract_subtitles_text(video_info: Dict) -> str:
                 
                 # Find a suitable subtitle format and download it
                 for entry in subtitle_entries:
-                    if entry.get('url') and entry.get('ext') in ['vtt', 'srv3', 'ttml', 'json3']:
+                    if entry.get('url') and entry.get('ext') in SUPPORTED_FORMATS:
                         try:
                             # Download the subtitle file content
                             response = requests.get(entry['url'], timeout=10)
@@ -198,13 +180,7 @@ def extract_subtitles_text(video_info: Dict) -> str:
                                 subtitle_content = response.text
                                 
                                 # Parse based on format
-                                if entry.get('ext') == 'vtt':
-                                    return parse_vtt_subtitles(subtitle_content)
-                                elif entry.get('ext') == 'json3':
-                                    return parse_json3_subtitles(subtitle_content)
-                                else:
-                                    # For other formats, return raw content (cleaned)
-                                    return clean_subtitle_text(subtitle_content)
+                                return normalize_subtitles(subtitle_content, entry['ext'], cues_out=cues_out)
                                     
                         except Exception as e:
                             print(f"    Warning: Could not download subtitles from {entry.get('url')}: {str(e)}")
@@ -217,76 +193,21 @@ def extract_subtitles_text(video_info: Dict) -> str:
     return "No subtitles available"
 
 
-def parse_vtt_subtitles(vtt_content: str) -> str:
-    """Parse VTT subtitle format and extract text."""
-    lines = vtt_content.split('\n')
-    subtitle_text = []
-    
-    for line in lines:
-        line = line.strip()
-        # Skip VTT headers, timestamps, and empty lines
-        if (line and 
-            not line.startswith('WEBVTT') and 
-            not line.startswith('NOTE') and
-            not '-->' in line and
-            not line.isdigit()):
-            # Remove VTT styling tags
-            import re
-            clean_line = re.sub(r'<[^>]+>', '', line)
-            if clean_line:
-                subtitle_text.append(clean_line)
-    
-    return ' '.join(subtitle_text)
-
-
-def parse_json3_subtitles(json_content: str) -> str:
-    """Parse JSON3 subtitle format and extract text."""
-    try:
-        import json
-        data = json.loads(json_content)
-        
-        subtitle_text = []
-        if 'events' in data:
-            for event in data['events']:
-                if 'segs' in event:
-                    for seg in event['segs']:
-                        if 'utf8' in seg:
-                            subtitle_text.append(seg['utf8'])
-        
-        return ' '.join(subtitle_text)
-    except:
-        return clean_subtitle_text(json_content)
-
-
-def clean_subtitle_text(raw_content: str) -> str:
-    """Clean raw subtitle content by removing timestamps and formatting."""
-    import re
-    
-    # Remove common timestamp patterns
-    content = re.sub(r'\d{2}:\d{2}:\d{2}[.,]\d{3}\s*-->\s*\d{2}:\d{2}:\d{2}[.,]\d{3}', '', raw_content)
-    content = re.sub(r'\d+\s*\n', '', content)  # Remove sequence numbers
-    content = re.sub(r'<[^>]+>', '', content)    # Remove HTML/XML tags
-    content = re.sub(r'\n+', ' ', content)       # Replace multiple newlines with space
-    content = re.sub(r'\s+', ' ', content)       # Replace multiple spaces with single space
-    
-    return content.strip()
-
-
-def print_videos_data(videos_data: List[Dict[str, Any]]) -> None:
+def print_videos_data(videos_data: List[TopicCandidates]) -> None:
 
     
     print("\n" + "="*80)
     print("YOUTUBE VIDEOS DATA FOR ALL TOPICS")
     print("="*80)
     
-    total_videos = sum(topic_data['video_count'] for topic_data in videos_data)
+    total_videos = sum(topic_data.video_count for topic_data in videos_data)
     print(f"Total Topics: {len(videos_data)}")
     print(f"Total Videos: {total_videos}")
     
     for topic_num, topic_data in enumerate(videos_data, 1):
-        topic_name = topic_data['topic_name']
-        videos = topic_data['videos']
-        video_count = topic_data['video_count']
+        topic_name = topic_data.topic_name
+        videos = topic_data.videos
+        video_count = topic_data.video_count
         
         print(f"\n{'-'*60}")
         print(f"TOPIC {topic_num}: {topic_name.upper()}")
@@ -295,22 +216,17 @@ def print_videos_data(videos_data: List[Dict[str, Any]]) -> None:
         
         for video_num, video in enumerate(videos, 1):
             print(f"\n  VIDEO {video_num}:")
-            print(f"    Title: {video['title']}")
-            print(f"    Channel: {video['channel']}")
-            print(f"    Views: {video['view_count']:,}" if video['view_count'] else "    Views: N/A")
-            print(f"    Likes: {video['like_count']:,}" if video['like_count'] else "    Likes: N/A")
-            print(f"    Duration: {video['duration']} seconds" if video['duration'] else "    Duration: N/A")
-            print(f"    Upload Date: {video['upload_date']}")
-            print(f"    URL: {video['url']}")
+            print(f"    Title: {video.title}")
+            print(f"    Channel: {video.channel or 'N/A'}")
+            print(f"    Views: {video.view_count:,}" if video.view_count else "    Views: N/A")
+            print(f"    Likes: {video.like_count:,}" if video.like_count else "    Likes: N/A")
+            print(f"    Duration: {video.duration} seconds" if video.duration else "    Duration: N/A")
+            print(f"    Upload Date: {video.upload_date or 'N/A'}")
+            print(f"    URL: {video.url}")
             
             # Print complete description
-            description = video['description']
-            if description and description != 'N/A':
-                print(f"    Description: {description}")
-            else:
-                print(f"    Description: N/A")
-            
-            print(f"    Subtitles: {video['subtitles']}")
+            print(f"    Description: {video.description or 'N/A'}")
+            print(f"    Subtitles: {video.subtitles or 'N/A'}")
 
 
 # Example usage and test function
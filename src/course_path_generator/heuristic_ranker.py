@@ -0,0 +1,173 @@
+"""
+Local heuristic ranking of a topic's candidate videos.
+
+Candidates are scored together in one NumPy pass over five features: title/topic
+keyword overlap, log views, like ratio, duration fit for the difficulty level and
+recency. When the best candidate beats the runner-up by HEURISTIC_BYPASS_MARGIN,
+the selection is built locally and the Gemini analysis is skipped. A sampled
+share of those bypasses is still sent to Gemini in shadow to measure agreement.
+"""
+import os
+import random
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from .segment_locator import extract_keywords, find_selected_video
+from .video_record import Video
+
+# Feature weights: title match, views, like ratio, duration fit, recency
+FEATURE_WEIGHTS = np.array([0.45, 0.15, 0.15, 0.15, 0.10])
+
+# Preferred video length (seconds) per difficulty level
+DIFFICULTY_DURATION = {
+    'beginner': (5 * 60, 20 * 60),
+    'intermediate': (10 * 60, 40 * 60),
+    'advanced': (15 * 60, 60 * 60),
+}
+# A like ratio this high (likes / views) already counts as excellent
+EXCELLENT_LIKE_RATIO = 0.04
+# Recency decays with this time constant (years)
+RECENCY_YEARS = 5.0
+# Without at least this title overlap the heuristic never decides on its own
+MIN_TITLE_MATCH = 0.5
+
+heuristic_stats = {'evaluated': 0, 'bypassed': 0, 'shadowSamples': 0, 'shadowAgreements': 0}
+_stats_lock = threading.Lock()
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return None  # 'off' or anything unparsable disables the feature
+
+
+def get_bypass_margin() -> Optional[float]:
+    """HEURISTIC_BYPASS_MARGIN: score lead needed to skip Gemini (default 0.25, 'off' disables)."""
+    return _env_float('HEURISTIC_BYPASS_MARGIN', 0.25)
+
+
+def get_shadow_rate() -> float:
+    """HEURISTIC_SHADOW_RATE: share of bypassed topics still sent to Gemini for comparison."""
+    return _env_float('HEURISTIC_SHADOW_RATE', 0.1) or 0.0
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        heuristic_stats[key] += 1
+
+
+def _upload_age_years(upload_date: str, now: datetime) -> float:
+    """Age of a 'YYYYMMDD' (yt-dlp) or ISO 'YYYY-MM-DD...' (Data API) upload date, NaN if unknown."""
+    digits = (upload_date or '')[:10].replace('-', '')
+    try:
+        uploaded = datetime.strptime(digits[:8], '%Y%m%d')
+    except ValueError:
+        return float('nan')
+    return max(0.0, (now - uploaded).days / 365.25)
+
+
+def candidate_features(topic_name: str, subject: str, videos: List[Any], difficulty_level: str,
+                       now: Optional[datetime] = None) -> np.ndarray:
+    """(n_videos, 5) matrix of features in [0, 1], in FEATURE_WEIGHTS order."""
+    now = now or datetime.now()
+    videos = [Video.from_raw(video, 'unknown') for video in videos]
+    keywords = set(extract_keywords(topic_name)) or set(extract_keywords(subject))
+
+    title_match = np.array([
+        len(keywords & set(extract_keywords(video.title))) / len(keywords) if keywords else 0.0
+        for video in videos
+    ])
+    views = np.array([video.view_count for video in videos], dtype=np.float64)
+    likes = np.array([video.like_count for video in videos], dtype=np.float64)
+    durations = np.array([video.duration for video in videos], dtype=np.float64)
+    ages = np.array([_upload_age_years(video.upload_date, now) for video in videos])
+
+    view_score = np.clip(np.log10(views + 1) / 7, 0, 1)
+    like_ratio = np.divide(likes, views, out=np.zeros_like(likes), where=views > 0)
+    like_score = np.clip(like_ratio / EXCELLENT_LIKE_RATIO, 0, 1)
+
+    low, high = DIFFICULTY_DURATION.get((difficulty_level or '').lower(), DIFFICULTY_DURATION['intermediate'])
+    safe = np.maximum(durations, 1)
+    duration_score = np.where(
+        durations <= 0, 0.5,
+        np.where(durations < low, safe / low, np.where(durations > high, high / safe, 1.0))
+    )
+
+    recency_score = np.where(np.isnan(ages), 0.5, np.exp(-np.nan_to_num(ages) / RECENCY_YEARS))
+
+    return np.column_stack([title_match, view_score, like_score, duration_score, recency_score])
+
+
+def score_candidates(topic_name: str, subject: str, videos: List[Any], difficulty_level: str) -> np.ndarray:
+    return candidate_features(topic_name, subject, videos, difficulty_level) @ FEATURE_WEIGHTS
+
+
+def heuristic_selection(topic_name: str, subject: str, videos: List[Any], difficulty_level: str,
+                        margin: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """A selectedVideo analysis when one candidate clearly dominates, else None."""
+    margin = get_bypass_margin() if margin is None else margin
+    if margin is None or not videos:
+        return None
+
+    features = candidate_features(topic_name, subject, videos, difficulty_level)
+    scores = features @ FEATURE_WEIGHTS
+    order = np.argsort(-scores, kind='stable')
+    best = int(order[0])
+    lead = scores[best] - (scores[order[1]] if len(order) > 1 else 0.0)
+    if features[best, 0] < MIN_TITLE_MATCH or lead < margin:
+        return None
+
+    video = Video.from_raw(videos[best], 'unknown')
+    reason = (f"Local ranking: {features[best, 0]:.0%} title match, {video.view_count:,} views, "
+              f"{video.duration // 60} min, leads next candidate by {lead:.2f}")
+    # No start/end times: the segment locator fills them from transcript and chapters
+    return {
+        'selectedVideo': {
+            'videoNumber': best + 1,
+            'youtubeUrl': video.url,
+            'title': video.title,
+            'reason': reason[:200],
+            'contentQuality': 'high' if features[best, 0] >= 1.0 else 'medium',
+            'relevanceScore': int(round(100 * scores[best])),
+            'selectionSource': 'heuristic',
+        }
+    }
+
+
+def select_or_defer(topic_name: str, subject: str, videos: List[Any], difficulty_level: str,
+                    analyze_with_gemini) -> Optional[Dict[str, Any]]:
+    """Use the heuristic selection when it is decisive, otherwise (or in shadow) ask Gemini."""
+    _count('evaluated')
+    local = heuristic_selection(topic_name, subject, videos, difficulty_level)
+    if local is None:
+        return analyze_with_gemini(topic_name, videos, subject, difficulty_level)
+
+    if random.random() < get_shadow_rate():
+        gemini = analyze_with_gemini(topic_name, videos, subject, difficulty_level)
+        if gemini:
+            _count('shadowSamples')
+            gemini_pick = find_selected_video(gemini.get('selectedVideo') or {}, videos)
+            if gemini_pick is videos[local['selectedVideo']['videoNumber'] - 1]:
+                _count('shadowAgreements')
+            print("    🔍 Shadow comparison recorded, keeping Gemini's analysis")
+            return gemini
+
+    _count('bypassed')
+    print(f"    ⚡ Skipped Gemini: {local['selectedVideo']['reason']}")
+    return local
+
+
+def get_heuristic_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(heuristic_stats)
+    stats['bypassRate'] = stats['bypassed'] / stats['evaluated'] if stats['evaluated'] else None
+    stats['shadowAgreementRate'] = (stats['shadowAgreements'] / stats['shadowSamples']
+                                    if stats['shadowSamples'] else None)
+    return stats
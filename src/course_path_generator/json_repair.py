@@ -0,0 +1,169 @@
+"""
+Tolerant JSON extraction and repair for model responses.
+
+Even in JSON response mode a model occasionally wraps its answer in prose or a
+code fence, leaves a trailing comma, or gets cut off before the closing braces.
+Those responses are repaired locally instead of paying for another API call.
+"""
+import re
+import json
+import threading
+from typing import Dict, Any
+
+from .subtitle_normalizer import timestamp_to_ms
+
+FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+PYTHON_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+CURLY_QUOTES = '“”'
+CONTENT_QUALITIES = ('high', 'medium', 'low')
+
+repair_stats = {'parsed': 0, 'repaired': 0, 'unrecoverable': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        repair_stats[key] += 1
+
+
+def extract_json_object(text: str) -> str:
+    """The first balanced {...} in text, closing any braces a truncated response left open."""
+    fenced = FENCE_PATTERN.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find('{')
+    if start < 0:
+        raise ValueError("no JSON object in response")
+
+    closers = []
+    in_string = escaped = False
+    for position in range(start, len(text)):
+        char = text[position]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            closers.append('}' if char == '{' else ']')
+        elif char in '}]' and closers:
+            closers.pop()
+            if not closers:
+                return text[start:position + 1]
+
+    # Truncated: close the open string and containers in order
+    return text[start:].rstrip().rstrip(',') + ('"' if in_string else '') + ''.join(reversed(closers))
+
+
+def _repair_outside_strings(segment: str) -> str:
+    segment = TRAILING_COMMA_PATTERN.sub(r'\1', segment)
+    for literal, replacement in PYTHON_LITERALS.items():
+        segment = re.sub(rf'(?<=[:\[,\s]){literal}(?=\s*[,}}\]])', replacement, segment)
+    return segment
+
+
+def _closes_curly_string(text: str, position: int) -> bool:
+    """A curly quote ends a curly-quoted string only where JSON expects a delimiter next."""
+    rest = text[position + 1:].lstrip()
+    return not rest or rest[0] in ':,}]'
+
+
+def _repair(candidate: str) -> str:
+    """Fix trailing commas, Python literals and curly-quote delimiters, leaving string contents alone."""
+    repaired, segment = [], []
+    in_string = escaped = curly = False
+    for position, char in enumerate(candidate):
+        if not in_string:
+            if char in CURLY_QUOTES or char == '"':
+                repaired.append(_repair_outside_strings(''.join(segment)) + '"')
+                segment = []
+                in_string, curly = True, char != '"'
+            else:
+                segment.append(char)
+        elif escaped:
+            escaped = False
+            repaired.append(char)
+        elif char == '\\':
+            escaped = True
+            repaired.append(char)
+        elif char == '"':
+            # A straight quote inside a curly-quoted string is content
+            repaired.append('\\"' if curly else '"')
+            in_string = curly
+        elif curly and char in CURLY_QUOTES and _closes_curly_string(candidate, position):
+            repaired.append('"')
+            in_string = False
+        else:
+            repaired.append(char)
+    repaired.append(_repair_outside_strings(''.join(segment)))
+    return ''.join(repaired)
+
+
+def loads_tolerant(text: str) -> Any:
+    """json.loads, falling back to extraction and repair; raises ValueError when unrecoverable."""
+    try:
+        result = json.loads(text)
+        _count('parsed')
+        return result
+    except ValueError:
+        pass
+    try:
+        result = json.loads(_repair(extract_json_object(text)))
+    except ValueError as e:
+        _count('unrecoverable')
+        raise ValueError(f"unrecoverable JSON: {e}") from None
+    _count('repaired')
+    return result
+
+
+def _as_int(value: Any) -> Any:
+    """Coerce '95', '95%', 95.0 or 'Video 2' to an int; anything else is left as is."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        digits = re.search(r'-?\d+(?:\.\d+)?', value)
+        if digits:
+            return int(float(digits.group()))
+    return value
+
+
+def _as_ms(value: Any) -> Any:
+    """Times given as '1:30' or '00:01:30' are converted to milliseconds."""
+    if isinstance(value, str) and ':' in value:
+        try:
+            return timestamp_to_ms(value.strip())
+        except ValueError:
+            return value
+    return _as_int(value)
+
+
+def coerce_selected_video(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Bring a selectedVideo's fields to the types the rest of the pipeline expects."""
+    selected = analysis.get('selectedVideo') if isinstance(analysis, dict) else None
+    if not isinstance(selected, dict):
+        return analysis
+    for key in ('videoNumber', 'relevanceScore'):
+        if key in selected:
+            selected[key] = _as_int(selected[key])
+    for key in ('startTimeMs', 'endTimeMs'):
+        if key in selected:
+            selected[key] = _as_ms(selected[key])
+    if isinstance(selected.get('relevanceScore'), int):
+        selected['relevanceScore'] = max(0, min(100, selected['relevanceScore']))
+    quality = str(selected.get('contentQuality', '')).strip().lower()
+    selected['contentQuality'] = quality if quality in CONTENT_QUALITIES else 'medium'
+    if isinstance(selected.get('reason'), str):
+        selected['reason'] = selected['reason'][:200]
+    return analysis
+
+
+def get_repair_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(repair_stats)
@@ -2,91 +2,186 @@
 
 import json
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Callable
 
 # Import our custom modules
 from src.course_path_generator.get_topics import generate_learning_topics
-from src.course_path_generator.get_youtube_videos import get_youtube_videos_for_topics, print_videos_data
+from src.course_path_generator.get_youtube_videos import (
+    get_youtube_videos_for_topics, print_videos_data, fetch_subtitle_cues
+)
 from src.course_path_generator.create_course_path import create_course_path, print_course_path
 
 
-def fetch_and_analyze_topics_individually(topics: list[str], subject: str, difficulty_level: str) -> list[Dict[str, Any]]:
+def get_topic_search(latency_critical: bool = False, transcripts: bool = True) -> Callable:
+    """The search used for each topic: the backend selector, or race mode for latency-critical jobs.
 
+    transcripts=False gives a search that skips transcript downloads (used close to the deadline).
+    """
+    from functools import partial
+    from src.course_path_generator.video_search_backends import get_backend_selector
+    from src.course_path_generator.search_race import race_search
+
+    if not transcripts:
+        return partial(get_backend_selector().search, transcripts=False)
+    # Latency-critical jobs race the Data API against yt-dlp; the rest go to the fastest healthy backend
+    return race_search if latency_critical else get_backend_selector().search
+
+
+def analyze_single_topic(topic: str, index: int, subject: str, difficulty_level: str,
+                         search: Callable, registry, degradation: int = 0) -> Optional[Dict[str, Any]]:
+    """Fetch, select and structure one topic's video; None when nothing could be selected.
+
+    Runs the course pipeline's topic stages (see pipeline.py) for a single topic.
+    degradation is a level from src.course_path_generator.deadline: fewer candidates
+    without widening from FEWER_CANDIDATES, local ranking from HEURISTIC_RANKING.
+    """
+    from src.course_path_generator.pipeline import TopicWork, PipelineContext, CoursePipeline, default_topic_stages
+
+    context = PipelineContext(subject, difficulty_level, search=search, registry=registry,
+                              fetch_cues=fetch_subtitle_cues)
+    for work in CoursePipeline(default_topic_stages()).run([TopicWork(index, topic, level=degradation)], context):
+        return work.structure
+    return None
+
+
+def _search_for_level(search: Callable, level: int, latency_critical: bool) -> Callable:
+    from src.course_path_generator.deadline import SKIP_TRANSCRIPTS
+    return get_topic_search(latency_critical, transcripts=False) if level >= SKIP_TRANSCRIPTS else search
+
+
+def fetch_and_analyze_topics_individually(topics: list[str], subject: str, difficulty_level: str,
+                                          latency_critical: bool = False, checkpoint=None,
+                                          on_topic_done: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                          deadline=None) -> list[Dict[str, Any]]:
+    """Fetch and analyze each topic in turn, through the course pipeline (see pipeline.py).
+
+    With a checkpoint (see src.db.generation_jobs), topics it already holds are
+    reused instead of fetched and analyzed again, and each new one is recorded.
+    on_topic_done receives every topic structure in course order, restored ones
+    included, so it must tolerate seeing a topic again after a resume.
+    With a deadline (see src.course_path_generator.deadline), topics get cheaper
+    as it approaches; past the last threshold they are left as outline topics.
+    """
+
+    from src.course_path_generator.video_registry import video_registry_scope
+    from src.course_path_generator.pipeline import TopicWork, PipelineContext, course_pipeline
     
-    # Import required modules
-    from src.course_path_generator.get_youtube_videos import search_youtube_videos
-    from src.course_path_generator.create_course_path import analyze_topic_videos_with_gemini_fallback, create_topic_structure
-    import os
-    
-    # We no longer need to configure Gemini API here since the fallback function handles it
-    
-    # Configure yt-dlp options for video fetching with anti-detection
-    ydl_opts = {
-        'quiet': True,
-        'no_warnings': True,
-        'extract_flat': True,  # Only get basic info, don't process formats
-        'skip_download': True,
-        'ignoreerrors': True,  # Continue on errors
-        'no_check_certificate': True,  # Bypass SSL issues
-        
-        # Anti-detection measures
-        'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'referer': 'https://www.youtube.com/',
-        'headers': {
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-us,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Accept-Charset': 'ISO-8859-1,utf-8;q=0.7,*;q=0.7',
-            'Keep-Alive': '300',
-            'Connection': 'keep-alive',
-        },
-        'sleep_interval': 1,
-        'max_sleep_interval': 5,
-        'retries': 2,  # Reduced retries
-        'fragment_retries': 1,  # Reduced fragment retries
-        'noplaylist': True,
-        # Removed 'format': 'best' to avoid validation errors
-    }
-    
-    analyzed_topics = []
+    search = get_topic_search(latency_critical)
+
+    def works():
+        for i, topic in enumerate(topics, 1):
+            work = TopicWork(i, topic, len(topics))
+            if checkpoint is not None and i in checkpoint.done:
+                # Finished before a restart: no fetch, no analysis, no quota
+                print(f"\n  [{i}/{len(topics)}] Restored from checkpoint: '{topic}'")
+                work.restored = True
+                work.finish(checkpoint.done[i])
+            yield work
     
-    for i, topic in enumerate(topics, 1):
-        print(f"\n  [{i}/{len(topics)}] Processing: '{topic}'")
-        
-        try:
-            # Step A: Fetch 5 videos for this topic
-            print(f"    🎥 Fetching videos...")
-            videos_for_topic = search_youtube_videos(topic, ydl_opts, subject)
-            print(f"    ✅ Found {len(videos_for_topic)} videos")
-            
-            if not videos_for_topic:
-                print(f"    ⚠️ No videos found for '{topic}', skipping...")
+    # One registry per course: videos shared between topics are extracted and described once
+    with video_registry_scope() as registry:
+        context = PipelineContext(
+            subject, difficulty_level, search=search, registry=registry, deadline=deadline,
+            transcript_free_search=lambda: get_topic_search(latency_critical, transcripts=False),
+            checkpoint=checkpoint, on_topic_done=on_topic_done, fetch_cues=fetch_subtitle_cues,
+        )
+        return [work.structure for work in course_pipeline().run(works(), context) if work.structure]
+
+
+def create_course_outline(subject: str, difficulty_level: str) -> Dict[str, Any]:
+    """Generate only the topic list (a few seconds); every topic's video is still pending."""
+    from src.course_path_generator.create_course_path import create_outline_topic_structure
+
+    print(f"📝 Creating course outline for '{subject}' ({difficulty_level})")
+    try:
+        start_time = time.time()
+        topics = generate_learning_topics(subject, difficulty_level)
+        print(f"✅ Generated {len(topics)} topics in {time.time() - start_time:.2f} seconds")
+
+        course_id = f"course-{str(__import__('uuid').uuid4())}"
+        return {
+            "success": True,
+            "data": {
+                "coursePath": {
+                    "id": course_id,
+                    "title": f"{subject} Learning Path",
+                    "description": f"A step-by-step learning path for mastering {subject} at {difficulty_level} level.",
+                    "targetLevel": difficulty_level.lower()
+                },
+                "topics": [create_outline_topic_structure(topic, i) for i, topic in enumerate(topics, 1)]
+            }
+        }
+    except Exception as e:
+        print(f"\n❌ Error creating course outline: {str(e)}")
+        return {
+            "success": False,
+            "error": str(e),
+            "data": None
+        }
+
+
+def fill_course_outline(outline_topics: List[Dict[str, Any]], subject: str, difficulty_level: str,
+                        on_topic_done: Callable[[Dict[str, Any]], None], latency_critical: bool = False,
+                        claim: Optional[Callable[[Dict[str, Any]], bool]] = None, deadline=None,
+                        release: Optional[Callable[[Dict[str, Any]], None]] = None) -> int:
+    """Select videos for an outline's pending topics, reporting each one as soon as it is done.
+
+    Each finished topic keeps its outline id, name and prerequisites and gets
+    videoStatus 'ready', or 'failed' when no video could be selected. With a
+    claim function, topics it refuses (already claimed elsewhere) are skipped,
+    and release is called for a claimed topic whose result could not be stored.
+    With a deadline, topics get cheaper as it approaches and past its last
+    threshold stay pending, to be resolved on first access.
+    Returns how many topics became ready.
+    """
+    from src.course_path_generator.video_registry import video_registry_scope
+    from src.course_path_generator.deadline import FULL, OUTLINE_ONLY
+
+    search = get_topic_search(latency_critical)
+    ready = 0
+    with video_registry_scope() as registry:
+        for i, outline_topic in enumerate(outline_topics, 1):
+            if outline_topic.get("videoStatus") != "pending":
                 continue
-            
-            # Step B: Immediately analyze these videos with Gemini
-            print(f"    🧠 Analyzing with Gemini...")
-            best_video_analysis = analyze_topic_videos_with_gemini_fallback(
-                topic, videos_for_topic, subject, difficulty_level
-            )
-            
-            if best_video_analysis:
-                # Step C: Create topic structure
-                topic_structure = create_topic_structure(
-                    topic, best_video_analysis, i
-                )
-                analyzed_topics.append(topic_structure)
-                print(f"    ✅ Successfully analyzed '{topic}'")
-            else:
-                print(f"    ❌ Failed to analyze '{topic}'")
-                
-        except Exception as e:
-            print(f"    ❌ Error processing topic '{topic}': {str(e)}")
-            continue
-    
-    return analyzed_topics
+            level = deadline.level() if deadline else FULL
+            if level >= OUTLINE_ONLY:
+                print(f"    ⏳ Out of time, leaving the remaining topics pending")
+                break
+            if claim is not None and not claim(outline_topic):
+                continue
+            level = deadline.next_level() if deadline else FULL
+            topic = outline_topic["name"]
+            print(f"\n  [{i}/{len(outline_topics)}] Filling: '{topic}'")
+            stored = False
+            try:
+                try:
+                    analyzed = analyze_single_topic(topic, i, subject, difficulty_level,
+                                                    _search_for_level(search, level, latency_critical), registry, level)
+                except Exception as e:
+                    print(f"    ❌ Error processing topic '{topic}': {str(e)}")
+                    analyzed = None
 
+                if analyzed:
+                    filled = {**analyzed, "id": outline_topic["id"],
+                              "prerequisites": outline_topic.get("prerequisites", []), "videoStatus": "ready"}
+                else:
+                    filled = {**outline_topic, "videoStatus": "failed"}
+                on_topic_done(filled)
+                stored = True
+                ready += int(bool(analyzed))
+            except Exception as e:
+                print(f"    ❌ Could not store topic '{topic}': {str(e)}")
+            finally:
+                # Never leave a claim behind for a topic nobody is resolving any more
+                if not stored and release is not None:
+                    release(outline_topic)
+    return ready
 
-def create_complete_course(subject: str, difficulty_level: str) -> Dict[str, Any]:
+
+def create_complete_course(subject: str, difficulty_level: str, latency_critical: bool = False,
+                           checkpoint=None, course_id: Optional[str] = None,
+                           on_topic_done: Optional[Callable[[Dict[str, Any]], None]] = None,
+                           deadline=None) -> Dict[str, Any]:
    
     
     print("🚀 Starting Complete Course Creation Process")
@@ -101,7 +196,13 @@ def create_complete_course(subject: str, difficulty_level: str) -> Dict[str, Any
         print("-" * 40)
         
         start_time = time.time()
-        topics = generate_learning_topics(subject, difficulty_level)
+        if checkpoint is not None and checkpoint.topics:
+            topics = checkpoint.topics
+            print(f"♻️ Resuming with {len(topics)} checkpointed topics ({len(checkpoint.done)} already analyzed)")
+        else:
+            topics = generate_learning_topics(subject, difficulty_level)
+            if checkpoint is not None:
+                checkpoint.record_topics(topics)
         step1_time = time.time() - start_time
         
         print(f"✅ Generated {len(topics)} topics in {step1_time:.2f} seconds")
@@ -114,14 +215,16 @@ def create_complete_course(subject: str, difficulty_level: str) -> Dict[str, Any
         print("-" * 50)
         
         start_time = time.time()
-        analyzed_topics = fetch_and_analyze_topics_individually(topics, subject, difficulty_level)
+        analyzed_topics = fetch_and_analyze_topics_individually(topics, subject, difficulty_level, latency_critical,
+                                                                checkpoint=checkpoint, on_topic_done=on_topic_done,
+                                                                deadline=deadline)
         step2_time = time.time() - start_time
         
         total_analyzed = len(analyzed_topics)
         print(f"✅ Fetched and analyzed {total_analyzed} topics in {step2_time:.2f} seconds")
         
         # Create final course path structure
-        course_id = f"course-{str(__import__('uuid').uuid4())}"
+        course_id = course_id or f"course-{str(__import__('uuid').uuid4())}"
         course_path = {
             "success": True,
             "data": {
@@ -134,6 +237,8 @@ def create_complete_course(subject: str, difficulty_level: str) -> Dict[str, Any
                 "topics": analyzed_topics
             }
         }
+        if deadline is not None:
+            course_path["data"]["coursePath"]["degradation"] = deadline.summary()
         print(f"✅ Analyzed and created course path with {total_analyzed} topics in {step2_time:.2f} seconds")
         
         # Summary
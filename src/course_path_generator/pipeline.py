@@ -0,0 +1,368 @@
+"""
+Stage-based course generation pipeline.
+
+A course is a stream of TopicWork items pushed through a list of stages:
+
+    plan -> search -> enrich -> rank -> locate -> build -> persist
+
+Both flows are configurations of the same engine: create_complete_course feeds
+generated (or checkpointed) topic names and lets the search stage fetch their
+candidates, create_course_path feeds topics whose candidates were fetched
+beforehand, so the search stage has nothing to do.
+
+Every stage has its own concurrency (workers > 1 runs it ahead of the next stage
+on a thread pool, results stay in course order), an optional LRU cache of the
+field it produces, and timing hooks. Timings and errors per stage are available
+from get_pipeline_stats(). Searches themselves run on the process-wide search
+bulkhead (see bulkheads.py), which caps them across all courses.
+
+PIPELINE_SEARCH_WORKERS: topics searched ahead of the one being ranked (default 4 when the
+    YouTube Data API backend is configured, so their details lookups are batched; else 1).
+    Each of them holds its candidate set, so runs over a single topic or over candidates
+    fetched beforehand (create_course_path) use one worker and keep one topic in memory.
+PIPELINE_SEARCH_CACHE_SIZE: searches kept per process for identical queries (default 0, off)
+"""
+import os
+import time
+import threading
+import contextvars
+from functools import partial
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Callable, Iterable, Iterator, Hashable
+
+from .create_course_path import (
+    select_best_video, select_best_video_locally, create_topic_structure, create_outline_topic_structure
+)
+from .deadline import FULL, FEWER_CANDIDATES, SKIP_TRANSCRIPTS, HEURISTIC_RANKING, OUTLINE_ONLY, REDUCED_FAN_OUT
+from .fan_out import get_initial_fan_out, select_with_fan_out
+from .segment_locator import apply_segment_locator
+from .bulkheads import run_in_bulkhead
+from .video_record import Video
+
+pipeline_stats: Dict[str, Dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+
+@dataclass
+class TopicWork:
+    """One topic on its way through the pipeline."""
+
+    index: int
+    name: str
+    total: Optional[int] = None
+    level: int = FULL
+    videos: Optional[List[Video]] = None  # None until searched
+    analysis: Optional[Dict[str, Any]] = None
+    structure: Optional[Dict[str, Any]] = None
+    done: bool = False  # Later stages are skipped, except those that run on finished work
+    restored: bool = False  # Finished in an earlier run, taken from a checkpoint
+    error: Optional[str] = None
+
+    def finish(self, structure: Optional[Dict[str, Any]] = None) -> None:
+        self.structure = structure
+        self.done = True
+
+
+@dataclass
+class PipelineContext:
+    """What the stages of one course run share."""
+
+    subject: str
+    difficulty_level: str
+    search: Optional[Callable] = None
+    registry: Any = None
+    deadline: Any = None
+    # Zero-argument factory for a search that skips transcript downloads
+    transcript_free_search: Optional[Callable[[], Callable]] = None
+    # fetch_cues(video_id): timed captions of a selected video that was found without them
+    fetch_cues: Optional[Callable[[str], List]] = None
+    checkpoint: Any = None
+    on_topic_done: Optional[Callable[[Dict[str, Any]], None]] = None
+
+    def search_for(self, level: int) -> Optional[Callable]:
+        """The search to use for a topic at this degradation level."""
+        if level >= SKIP_TRANSCRIPTS and self.transcript_free_search is not None:
+            return self.transcript_free_search()
+        return self.search
+
+
+class LRUCache:
+    """A small thread-safe least-recently-used mapping."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key: Hashable, value) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+class Stage:
+    """A named step applied to every TopicWork.
+
+    run(work, context) updates the work in place. With cache_key and
+    cached_field, the field run() produces is remembered per key in an LRU of
+    cache_size entries and later works with the same key skip run().
+    """
+
+    def __init__(self, name: str, run: Callable[[TopicWork, PipelineContext], None], workers: int = 1,
+                 runs_on_done: bool = False, cache_key: Optional[Callable[[TopicWork, PipelineContext], Hashable]] = None,
+                 cached_field: Optional[str] = None, cache_size: int = 0):
+        self.name = name
+        self.run = run
+        self.workers = max(1, workers)
+        self.runs_on_done = runs_on_done
+        self.cache_key = cache_key
+        self.cached_field = cached_field
+        self.cache = LRUCache(cache_size) if cache_size > 0 and cache_key and cached_field else None
+
+
+def _record(stage_name: str, seconds: float, error: bool, cached: bool) -> None:
+    with _stats_lock:
+        stats = pipeline_stats.setdefault(stage_name, {'calls': 0, 'errors': 0, 'cacheHits': 0, 'seconds': 0.0})
+        stats['calls'] += 1
+        stats['errors'] += int(error)
+        stats['cacheHits'] += int(cached)
+        stats['seconds'] += seconds
+
+
+class CoursePipeline:
+    """Runs TopicWork items through a list of stages, yielding them in course order.
+
+    hooks are called as hook(stage_name, work, seconds) after every stage run.
+    An exception in a stage finishes that topic with its error; the course goes on.
+    max_workers caps every stage's workers, i.e. how many topics run ahead of the consumer.
+    """
+
+    def __init__(self, stages: List[Stage], hooks: Optional[List[Callable[[str, TopicWork, float], None]]] = None,
+                 max_workers: Optional[int] = None):
+        self.stages = stages
+        self.hooks = hooks or []
+        self.max_workers = max_workers
+
+    def _apply(self, stage: Stage, work: TopicWork, context: PipelineContext) -> TopicWork:
+        if work.done and not stage.runs_on_done:
+            return work
+        start_time = time.time()
+        cached = error = False
+        try:
+            key = stage.cache_key(work, context) if stage.cache is not None else None
+            value = stage.cache.get(key) if key is not None else None
+            if value:
+                setattr(work, stage.cached_field, value)
+                cached = True
+            else:
+                stage.run(work, context)
+                if key is not None and getattr(work, stage.cached_field):
+                    stage.cache.put(key, getattr(work, stage.cached_field))
+        except Exception as e:
+            error = True
+            print(f"    ❌ Error processing topic '{work.name}' ({stage.name}): {str(e)}")
+            work.error = str(e)
+            work.finish(None)
+        seconds = time.time() - start_time
+        _record(stage.name, seconds, error, cached)
+        for hook in self.hooks:
+            hook(stage.name, work, seconds)
+        return work
+
+    def _stage_stream(self, stage: Stage, works: Iterator[TopicWork], context: PipelineContext,
+                      workers: int, executor: Optional[ThreadPoolExecutor]) -> Iterator[TopicWork]:
+        if executor is None:
+            for work in works:
+                yield self._apply(stage, work, context)
+            return
+        # Keep up to workers topics in flight ahead of the consumer, in order
+        pending = deque()
+        for work in works:
+            pending.append(executor.submit(contextvars.copy_context().run, self._apply, stage, work, context))
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def _workers(self, stage: Stage, works: Iterable[TopicWork]) -> int:
+        workers = stage.workers if self.max_workers is None else min(stage.workers, max(1, self.max_workers))
+        # No threads for topics that are not there
+        return min(workers, max(1, len(works))) if hasattr(works, '__len__') else workers
+
+    def run(self, works: Iterable[TopicWork], context: PipelineContext) -> Iterator[TopicWork]:
+        workers = [self._workers(stage, works) for stage in self.stages]
+        executors = [ThreadPoolExecutor(max_workers=count, thread_name_prefix=f"pipeline-{stage.name}")
+                     if count > 1 else None for stage, count in zip(self.stages, workers)]
+        try:
+            stream: Iterator[TopicWork] = iter(works)
+            for stage, count, executor in zip(self.stages, workers, executors):
+                stream = self._stage_stream(stage, stream, context, count, executor)
+            yield from stream
+        finally:
+            for executor in executors:
+                if executor is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Stages of the default course pipeline
+
+def plan_stage(work: TopicWork, context: PipelineContext) -> None:
+    """Announce the topic and pick its degradation level; out of time it stays an outline topic."""
+    print(f"\n  [{work.index}/{work.total or '?'}] Processing: '{work.name}'")
+    if context.deadline is not None:
+        work.level = context.deadline.next_level()
+    if work.level >= OUTLINE_ONLY:
+        # The video is resolved when the topic is first opened
+        work.finish(create_outline_topic_structure(work.name, work.index))
+
+
+def search_stage(work: TopicWork, context: PipelineContext) -> None:
+    """Fetch the first few candidates (select_with_fan_out fetches more only for topics that need it)."""
+    if work.videos is None:
+        fan_out = get_initial_fan_out(context.difficulty_level)
+        if work.level >= FEWER_CANDIDATES:
+            fan_out = min(fan_out, REDUCED_FAN_OUT)
+        print(f"    🎥 Fetching videos...")
+        work.videos = run_in_bulkhead('search', context.search_for(work.level), work.name, context.subject, fan_out)
+        print(f"    ✅ Found {len(work.videos)} videos")
+    if not work.videos:
+        print(f"    ⚠️ No videos found for '{work.name}', skipping...")
+        work.finish(None)
+
+
+def search_cache_key(work: TopicWork, context: PipelineContext) -> Hashable:
+    return (context.subject.lower(), work.name.lower(), context.difficulty_level, work.level)
+
+
+def _through_registry(registry, videos: List[Video]) -> List[Video]:
+    return registry.filter_overused(registry.register_all(videos))
+
+
+def enrich_stage(work: TopicWork, context: PipelineContext) -> None:
+    """Share records with earlier topics; optionally keep a video from being picked too often."""
+    if context.registry is not None:
+        work.videos = _through_registry(context.registry, work.videos)
+
+
+def rank_stage(work: TopicWork, context: PipelineContext) -> None:
+    """Pick the best candidate: locally when decisive, else with Gemini (or locally only when late)."""
+    print(f"    🧠 Selecting the best video...")
+    select = select_best_video_locally if work.level >= HEURISTIC_RANKING else select_best_video
+    widen_search = None
+    if work.level < FEWER_CANDIDATES and context.search is not None:
+        widen_search = partial(run_in_bulkhead, 'search', context.search_for(work.level))
+    # Widened candidates go through the registry like the enriched ones
+    prepare = partial(_through_registry, context.registry) if context.registry is not None else None
+    work.analysis, work.videos = select_with_fan_out(
+        work.name, work.videos, context.subject, context.difficulty_level, select, widen_search, prepare
+    )
+    if not work.analysis:
+        print(f"    ❌ Failed to analyze '{work.name}'")
+        work.finish(None)
+    elif context.registry is not None:
+        context.registry.record_selection(work.analysis, work.videos, work.name)
+
+
+def locate_stage(work: TopicWork, context: PipelineContext) -> None:
+    """Compute start/end times locally from transcript and chapters, fetching captions for the selected video only."""
+    fetch_cues = None
+    if context.fetch_cues is not None and work.level < SKIP_TRANSCRIPTS:
+        fetch_cues = partial(run_in_bulkhead, 'transcripts', context.fetch_cues)
+    apply_segment_locator(work.analysis, work.videos, work.name, fetch_cues)
+
+
+def build_stage(work: TopicWork, context: PipelineContext) -> None:
+    work.finish(create_topic_structure(work.name, work.analysis, work.index))
+    print(f"    ✅ Successfully analyzed '{work.name}'")
+
+
+def persist_stage(work: TopicWork, context: PipelineContext) -> None:
+    """Checkpoint the finished topic and hand it to on_topic_done; restored topics are replayed."""
+    if context.checkpoint is not None and not work.restored and work.error is None:
+        context.checkpoint.record_topic(work.index, work.structure)
+    if work.structure and context.on_topic_done:
+        context.on_topic_done(work.structure)
+    # Release this topic's videos (descriptions, transcripts) before the next one is fetched
+    work.videos = work.analysis = None
+
+
+# Concurrent topic searches the Data API's VideoDetailsBatcher can coalesce
+DATA_API_SEARCH_WORKERS = 4
+
+
+def data_api_search_enabled() -> bool:
+    """Whether the backend selector may send topic searches to the YouTube Data API (hybrid backend with a key)."""
+    backends = [name.strip() for name in os.getenv('VIDEO_SEARCH_BACKENDS', 'basic,simple,enhanced,hybrid').split(',')]
+    return bool(os.getenv('YOUTUBE_API_KEY')) and 'hybrid' in backends
+
+
+def get_search_workers() -> int:
+    default = DATA_API_SEARCH_WORKERS if data_api_search_enabled() else 1
+    try:
+        return max(1, int(os.getenv('PIPELINE_SEARCH_WORKERS', default)))
+    except ValueError:
+        return default
+
+
+def get_search_cache_size() -> int:
+    try:
+        return max(0, int(os.getenv('PIPELINE_SEARCH_CACHE_SIZE', '0')))
+    except ValueError:
+        return 0
+
+
+_search_stage = None
+_search_stage_lock = threading.Lock()
+
+
+def _shared_search_stage() -> Stage:
+    # One instance per process so its cache outlives a single course
+    global _search_stage
+    if _search_stage is None:
+        with _search_stage_lock:
+            if _search_stage is None:
+                _search_stage = Stage('search', search_stage, workers=get_search_workers(),
+                                      cache_key=search_cache_key, cached_field='videos',
+                                      cache_size=get_search_cache_size())
+    return _search_stage
+
+
+def default_topic_stages() -> List[Stage]:
+    """The stages that turn a topic name into a topic structure: search, enrich, rank, locate, build."""
+    return [
+        _shared_search_stage(),
+        Stage('enrich', enrich_stage),
+        Stage('rank', rank_stage),
+        Stage('locate', locate_stage),
+        Stage('build', build_stage),
+    ]
+
+
+def course_pipeline(hooks: Optional[List[Callable[[str, TopicWork, float], None]]] = None,
+                    max_workers: Optional[int] = None) -> CoursePipeline:
+    """The full per-topic pipeline: plan, the default topic stages, then persist."""
+    return CoursePipeline(
+        [Stage('plan', plan_stage)] + default_topic_stages() + [Stage('persist', persist_stage, runs_on_done=True)],
+        hooks, max_workers,
+    )
+
+
+def get_pipeline_stats() -> Dict[str, Dict[str, Any]]:
+    """Calls, errors, cache hits and total/average seconds per stage."""
+    with _stats_lock:
+        report = {}
+        for name, stats in pipeline_stats.items():
+            report[name] = dict(stats)
+            report[name]['averageSeconds'] = stats['seconds'] / stats['calls'] if stats['calls'] else None
+        return report
@@ -0,0 +1,163 @@
+"""
+Race mode for latency-critical searches.
+
+The YouTube Data API path and a yt-dlp search run at the same time; the first
+usable result wins and the other one is cancelled. A quota guard caps how many
+Data API units racing may spend per quota day, across every worker and replica.
+"""
+import os
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional
+
+from src.db.quota_ledger import YoutubeQuotaLedger, SEARCH_LIST_COST, VIDEOS_LIST_COST
+from .video_record import Video, normalize_video
+from .video_registry import current_video_registry
+from .video_search_backends import get_backend_selector
+from .video_corpus import remember_videos, search_local_corpus
+
+
+# Quota ledger counter holding the units reserved by racing; the API calls a race
+# makes still reserve their own units from the daily quota as usual
+RACE_QUOTA_COUNTER = "raceUsed"
+
+
+class RaceQuotaGuard:
+    """Caps the Data API units spent by racing within one quota day.
+
+    The budget is a counter of the shared YoutubeQuotaLedger, so it holds for
+    all workers together and survives restarts.
+    """
+
+    def __init__(self, budget_units: int, ledger: Optional[YoutubeQuotaLedger] = None):
+        self.budget_units = budget_units
+        self.ledger = ledger or YoutubeQuotaLedger()
+        # This process's share, for metrics that should not query the ledger
+        self.reserved_here = 0
+        self._lock = threading.Lock()
+
+    def try_reserve(self, units: int) -> bool:
+        if not self.ledger.reserve(units, RACE_QUOTA_COUNTER, self.budget_units):
+            return False
+        with self._lock:
+            self.reserved_here += units
+        return True
+
+    def release(self, units: int) -> None:
+        """Give back units reserved for an API leg that never ran."""
+        self.ledger.release(units, RACE_QUOTA_COUNTER)
+        with self._lock:
+            self.reserved_here = max(0, self.reserved_here - units)
+
+    @property
+    def used_units(self) -> int:
+        return self.ledger.used_today(RACE_QUOTA_COUNTER)
+
+
+race_quota_guard = RaceQuotaGuard(int(os.getenv('RACE_API_QUOTA_BUDGET', '2000')))
+race_stats = {'races': 0, 'api_wins': 0, 'ytdlp_wins': 0, 'no_result': 0, 'skipped_no_budget': 0}
+_stats_lock = threading.Lock()
+_race_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('RACE_MAX_WORKERS', '8')),
+    thread_name_prefix='search-race',
+)
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        race_stats[key] += 1
+
+
+def _api_leg(topic: str, subject: str, max_results: int) -> List[Dict[str, Any]]:
+    from .youtube_hybrid_fetcher import get_youtube_fetcher
+    query = (f"{subject} {topic}" if subject else topic).strip()
+    return get_youtube_fetcher()._search_with_api(query, max_results)
+
+
+def _ytdlp_leg(topic: str, subject: str, max_results: int, cancel_event: threading.Event) -> Future:
+    # Runs on the yt-dlp rate controller: its backoff waits hold no race worker
+    from .youtube_fetcher_enhanced import search_youtube_videos_enhanced_async
+    return search_youtube_videos_enhanced_async(topic, subject, max_results=max_results, cancel_event=cancel_event)
+
+
+def _usable(videos: Any, source: str) -> List[Video]:
+    """The well-formed videos of a leg's result; junk from a degraded backend does not count."""
+    if not isinstance(videos, list):
+        return []
+    records = [normalize_video(video, source) for video in videos if isinstance(video, (dict, Video))]
+    return [video for video in records if video.video_id and video.title]
+
+
+def _api_leg_possible() -> bool:
+    if not os.getenv('YOUTUBE_API_KEY'):
+        return False
+    from .youtube_hybrid_fetcher import get_youtube_fetcher
+    youtube_fetcher = get_youtube_fetcher()
+    return bool(youtube_fetcher.youtube_service) and youtube_fetcher.has_api_quota()
+
+
+def race_search(topic: str, subject: str = "", max_results: int = 5) -> List[Video]:
+    """Race the Data API against yt-dlp and return the first usable result.
+
+    Falls back to the regular backend selector when the API leg cannot run
+    (no key, API disabled, or the racing quota budget is spent).
+    """
+    # Nothing to race when the local corpus already has confident results
+    local_videos = search_local_corpus(topic, subject, max_results)
+    if local_videos:
+        registry = current_video_registry()
+        return registry.register_all(local_videos) if registry else local_videos
+
+    api_cost = SEARCH_LIST_COST + VIDEOS_LIST_COST
+    if not _api_leg_possible():
+        return get_backend_selector().search(topic, subject, max_results)
+    if not race_quota_guard.try_reserve(api_cost):
+        print("    💸 Racing quota budget spent, searching without the API leg")
+        _count('skipped_no_budget')
+        return get_backend_selector().search(topic, subject, max_results)
+
+    _count('races')
+    print("    🏁 Racing YouTube Data API against yt-dlp...")
+    cancel_event = threading.Event()
+    # The API leg runs in this course's context so it sees the course video registry
+    api_future = _race_executor.submit(contextvars.copy_context().run, _api_leg, topic, subject, max_results)
+    ytdlp_future = _ytdlp_leg(topic, subject, max_results, cancel_event)
+    legs = {api_future: ('api', 'youtube_api'), ytdlp_future: ('ytdlp', 'enhanced')}
+
+    pending = set(legs)
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    videos = future.result()
+                except Exception as e:
+                    print(f"    ⚠️ {legs[future][0]} leg failed: {str(e)[:100]}")
+                    continue
+                leg, source = legs[future]
+                videos = _usable(videos, source)[:max_results]
+                if videos:
+                    print(f"    🏆 {leg} leg won the race with {len(videos)} videos")
+                    _count(f'{leg}_wins')
+                    remember_videos(videos)
+                    registry = current_video_registry()
+                    return registry.register_all(videos) if registry else videos
+        _count('no_result')
+        return []
+    finally:
+        # Stop the loser: scheduled yt-dlp retries and subtitle downloads are
+        # dropped, and an API leg that has not started yet leaves the queue
+        cancel_event.set()
+        for future in pending:
+            future.cancel()
+        if api_future.cancelled():
+            race_quota_guard.release(api_cost)
+
+
+def get_race_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(race_stats)
+    stats['quotaBudget'] = race_quota_guard.budget_units
+    stats['quotaReservedByThisProcess'] = race_quota_guard.reserved_here
+    return stats
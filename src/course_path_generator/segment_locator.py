@@ -0,0 +1,279 @@
+"""
+Local segment locator: computes startTime/endTime for a selected video
+from its timed transcript and description chapter markers, without any Gemini call.
+"""
+import os
+import re
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+import numpy as np
+
+from .subtitle_normalizer import timestamp_to_ms
+
+
+# Same filler words used for tag generation in create_course_path
+COMMON_WORDS = {'and', 'or', 'the', 'a', 'an', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
+
+# "00:00 Intro", "1:02:03 - Decorators", "(12:30) Loops"
+CHAPTER_PATTERN = re.compile(
+    r'^\s*[\(\[]?((?:\d{1,2}:)?\d{1,2}:\d{2})[\)\]]?\s*[-–—:|]?\s*(.+?)\s*$'
+)
+WORD_PATTERN = re.compile(r'\b\w+\b')
+
+# Transcript bins are this wide; keyword hits are summed per bin
+BIN_MS = 5000
+# Smoothing window (in bins) applied before picking the densest span
+SMOOTHING_BINS = 6
+# Never return a segment shorter than this
+MIN_SPAN_MS = 60000
+# Lead-in kept before the first dense bin so the segment doesn't start mid-sentence
+LEAD_IN_MS = 5000
+
+
+def get_locator_mode() -> str:
+    """SEGMENT_LOCATOR_MODE: 'fill' (only when Gemini times are missing/invalid), 'override' or 'off'."""
+    mode = (os.getenv('SEGMENT_LOCATOR_MODE') or 'fill').strip().lower()
+    return mode if mode in ('fill', 'override', 'off') else 'fill'
+
+
+def extract_keywords(text: str) -> List[str]:
+    """Lowercase content words of a topic or chapter title."""
+    words = WORD_PATTERN.findall(text.lower())
+    return [word for word in words if word not in COMMON_WORDS and len(word) > 2]
+
+
+def parse_chapter_markers(description: str) -> List[Dict[str, Any]]:
+    """Parse '00:00 Intro' style chapter lines from a video description.
+
+    Returns chapters sorted by start time as dicts with 'startMs' and 'title'.
+    YouTube only treats a description as chaptered when there are at least
+    two markers, so fewer than two yields an empty list.
+    """
+    if not description or description == 'N/A':
+        return []
+
+    chapters = []
+    for line in description.splitlines():
+        match = CHAPTER_PATTERN.match(line)
+        if match:
+            title = match.group(2).strip()
+            if title:
+                chapters.append({'startMs': timestamp_to_ms(match.group(1)), 'title': title})
+
+    chapters.sort(key=lambda chapter: chapter['startMs'])
+    return chapters if len(chapters) >= 2 else []
+
+
+def _bin_keyword_hits(cues: List[Tuple[int, int, str]], keywords: set, n_bins: int) -> np.ndarray:
+    """Sum keyword occurrences of each cue into the transcript bin it starts in."""
+    starts = np.fromiter((cue[0] for cue in cues), dtype=np.int64, count=len(cues))
+    counts = np.fromiter(
+        (sum(1 for word in WORD_PATTERN.findall(cue[2].lower()) if word in keywords) for cue in cues),
+        dtype=np.float64,
+        count=len(cues),
+    )
+    hits = np.zeros(n_bins, dtype=np.float64)
+    np.add.at(hits, np.clip(starts // BIN_MS, 0, n_bins - 1), counts)
+    return hits
+
+
+def _densest_span(hits: np.ndarray) -> Optional[Tuple[int, int, float]]:
+    """Find the contiguous bin range with the highest above-average keyword density.
+
+    Window sums are smoothed with a convolution, centred on their mean and the
+    maximum-sum subarray is read off the prefix sums (running minimum), so the
+    whole search is vectorized.
+    Returns (start_bin, end_bin_exclusive, score) or None when nothing matches.
+    """
+    if hits.size == 0 or not hits.any():
+        return None
+
+    window = min(SMOOTHING_BINS, hits.size)
+    smoothed = np.convolve(hits, np.ones(window) / window, mode='same')
+    centred = smoothed - smoothed.mean()
+
+    prefix = np.concatenate(([0.0], np.cumsum(centred)))
+    running_min = np.minimum.accumulate(prefix)
+    gains = prefix - running_min
+    end = int(np.argmax(gains))
+    if gains[end] <= 0:
+        return None
+    start = int(np.argmin(prefix[:end + 1]))
+    return start, end, float(hits[start:end].sum())
+
+
+def _chapter_bounds(chapters: List[Dict[str, Any]], duration_ms: int) -> List[Tuple[int, int]]:
+    bounds = []
+    for i, chapter in enumerate(chapters):
+        end_ms = chapters[i + 1]['startMs'] if i + 1 < len(chapters) else duration_ms
+        bounds.append((chapter['startMs'], max(end_ms, chapter['startMs'])))
+    return bounds
+
+
+def _locate_by_chapters(chapters: List[Dict[str, Any]], keywords: set, duration_ms: int,
+                        hits: Optional[np.ndarray]) -> Optional[Dict[str, Any]]:
+    """Pick the best contiguous run of chapters whose titles mention the topic."""
+    bounds = _chapter_bounds(chapters, duration_ms)
+    title_scores = np.array([
+        len(keywords.intersection(extract_keywords(chapter['title']))) / len(keywords)
+        for chapter in chapters
+    ])
+    if not title_scores.any():
+        return None
+
+    # Transcript density per chapter breaks ties between equally named chapters
+    if hits is not None and hits.any():
+        density = np.array([
+            hits[start // BIN_MS:max(end // BIN_MS, start // BIN_MS + 1)].mean() if end > start else 0.0
+            for start, end in bounds
+        ])
+        scores = title_scores + 0.1 * density / (density.max() or 1.0)
+    else:
+        scores = title_scores
+
+    # Grow a run of neighbouring matching chapters around the best one
+    best = int(np.argmax(scores))
+    first = last = best
+    while first > 0 and title_scores[first - 1] > 0:
+        first -= 1
+    while last + 1 < len(chapters) and title_scores[last + 1] > 0:
+        last += 1
+
+    start_ms, end_ms = bounds[first][0], bounds[last][1]
+    if end_ms <= start_ms:
+        return None
+    return {
+        'startTimeMs': start_ms,
+        'endTimeMs': end_ms,
+        'source': 'chapters',
+        'score': float(scores[first:last + 1].sum()),
+    }
+
+
+def locate_segment(topic_name: str, cues: Optional[List[Tuple[int, int, str]]] = None,
+                   description: str = '', duration_seconds: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Compute the most relevant contiguous span of a video for a topic.
+
+    Chapter markers in the description win when their titles mention the topic;
+    otherwise the densest keyword span of the timed transcript is used.
+    Returns {'startTimeMs', 'endTimeMs', 'source', 'score'} or None.
+    """
+    keywords = set(extract_keywords(topic_name))
+    if not keywords:
+        return None
+
+    cues = cues or []
+    last_cue_ms = max((cue[1] for cue in cues), default=0)
+    duration_ms = int(duration_seconds or 0) * 1000 or last_cue_ms
+
+    hits = None
+    if cues and duration_ms > 0:
+        n_bins = max(1, -(-duration_ms // BIN_MS))
+        hits = _bin_keyword_hits(cues, keywords, n_bins)
+
+    chapters = parse_chapter_markers(description)
+    if chapters and duration_ms > 0:
+        by_chapters = _locate_by_chapters(chapters, keywords, duration_ms, hits)
+        if by_chapters:
+            return by_chapters
+
+    if hits is None:
+        return None
+
+    span = _densest_span(hits)
+    if not span:
+        return None
+
+    start_bin, end_bin, score = span
+    start_ms = max(0, start_bin * BIN_MS - LEAD_IN_MS)
+    end_ms = min(duration_ms, end_bin * BIN_MS)
+    if end_ms - start_ms < MIN_SPAN_MS:
+        # Widen symmetrically up to the minimum span, staying inside the video
+        missing = MIN_SPAN_MS - (end_ms - start_ms)
+        start_ms = max(0, start_ms - missing // 2)
+        end_ms = min(duration_ms, start_ms + MIN_SPAN_MS)
+        start_ms = max(0, end_ms - MIN_SPAN_MS)
+
+    return {'startTimeMs': int(start_ms), 'endTimeMs': int(end_ms), 'source': 'transcript', 'score': score}
+
+
+def locate_segment_for_video(video: Dict[str, Any], topic_name: str,
+                             cues: Optional[List[Tuple[int, int, str]]] = None) -> Optional[Dict[str, Any]]:
+    """Run the locator on a fetched video dict (cues default to the video's own)."""
+    duration = video.get('duration')
+    return locate_segment(
+        topic_name,
+        cues=cues or video.get('subtitle_cues') or [],
+        description=video.get('description') or '',
+        duration_seconds=duration if isinstance(duration, (int, float)) else None,
+    )
+
+
+def find_selected_video(selected: Dict[str, Any], videos: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The candidate a selectedVideo refers to, by videoNumber or else by URL."""
+    number = selected.get('videoNumber')
+    if isinstance(number, int) and 1 <= number <= len(videos):
+        return videos[number - 1]
+    url = selected.get('youtubeUrl') or ''
+    for video in videos:
+        video_id = video.get('video_id')
+        if url and (url == video.get('url') or (video_id and video_id in url)):
+            return video
+    return None
+
+
+def _times_are_valid(selected: Dict[str, Any], duration_seconds: Optional[int]) -> bool:
+    start_ms = selected.get('startTimeMs')
+    end_ms = selected.get('endTimeMs')
+    if not isinstance(start_ms, (int, float)) or not isinstance(end_ms, (int, float)):
+        return False
+    if end_ms <= start_ms or start_ms < 0:
+        return False
+    if duration_seconds and end_ms > duration_seconds * 1000 + 1000:
+        return False
+    return True
+
+
+def apply_segment_locator(analysis: Dict[str, Any], videos: List[Dict[str, Any]], topic_name: str,
+                          fetch_cues: Optional[Callable[[str], List[Tuple[int, int, str]]]] = None) -> Dict[str, Any]:
+    """Fill or override selectedVideo startTimeMs/endTimeMs using the local locator.
+
+    In 'fill' mode the Gemini times are kept unless they are missing or invalid;
+    in 'override' mode a located segment always replaces them. When the selected
+    video has no transcript and its chapters do not locate the topic,
+    fetch_cues(video_id) is asked for its timed captions.
+    """
+    mode = get_locator_mode()
+    selected = (analysis or {}).get('selectedVideo')
+    if mode == 'off' or not selected:
+        return analysis
+
+    video = find_selected_video(selected, videos)
+    if not video:
+        return analysis
+
+    duration = video.get('duration') if isinstance(video.get('duration'), (int, float)) else None
+    if mode == 'fill' and _times_are_valid(selected, duration):
+        return analysis
+
+    segment = locate_segment_for_video(video, topic_name)
+    if segment is None and fetch_cues is not None and video.get('video_id') and not video.get('subtitle_cues'):
+        try:
+            cues = fetch_cues(video['video_id'])
+        except Exception as e:
+            print(f"    ⚠️ Could not fetch captions: {str(e)[:100]}")
+            cues = None
+        if cues:
+            segment = locate_segment_for_video(video, topic_name, cues)
+    if segment:
+        selected['startTimeMs'] = segment['startTimeMs']
+        selected['endTimeMs'] = segment['endTimeMs']
+        selected['segmentSource'] = segment['source']
+        print(f"    📍 Segment located from {segment['source']}: "
+              f"{segment['startTimeMs'] // 1000}s - {segment['endTimeMs'] // 1000}s")
+    elif not _times_are_valid(selected, duration) and duration:
+        # Nothing to go on: fall back to the whole video rather than 0-0
+        selected['startTimeMs'] = 0
+        selected['endTimeMs'] = int(duration * 1000)
+        selected['segmentSource'] = 'full_video'
+    return analysis
@@ -0,0 +1,203 @@
+"""
+Shared subtitle normalization for all fetchers.
+Single-pass streaming tokenizers for VTT, SRV3, TTML and JSON3 with precompiled
+patterns and an early stop once the character cap is reached.
+"""
+import io
+import re
+import json
+from html import unescape
+from typing import Iterator, List, Optional, Tuple
+
+
+# Subtitle text sent to Gemini is capped at this many characters
+SUBTITLE_CHAR_LIMIT = 5000
+
+SUPPORTED_FORMATS = ('vtt', 'srv3', 'ttml', 'json3')
+
+VTT_TIMING_PATTERN = re.compile(
+    r'((?:\d+:)?\d{2}:\d{2}[.,]\d{3})\s*-->\s*((?:\d+:)?\d{2}:\d{2}[.,]\d{3})'
+)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+# <p t="1230" d="2500">...</p> in SRV3 / <p begin="00:00:01.000" end="...">...</p> in TTML
+XML_PARAGRAPH_PATTERN = re.compile(r'<p\b([^>]*)>(.*?)</p>', re.S)
+XML_ATTRIBUTE_PATTERN = re.compile(r'([\w:]+)\s*=\s*"([^"]*)"')
+XML_LINE_BREAK_PATTERN = re.compile(r'<br\s*/?>')
+TTML_OFFSET_PATTERN = re.compile(r'^([\d.]+)(h|m|s|ms|t)$')
+# Everything clean_subtitle_text drops, in one alternation instead of separate passes
+RAW_NOISE_PATTERN = re.compile(
+    r'\d{2}:\d{2}:\d{2}[.,]\d{3}\s*-->\s*\d{2}:\d{2}:\d{2}[.,]\d{3}'  # timestamps
+    r'|^\d+\s*$'                                                      # sequence numbers
+    r'|<[^>]+>',                                                      # HTML/XML tags
+    re.M
+)
+
+Cue = Tuple[int, int, str]
+
+
+def timestamp_to_ms(timestamp: str) -> int:
+    """Convert 'HH:MM:SS.mmm', 'MM:SS.mmm', 'H:MM:SS' or 'MM:SS' to milliseconds."""
+    timestamp = timestamp.replace(',', '.')
+    seconds_part, _, millis_part = timestamp.partition('.')
+    total = 0
+    for part in seconds_part.split(':'):
+        total = total * 60 + int(part)
+    millis = int(millis_part.ljust(3, '0')[:3]) if millis_part else 0
+    return total * 1000 + millis
+
+
+def _ttml_time_to_ms(value: str, tick_rate: int = 10000000) -> int:
+    """TTML times are either clock times or offsets such as '1.5s', '1500ms' or '15000000t'."""
+    if ':' in value:
+        return timestamp_to_ms(value)
+    match = TTML_OFFSET_PATTERN.match(value.strip())
+    if not match:
+        return 0
+    number, unit = float(match.group(1)), match.group(2)
+    if unit == 't':
+        return int(number * 1000 / tick_rate)
+    return int(number * {'h': 3600000, 'm': 60000, 's': 1000, 'ms': 1}[unit])
+
+
+def _clean_fragment(text: str) -> str:
+    """Strip tags and entities and collapse whitespace in one cue's text."""
+    if '<' in text:
+        text = TAG_PATTERN.sub('', text)
+    if '&' in text:
+        text = unescape(text)
+    return ' '.join(text.split())
+
+
+def _iter_vtt_cues(content: str) -> Iterator[Cue]:
+    start_ms = end_ms = None
+    parts = []
+    for line in io.StringIO(content):
+        line = line.strip()
+        if not line:
+            if parts:
+                yield start_ms, end_ms, ' '.join(parts)
+                parts = []
+            start_ms = None
+            continue
+        if '-->' in line:
+            timing = VTT_TIMING_PATTERN.search(line)
+            if timing:
+                if parts:
+                    yield start_ms, end_ms, ' '.join(parts)
+                    parts = []
+                start_ms = timestamp_to_ms(timing.group(1))
+                end_ms = timestamp_to_ms(timing.group(2))
+            continue
+        # Header, NOTE blocks and cue identifiers sit outside a timed cue
+        if start_ms is not None:
+            text = _clean_fragment(line)
+            if text:
+                parts.append(text)
+    if parts and start_ms is not None:
+        yield start_ms, end_ms, ' '.join(parts)
+
+
+def _iter_xml_cues(content: str, ttml: bool) -> Iterator[Cue]:
+    for match in XML_PARAGRAPH_PATTERN.finditer(content):
+        attributes = dict(XML_ATTRIBUTE_PATTERN.findall(match.group(1)))
+        body = XML_LINE_BREAK_PATTERN.sub(' ', match.group(2))
+        text = _clean_fragment(body)
+        if not text:
+            continue
+        if ttml:
+            start_ms = _ttml_time_to_ms(attributes.get('begin', '0s'))
+            if 'end' in attributes:
+                end_ms = _ttml_time_to_ms(attributes['end'])
+            else:
+                end_ms = start_ms + _ttml_time_to_ms(attributes.get('dur', '0s'))
+        else:
+            start_ms = int(attributes.get('t', 0))
+            end_ms = start_ms + int(attributes.get('d', 0))
+        yield start_ms, end_ms, text
+
+
+def _iter_json3_cues(content: str) -> Iterator[Cue]:
+    data = json.loads(content)
+    for event in data.get('events', ()):
+        segs = event.get('segs')
+        if not segs:
+            continue
+        text = ' '.join(''.join(seg.get('utf8', '') for seg in segs).split())
+        if text:
+            start_ms = int(event.get('tStartMs', 0))
+            yield start_ms, start_ms + int(event.get('dDurationMs', 0)), text
+
+
+def iter_subtitle_cues(content: str, ext: str) -> Iterator[Cue]:
+    """Stream (start_ms, end_ms, text) cues out of subtitle content of the given format."""
+    ext = (ext or '').lower()
+    if ext == 'vtt':
+        return _iter_vtt_cues(content)
+    if ext == 'json3':
+        return _iter_json3_cues(content)
+    if ext in ('srv3', 'ttml'):
+        return _iter_xml_cues(content, ttml=(ext == 'ttml'))
+    raise ValueError(f"Unsupported subtitle format: {ext}")
+
+
+def normalize_subtitles(content: str, ext: str, max_chars: Optional[int] = SUBTITLE_CHAR_LIMIT,
+                        cues_out: Optional[List[Cue]] = None) -> str:
+    """Turn raw subtitle content into a single line of plain text.
+
+    Consecutive duplicate lines (YouTube auto-captions repeat the previous line in
+    every cue) are dropped. Text stops growing as soon as max_chars is reached;
+    parsing stops there too unless cues_out is given, in which case the remaining
+    timed cues are collected into it without further text work.
+    """
+    pieces = []
+    length = 0
+    previous = None
+    cues = iter_subtitle_cues(content, ext)
+    for cue in cues:
+        if cues_out is not None:
+            cues_out.append(cue)
+        text = cue[2]
+        if text == previous:
+            continue
+        previous = text
+        if max_chars is not None and length >= max_chars:
+            if cues_out is not None:
+                cues_out.extend(cues)
+            break
+        pieces.append(text)
+        length += len(text) + 1
+
+    joined = ' '.join(pieces)
+    return joined[:max_chars] if max_chars is not None else joined
+
+
+def parse_vtt_subtitles(vtt_content: str, max_chars: Optional[int] = SUBTITLE_CHAR_LIMIT) -> str:
+    """Parse VTT subtitle format and extract text."""
+    return normalize_subtitles(vtt_content, 'vtt', max_chars)
+
+
+def parse_json3_subtitles(json_content: str, max_chars: Optional[int] = SUBTITLE_CHAR_LIMIT) -> str:
+    """Parse JSON3 subtitle format and extract text."""
+    try:
+        return normalize_subtitles(json_content, 'json3', max_chars)
+    except (ValueError, TypeError, AttributeError):
+        return clean_subtitle_text(json_content, max_chars)
+
+
+def parse_vtt_cues(vtt_content: str) -> List[Cue]:
+    """Parse VTT content into (start_ms, end_ms, text) cues."""
+    return list(_iter_vtt_cues(vtt_content))
+
+
+def parse_json3_cues(json_content: str) -> List[Cue]:
+    """Parse YouTube JSON3 content into (start_ms, end_ms, text) cues."""
+    try:
+        return list(_iter_json3_cues(json_content))
+    except (ValueError, TypeError, AttributeError):
+        return []
+
+
+def clean_subtitle_text(raw_content: str, max_chars: Optional[int] = SUBTITLE_CHAR_LIMIT) -> str:
+    """Clean raw subtitle content by removing timestamps, sequence numbers and tags."""
+    content = ' '.join(RAW_NOISE_PATTERN.sub(' ', raw_content).split())
+    return content[:max_chars] if max_chars is not None else content
@@ -0,0 +1,392 @@
+"""
+Local corpus of every video the fetchers have returned.
+
+Videos are appended to videos.jsonl as they are fetched and indexed in memory.
+Periodically a background thread merges that in-memory delta into a new on-disk
+generation of the inverted index over title, description and transcript: a JSON
+manifest maps each term to a slice of a memory-mapped (doc, tf) postings array.
+Queries keep using the previous generation until the new one is swapped in.
+
+Several processes (uvicorn workers) may share VIDEO_CORPUS_DIR. Appends and
+index publication take an exclusive fcntl lock on corpus.lock; before appending,
+a process first indexes the videos others appended, so document numbers always
+follow the order of videos.jsonl. Index files are written under temporary names
+and renamed into place, never rewritten, so other processes' memory maps stay
+valid, and a process that finds a newer generation on disk adopts it instead of
+publishing its own. Without fcntl (Windows) only one process may write.
+
+Searches query the corpus first and only go out to YouTube when it does not
+return enough confident hits (VIDEO_CORPUS_MIN_HITS videos covering at least
+VIDEO_CORPUS_MIN_COVERAGE of the topic's keywords).
+"""
+import os
+import json
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single writer only
+    fcntl = None
+
+from .bm25_ranker import K1, B, SUBJECT_WEIGHT, video_document
+from .segment_locator import extract_keywords
+from .video_record import Video
+
+MANIFEST_FILE = 'index.json'
+VIDEOS_FILE = 'videos.jsonl'
+LOCK_FILE = 'corpus.lock'
+
+
+class VideoCorpus:
+    """Append-only video store with an on-disk BM25 inverted index."""
+
+    def __init__(self, directory: str, rebuild_every: int = 200):
+        self.directory = directory
+        self.rebuild_every = rebuild_every
+        self.stats = {'queries': 0, 'localHits': 0, 'ingested': 0, 'rebuilds': 0}
+        self._lock = threading.Lock()
+        # One rebuild at a time; it runs outside _lock so queries never wait for it
+        self._rebuild_lock = threading.Lock()
+        self._rebuild_thread: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+        with self._file_lock():
+            self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared with every process using this directory."""
+        with open(self._path(LOCK_FILE), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _manifest_version(self) -> Optional[Tuple[int, int]]:
+        # Every publication renames a freshly written manifest into place
+        try:
+            stat = os.stat(self._path(MANIFEST_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _read_state(self) -> Dict[str, Any]:
+        """The current on-disk index generation, without the videos appended after it."""
+        state = {
+            'terms': {}, 'postings': np.zeros((0, 2), dtype=np.int32), 'doc_lengths': np.zeros(0, dtype=np.float32),
+            'offsets': [], 'video_ids': [], 'generation': 0, 'indexed_bytes': 0,
+            'manifest_version': self._manifest_version(),
+        }
+        if state['manifest_version'] is not None:
+            with open(self._path(MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            generation = manifest['generation']
+            state.update(
+                terms=manifest['terms'], offsets=manifest['offsets'], video_ids=manifest['ids'],
+                generation=generation, indexed_bytes=manifest['indexedBytes'],
+                postings=np.load(self._path(f"postings-{generation}.npy"), mmap_mode='r'),
+                doc_lengths=np.load(self._path(f"lengths-{generation}.npy"), mmap_mode='r'),
+            )
+        state['ids'] = {video_id: doc for doc, video_id in enumerate(state['video_ids'])}
+        # Videos appended since the last rebuild are searched from memory
+        state.update(indexed_count=len(state['offsets']), delta=[], appended_bytes=state['indexed_bytes'])
+        return state
+
+    def _load(self) -> None:
+        """Open the current index generation and pick up videos appended after it."""
+        for name, value in self._read_state().items():
+            setattr(self, name, value)
+        self._read_appended()
+
+    def _read_appended(self) -> None:
+        """Index videos appended to videos.jsonl (by any process) since this one last looked."""
+        videos_path = self._path(VIDEOS_FILE)
+        if not os.path.exists(videos_path) or os.path.getsize(videos_path) <= self.appended_bytes:
+            return
+        with open(videos_path, 'rb') as f:
+            f.seek(self.appended_bytes)
+            lines = f.readlines()
+        with self._lock:
+            for line in lines:
+                self._add_delta(json.loads(line), self.appended_bytes, len(line))
+
+    def _catch_up(self) -> None:
+        """Under the file lock: adopt a generation another process published, then its appends."""
+        if self._manifest_version() != self.manifest_version:
+            state = self._read_state()
+            with self._lock:
+                for name, value in state.items():
+                    setattr(self, name, value)
+        self._read_appended()
+
+    def _add_delta(self, record: Dict[str, Any], offset: int, size: int) -> None:
+        document = video_document(Video.from_raw(record, 'corpus'))
+        self.ids[record['video_id']] = len(self.offsets)
+        self.video_ids.append(record['video_id'])
+        self.offsets.append(offset)
+        self.delta.append((Counter(document), len(document)))
+        self.appended_bytes = offset + size
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def add_videos(self, videos: List[Video]) -> int:
+        """Append videos not seen before; returns how many were new.
+
+        Every rebuild_every new videos a background thread merges them into the on-disk index.
+        """
+        records, seen = [], set()
+        with self._file_lock():
+            # Other processes' videos first, so document numbers follow the file
+            self._read_appended()
+            with self._lock:
+                for video in videos:
+                    if video.video_id and video.video_id not in self.ids and video.video_id not in seen:
+                        seen.add(video.video_id)
+                        record = video.to_dict()
+                        record.pop('source', None)
+                        records.append(record)
+                if not records:
+                    return 0
+                with open(self._path(VIDEOS_FILE), 'ab') as f:
+                    for record in records:
+                        line = json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n'
+                        offset = f.tell()
+                        f.write(line)
+                        self._add_delta(record, offset, len(line))
+                self.stats['ingested'] += len(records)
+                start_rebuild = len(self.delta) >= self.rebuild_every and not self._rebuild_lock.locked()
+        if start_rebuild:
+            self._rebuild_thread = threading.Thread(target=self._rebuild_quietly, name='video-corpus-rebuild',
+                                                    daemon=True)
+            self._rebuild_thread.start()
+        return len(records)
+
+    def wait_for_rebuild(self, timeout: Optional[float] = None) -> None:
+        """Block until the last background rebuild started by add_videos has finished."""
+        thread = self._rebuild_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _rebuild_quietly(self) -> None:
+        try:
+            self.rebuild()
+        except Exception as e:
+            print(f"    ⚠️ Could not rebuild the local corpus index: {str(e)[:100]}")
+
+    def rebuild(self) -> None:
+        """Merge the videos indexed in memory into a new on-disk generation, then swap it in.
+
+        Only the in-memory delta is merged; the previous generation's postings are
+        reused as they are and nothing is re-read or re-tokenized. Queries use the
+        previous generation until the swap. A no-op while another rebuild runs in
+        this process; if another process publishes first, its generation is adopted.
+        """
+        if not self._rebuild_lock.acquire(blocking=False):
+            return
+        try:
+            with self._file_lock():
+                self._catch_up()
+                with self._lock:
+                    generation, terms, postings = self.generation, self.terms, self.postings
+                    doc_lengths, indexed_count = self.doc_lengths, self.indexed_count
+                    delta = list(self.delta)
+                    doc_count = indexed_count + len(delta)
+                    offsets, video_ids = self.offsets[:doc_count], self.video_ids[:doc_count]
+                    indexed_bytes, manifest_version = self.appended_bytes, self.manifest_version
+            if not delta:
+                return
+
+            # The merge runs without the file lock: other processes keep appending meanwhile
+            merged_terms, rows = _merge_postings(terms, postings, delta, indexed_count)
+            lengths = np.concatenate([np.asarray(doc_lengths, dtype=np.float32),
+                                      np.array([length for _, length in delta], dtype=np.float32)])
+            new_generation = generation + 1
+
+            with self._file_lock():
+                if self._manifest_version() != manifest_version:
+                    # Another process published a generation meanwhile: adopt it, and
+                    # the videos it does not cover stay in the delta for the next rebuild
+                    self._catch_up()
+                    return
+                self._write_atomically(f"postings-{new_generation}.npy", lambda f: np.save(f, rows))
+                self._write_atomically(f"lengths-{new_generation}.npy", lambda f: np.save(f, lengths))
+                manifest = {'generation': new_generation, 'terms': merged_terms, 'offsets': offsets,
+                            'ids': video_ids, 'indexedBytes': indexed_bytes}
+                self._write_atomically(MANIFEST_FILE, lambda f: f.write(json.dumps(manifest).encode('utf-8')))
+                new_postings = np.load(self._path(f"postings-{new_generation}.npy"), mmap_mode='r')
+                new_lengths = np.load(self._path(f"lengths-{new_generation}.npy"), mmap_mode='r')
+
+                with self._lock:
+                    # Videos appended meanwhile stay in the delta; document numbers do not change
+                    self.generation, self.terms, self.postings = new_generation, merged_terms, new_postings
+                    self.doc_lengths, self.indexed_bytes, self.indexed_count = new_lengths, indexed_bytes, doc_count
+                    self.manifest_version = self._manifest_version()
+                    self.delta = self.delta[len(delta):]
+                    self.stats['rebuilds'] += 1
+                for name in (f"postings-{generation}.npy", f"lengths-{generation}.npy"):
+                    # Open memory maps of the old generation, here or in other processes, stay valid after the unlink
+                    if generation and os.path.exists(self._path(name)):
+                        os.remove(self._path(name))
+        finally:
+            self._rebuild_lock.release()
+
+    def _write_atomically(self, name: str, write) -> None:
+        """Write a file under a temporary name and rename it into place, never truncating a mapped file."""
+        temp_path = self._path(f"{name}.{os.getpid()}.tmp")
+        with open(temp_path, 'wb') as f:
+            write(f)
+        os.replace(temp_path, self._path(name))
+
+    def _read_video(self, offset: int) -> Video:
+        with open(self._path(VIDEOS_FILE), 'rb') as f:
+            f.seek(offset)
+            return Video.from_raw(json.loads(f.readline()), 'corpus')
+
+    def query(self, topic: str, subject: str = "", limit: int = 5) -> List[Tuple[Video, float, float]]:
+        """Best matches as (video, BM25 score, share of topic keywords matched)."""
+        topic_terms = set(extract_keywords(topic))
+        weights = {term: SUBJECT_WEIGHT for term in extract_keywords(subject)}
+        weights.update({term: 1.0 for term in topic_terms})
+
+        with self._lock:
+            total = len(self.offsets)
+            if not total or not weights:
+                return []
+            lengths = np.concatenate([np.asarray(self.doc_lengths, dtype=np.float64),
+                                      np.array([length for _, length in self.delta], dtype=np.float64)])
+            norms = K1 * (1 - B + B * lengths / max(lengths.mean(), 1.0))
+            scores = np.zeros(total)
+            matched = np.zeros(total)
+
+            for term, weight in weights.items():
+                start, count = self.terms.get(term, (0, 0))
+                block = np.asarray(self.postings[start:start + count])
+                docs, tfs = block[:, 0], block[:, 1].astype(np.float64)
+                delta_docs = [(self.indexed_count + i, counts[term])
+                              for i, (counts, _) in enumerate(self.delta) if term in counts]
+                if delta_docs:
+                    docs = np.concatenate([docs, np.array([doc for doc, _ in delta_docs])])
+                    tfs = np.concatenate([tfs, np.array([tf for _, tf in delta_docs], dtype=np.float64)])
+                if not len(docs):
+                    continue
+                idf = np.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+                scores[docs] += weight * idf * tfs * (K1 + 1) / (tfs + norms[docs])
+                if term in topic_terms:
+                    matched[docs] += 1
+
+            best = [int(doc) for doc in np.argsort(-scores, kind='stable')[:limit] if scores[doc] > 0]
+            coverage = matched / len(topic_terms) if topic_terms else np.zeros(total)
+            hits = [(self.offsets[doc], float(scores[doc]), float(coverage[doc])) for doc in best]
+        # Videos are read from disk outside the lock
+        return [(self._read_video(offset), score, share) for offset, score, share in hits]
+
+    def confident_hits(self, topic: str, subject: str = "", max_results: int = 5) -> Optional[List[Video]]:
+        """Local videos good enough to skip YouTube, or None to fall through."""
+        hits = [video for video, _, coverage in self.query(topic, subject, max_results)
+                if coverage >= get_min_coverage()]
+        with self._lock:
+            self.stats['queries'] += 1
+            if len(hits) < min(max_results, get_min_hits()):
+                return None
+            self.stats['localHits'] += 1
+        return hits
+
+
+def _merge_postings(terms: Dict[str, List[int]], postings, delta: List[Tuple[Counter, int]],
+                    first_doc: int) -> Tuple[Dict[str, List[int]], np.ndarray]:
+    """Term slices and postings rows of an index extended by delta documents numbered from first_doc."""
+    term_order = list(terms)
+    term_ids = {term: index for index, term in enumerate(term_order)}
+    old_rows = np.asarray(postings, dtype=np.int32).reshape(-1, 2)
+    old_term_ids = np.zeros(len(old_rows), dtype=np.int64)
+    for term, (start, count) in terms.items():
+        old_term_ids[start:start + count] = term_ids[term]
+
+    delta_term_ids, delta_rows = [], []
+    for i, (counts, _) in enumerate(delta):
+        for term, tf in counts.items():
+            if term not in term_ids:
+                term_ids[term] = len(term_order)
+                term_order.append(term)
+            delta_term_ids.append(term_ids[term])
+            delta_rows.append((first_doc + i, tf))
+
+    all_term_ids = np.concatenate([old_term_ids, np.array(delta_term_ids, dtype=np.int64)])
+    all_rows = np.concatenate([old_rows, np.array(delta_rows, dtype=np.int32).reshape(-1, 2)])
+    # Stable: within a term, existing documents stay ahead of the newer delta ones
+    order = np.argsort(all_term_ids, kind='stable')
+    counts = np.bincount(all_term_ids, minlength=len(term_order))
+    starts = np.cumsum(counts) - counts
+    merged_terms = {term: [int(starts[index]), int(counts[index])] for index, term in enumerate(term_order)}
+    return merged_terms, all_rows[order]
+
+
+def get_min_hits() -> int:
+    """VIDEO_CORPUS_MIN_HITS: confident local videos needed to skip YouTube (default 3)."""
+    try:
+        return max(1, int(os.getenv('VIDEO_CORPUS_MIN_HITS', '3')))
+    except ValueError:
+        return 3
+
+
+def get_min_coverage() -> float:
+    """VIDEO_CORPUS_MIN_COVERAGE: share of topic keywords a local video must contain (default 1.0)."""
+    try:
+        return float(os.getenv('VIDEO_CORPUS_MIN_COVERAGE', '1.0'))
+    except ValueError:
+        return 1.0
+
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+
+def get_video_corpus() -> Optional[VideoCorpus]:
+    """Process-wide corpus in VIDEO_CORPUS_DIR, or None when the corpus is not configured.
+
+    VIDEO_CORPUS_REBUILD_EVERY: new videos kept in memory before the on-disk index is rebuilt
+    """
+    global _corpus
+    directory = os.getenv('VIDEO_CORPUS_DIR')
+    if not directory:
+        return None
+    if _corpus is None:
+        with _corpus_lock:
+            if _corpus is None:
+                _corpus = VideoCorpus(directory, int(os.getenv('VIDEO_CORPUS_REBUILD_EVERY', '200')))
+    return _corpus
+
+
+def remember_videos(videos: List[Video]) -> None:
+    """Add freshly fetched videos to the corpus, if one is configured."""
+    corpus = get_video_corpus()
+    # Flat candidates were never extracted; only full records are worth serving later
+    videos = [video for video in videos or [] if not video.flat]
+    if corpus is None or not videos:
+        return
+    try:
+        corpus.add_videos(videos)
+    except Exception as e:
+        print(f"    ⚠️ Could not add videos to the local corpus: {str(e)[:100]}")
+
+
+def search_local_corpus(topic: str, subject: str = "", max_results: int = 5) -> Optional[List[Video]]:
+    """Confident local results for a topic, or None when YouTube should be searched."""
+    corpus = get_video_corpus()
+    if corpus is None:
+        return None
+    try:
+        hits = corpus.confident_hits(topic, subject, max_results)
+    except Exception as e:
+        print(f"    ⚠️ Local corpus query failed: {str(e)[:100]}")
+        return None
+    if hits:
+        print(f"    📦 Found {len(hits)} videos in the local corpus, skipping YouTube")
+    return hits
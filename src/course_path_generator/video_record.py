@@ -0,0 +1,161 @@
+"""
+Canonical video and per-topic candidate records shared across the pipeline.
+
+Every fetcher's output is normalized into a slotted Video: counters are ints,
+durations are seconds, missing text is '' rather than an 'N/A' placeholder, and
+repeated strings (channel, uploader, source) are interned. Item access
+(video['title'], video.get('url')) keeps older dict-based callers working.
+"""
+import sys
+from dataclasses import dataclass, field, fields
+from typing import List, Dict, Any, Optional, Tuple
+
+from .subtitle_normalizer import timestamp_to_ms
+
+# Transcript excerpt kept when a video is referenced compactly in a later prompt
+COMPACT_SUBTITLE_CHARS = 1000
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _duration_seconds(value: Any) -> int:
+    """Durations arrive as seconds (int/float) or as a '4:13' duration string."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str) and ':' in value:
+        try:
+            return timestamp_to_ms(value) // 1000
+        except ValueError:
+            return 0
+    return _to_int(value) if isinstance(value, str) and value.isdigit() else 0
+
+
+def _text(value: Any) -> str:
+    """Real text or '', dropping the fetchers' placeholder strings."""
+    if not isinstance(value, str) or value in ('N/A', 'No Title', 'Unknown', 'No description available'):
+        return ''
+    return value
+
+
+def _interned(value: Any) -> str:
+    return sys.intern(_text(value))
+
+
+class _ItemAccess:
+    """Read-only dict-style access for code written against the old video dicts."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return getattr(self, key, None) is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+
+@dataclass(slots=True)
+class Video(_ItemAccess):
+    """One candidate video, in the shape the analysis prompt expects."""
+
+    video_id: str
+    title: str = ''
+    url: str = ''
+    description: str = ''
+    view_count: int = 0
+    like_count: int = 0
+    duration: int = 0
+    upload_date: str = ''
+    uploader: str = ''
+    channel: str = ''
+    subtitles: str = ''
+    source: str = ''
+    subtitle_cues: Optional[List[Tuple[int, int, str]]] = None
+    # Built from a flat search entry only: no description or transcript extracted
+    flat: bool = False
+
+    @classmethod
+    def from_raw(cls, video: Dict[str, Any], source: str) -> 'Video':
+        """Build a record from any fetcher's video dict (or return an existing record)."""
+        if isinstance(video, Video):
+            return video
+        video_id = _text(video.get('video_id') or video.get('id'))
+        url = video.get('url') or video.get('webpage_url')
+        if not isinstance(url, str) or not url.startswith('http'):
+            url = f"https://www.youtube.com/watch?v={video_id}" if video_id else ''
+        uploader = _interned(video.get('uploader'))
+        return cls(
+            video_id=video_id,
+            title=_text(video.get('title')),
+            url=url,
+            description=_text(video.get('description')),
+            view_count=_to_int(video.get('view_count')),
+            like_count=_to_int(video.get('like_count')),
+            duration=_duration_seconds(video.get('duration') or video.get('duration_string')),
+            upload_date=_text(video.get('upload_date')),
+            uploader=uploader,
+            channel=_interned(video.get('channel')) or uploader,
+            subtitles=_text(video.get('subtitles')),
+            source=sys.intern(video.get('source') or source),
+            subtitle_cues=video.get('subtitle_cues') or None,
+            flat=bool(video.get('flat')),
+        )
+
+    def prompt_block(self, number: int) -> str:
+        """This video's entry in a Gemini analysis prompt."""
+        return f"""
+Video {number}:
+Title: {self.title or 'N/A'}
+URL: {self.url or 'N/A'}
+Description: {self.description or 'N/A'}
+Subtitles: {self.subtitles or 'N/A'}
+Views: {self.view_count:,}
+Likes: {self.like_count:,}
+Duration: {self.duration} seconds
+Channel: {self.channel or 'N/A'}
+"""
+
+    def compact_prompt_block(self, number: int, described_for: str) -> str:
+        """Short entry for a video already described for another topic of the course."""
+        excerpt = self.subtitles[:COMPACT_SUBTITLE_CHARS]
+        return f"""
+Video {number}: (also a candidate for "{described_for}", description omitted)
+Title: {self.title or 'N/A'}
+URL: {self.url or 'N/A'}
+Subtitles (excerpt): {excerpt or 'N/A'}
+Views: {self.view_count:,}
+Likes: {self.like_count:,}
+Duration: {self.duration} seconds
+Channel: {self.channel or 'N/A'}
+"""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self) if getattr(self, f.name) is not None}
+
+
+def normalize_video(video: Dict[str, Any], source: str) -> Video:
+    """Map any fetcher's video dict onto the canonical Video record."""
+    return Video.from_raw(video, source)
+
+
+@dataclass(slots=True)
+class TopicCandidates(_ItemAccess):
+    """The candidate videos found for one topic."""
+
+    topic_name: str
+    videos: List[Video] = field(default_factory=list)
+
+    @property
+    def video_count(self) -> int:
+        return len(self.videos)
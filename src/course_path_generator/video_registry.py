@@ -0,0 +1,150 @@
+"""
+Per-course video registry.
+
+Neighbouring topics of a course often turn up the same videos. While a course is
+being generated, every fetched Video is registered here so later topics reuse
+the record instead of extracting it again, prompts describe an already-seen
+video compactly, and MAX_TOPICS_PER_VIDEO can stop one video from being picked
+for too many topics.
+
+Full records (description, transcript, cues) are only kept for the most recently
+used REGISTRY_MAX_VIDEOS videos, enough for the topics around the one being
+resolved; older videos keep just their id, prompt and selection bookkeeping, so
+a course's registry does not grow with its length.
+"""
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Set
+
+from .video_record import Video
+from .segment_locator import find_selected_video
+
+_current_registry: ContextVar[Optional['CourseVideoRegistry']] = ContextVar('course_video_registry', default=None)
+
+
+def get_max_topics_per_video() -> int:
+    """MAX_TOPICS_PER_VIDEO: how many topics may select the same video (0 = no limit)."""
+    try:
+        return max(0, int(os.getenv('MAX_TOPICS_PER_VIDEO', '0')))
+    except ValueError:
+        return 0
+
+
+def get_registry_max_videos() -> int:
+    """REGISTRY_MAX_VIDEOS: full records kept per course (default 15, about three topics' candidates)."""
+    try:
+        return max(1, int(os.getenv('REGISTRY_MAX_VIDEOS', '15')))
+    except ValueError:
+        return 15
+
+
+class CourseVideoRegistry:
+    """Videos seen while generating one course, keyed by video id."""
+
+    def __init__(self, max_topics_per_video: Optional[int] = None, max_videos: Optional[int] = None):
+        self.max_topics_per_video = get_max_topics_per_video() if max_topics_per_video is None else max_topics_per_video
+        self.max_videos = get_registry_max_videos() if max_videos is None else max(1, max_videos)
+        # Least recently used first; evicted ids stay in seen_ids
+        self.videos: 'OrderedDict[str, Video]' = OrderedDict()
+        self.seen_ids: Set[str] = set()
+        self.described_for: Dict[str, str] = {}
+        self.selected_for: Dict[str, List[str]] = {}
+        self.stats = {'registered': 0, 'reused': 0, 'evicted': 0, 'compactPrompts': 0, 'filteredOverused': 0}
+        self._lock = threading.Lock()
+
+    def get(self, video_id: str) -> Optional[Video]:
+        """A registered video, counted as a reuse (its extraction is skipped)."""
+        with self._lock:
+            video = self.videos.get(video_id)
+            if video is not None:
+                self.videos.move_to_end(video_id)
+                self.stats['reused'] += 1
+            return video
+
+    def register(self, video: Video) -> Video:
+        """Store a video and return the course-wide record for its id."""
+        if not video.video_id:
+            return video
+        with self._lock:
+            known = self.videos.get(video.video_id)
+            if video.video_id not in self.seen_ids:
+                self.seen_ids.add(video.video_id)
+                self.stats['registered'] += 1
+            # Keep whichever record carries the transcript, and full records over flat ones
+            if known is None or (known.flat and not video.flat) or (not known.subtitle_cues and video.subtitle_cues):
+                known = self.videos[video.video_id] = video
+            self.videos.move_to_end(video.video_id)
+            while len(self.videos) > self.max_videos:
+                self.videos.popitem(last=False)
+                self.stats['evicted'] += 1
+            return known
+
+    def register_all(self, videos: List[Video]) -> List[Video]:
+        return [self.register(video) for video in videos]
+
+    def mark_described(self, video_id: str, topic_name: str) -> Optional[str]:
+        """Record that a prompt describes this video; returns the earlier topic if it was already described."""
+        with self._lock:
+            previous = self.described_for.get(video_id)
+            if previous is None:
+                self.described_for[video_id] = topic_name
+            elif previous != topic_name:
+                self.stats['compactPrompts'] += 1
+                return previous
+            return None
+
+    def record_selection(self, analysis: Dict[str, Any], videos: List[Video], topic_name: str) -> None:
+        selected = (analysis or {}).get('selectedVideo') or {}
+        video = find_selected_video(selected, videos)
+        if video is not None and video.video_id:
+            with self._lock:
+                self.selected_for.setdefault(video.video_id, []).append(topic_name)
+
+    def filter_overused(self, videos: List[Video]) -> List[Video]:
+        """Drop videos already selected for max_topics_per_video topics, unless nothing would be left."""
+        if not self.max_topics_per_video:
+            return videos
+        with self._lock:
+            fresh = [video for video in videos
+                     if len(self.selected_for.get(video.video_id, ())) < self.max_topics_per_video]
+            if fresh and len(fresh) < len(videos):
+                self.stats['filteredOverused'] += len(videos) - len(fresh)
+                return fresh
+            return videos
+
+
+def current_video_registry() -> Optional[CourseVideoRegistry]:
+    """The registry of the course being generated in this context, if any."""
+    return _current_registry.get()
+
+
+@contextmanager
+def video_registry_scope(registry: Optional[CourseVideoRegistry] = None):
+    """Make a registry current for one course; reuses an already active one."""
+    active = _current_registry.get()
+    if active is not None and registry is None:
+        yield active
+        return
+    registry = registry or CourseVideoRegistry()
+    token = _current_registry.set(registry)
+    try:
+        yield registry
+    finally:
+        _current_registry.reset(token)
+
+
+def prompt_blocks(videos: List[Video], topic_name: str) -> List[str]:
+    """Prompt entries for a topic's candidates, compact for videos described for an earlier topic."""
+    registry = current_video_registry()
+    blocks = []
+    for number, video in enumerate(videos, 1):
+        video = Video.from_raw(video, 'unknown')
+        previous_topic = registry.mark_described(video.video_id, topic_name) if registry and video.video_id else None
+        if previous_topic:
+            blocks.append(video.compact_prompt_block(number, previous_topic))
+        else:
+            blocks.append(video.prompt_block(number))
+    return blocks
@@ -0,0 +1,236 @@
+"""
+Unified video search backends with adaptive selection.
+
+Every fetcher (basic, simple, enhanced yt-dlp and the hybrid Data API fetcher) is
+wrapped in a VideoSearchBackend that returns canonical Video records. The
+AdaptiveBackendSelector tracks rolling success rate and p50/p95 latency per backend,
+routes each search to the fastest healthy one and keeps a small exploration share
+so a backend that recovers is noticed.
+"""
+import os
+import time
+import random
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import List, Dict, Any, Optional
+
+from .video_record import Video, normalize_video
+from .video_registry import current_video_registry
+from .video_corpus import remember_videos, search_local_corpus
+
+
+class VideoSearchBackend(ABC):
+    """A way of finding candidate videos for a topic."""
+
+    name = 'base'
+    # Whether a search downloads transcripts (slow); skipped when the deadline is close
+    fetches_transcripts = False
+
+    def is_available(self) -> bool:
+        return True
+
+    @abstractmethod
+    def _search(self, topic: str, subject: str, max_results: int) -> List[Dict[str, Any]]:
+        """Run the underlying fetcher and return its raw video dicts."""
+
+    def search(self, topic: str, subject: str = "", max_results: int = 5) -> List[Video]:
+        videos = self._search(topic, subject, max_results) or []
+        videos = [normalize_video(video, self.name) for video in videos if video][:max_results]
+        remember_videos(videos)
+        registry = current_video_registry()
+        # Within a course, a video seen for an earlier topic is shared rather than duplicated
+        return registry.register_all(videos) if registry else videos
+
+
+class BasicYtdlpBackend(VideoSearchBackend):
+    """Flat yt-dlp search from get_youtube_videos (the original main path)."""
+
+    name = 'basic'
+
+    def _search(self, topic, subject, max_results):
+        from .get_youtube_videos import search_youtube_videos, create_basic_ydl_opts
+        return search_youtube_videos(topic, create_basic_ydl_opts(), subject, max_results=max_results)
+
+
+class SimpleYtdlpBackend(VideoSearchBackend):
+    """Minimal-option yt-dlp search from youtube_fetcher_simple."""
+
+    name = 'simple'
+
+    def _search(self, topic, subject, max_results):
+        from .youtube_fetcher_simple import search_youtube_videos_simple
+        return search_youtube_videos_simple(topic, subject, max_results=max_results)
+
+
+class EnhancedYtdlpBackend(VideoSearchBackend):
+    """yt-dlp search with retries and subtitle download from youtube_fetcher_enhanced."""
+
+    name = 'enhanced'
+    fetches_transcripts = True
+
+    def _search(self, topic, subject, max_results):
+        from .youtube_fetcher_enhanced import search_youtube_videos_enhanced
+        return search_youtube_videos_enhanced(topic, subject, max_results=max_results)
+
+
+class HybridApiBackend(VideoSearchBackend):
+    """YouTube Data API v3 with yt-dlp fallback from youtube_hybrid_fetcher."""
+
+    name = 'hybrid'
+
+    def is_available(self) -> bool:
+        # Without an API key the hybrid fetcher is just another yt-dlp search
+        return bool(os.getenv('YOUTUBE_API_KEY'))
+
+    def _search(self, topic, subject, max_results):
+        from .youtube_hybrid_fetcher import get_youtube_fetcher
+        return get_youtube_fetcher().search_videos(topic, subject, max_results=max_results)
+
+
+BACKEND_CLASSES = {
+    backend_class.name: backend_class
+    for backend_class in (BasicYtdlpBackend, SimpleYtdlpBackend, EnhancedYtdlpBackend, HybridApiBackend)
+}
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class BackendStats:
+    """Rolling window of (success, latency) outcomes for one backend."""
+
+    def __init__(self, window: int):
+        self.outcomes = deque(maxlen=window)
+
+    def record(self, success: bool, latency: float) -> None:
+        self.outcomes.append((success, latency))
+
+    @property
+    def samples(self) -> int:
+        return len(self.outcomes)
+
+    def success_rate(self) -> Optional[float]:
+        if not self.outcomes:
+            return None
+        return sum(1 for success, _ in self.outcomes if success) / len(self.outcomes)
+
+    def latency_percentiles(self) -> Dict[str, Optional[float]]:
+        # Latency of successful searches only: failures are often fast and would flatter a broken backend
+        latencies = sorted(latency for success, latency in self.outcomes if success)
+        return {'p50': _percentile(latencies, 0.5), 'p95': _percentile(latencies, 0.95)}
+
+    def snapshot(self) -> Dict[str, Any]:
+        percentiles = self.latency_percentiles()
+        return {
+            'samples': self.samples,
+            'successRate': self.success_rate(),
+            'p50Seconds': percentiles['p50'],
+            'p95Seconds': percentiles['p95'],
+        }
+
+
+class AdaptiveBackendSelector:
+    """Routes searches to the fastest healthy backend, failing over to the others."""
+
+    def __init__(self, backends: List[VideoSearchBackend], window: int = 50,
+                 exploration_rate: float = 0.1, min_success_rate: float = 0.5, min_samples: int = 3):
+        self.backends = [backend for backend in backends if backend.is_available()]
+        self.exploration_rate = exploration_rate
+        self.min_success_rate = min_success_rate
+        self.min_samples = min_samples
+        self.stats = {backend.name: BackendStats(window) for backend in self.backends}
+        self._lock = threading.Lock()
+
+    def _is_healthy(self, backend: VideoSearchBackend) -> bool:
+        stats = self.stats[backend.name]
+        if stats.samples < self.min_samples:
+            return True  # Not enough evidence yet, give it the benefit of the doubt
+        return stats.success_rate() >= self.min_success_rate
+
+    def ranked_backends(self) -> List[VideoSearchBackend]:
+        """Backends in the order they should be tried for the next search."""
+        with self._lock:
+            def sort_key(item):
+                position, backend = item
+                stats = self.stats[backend.name]
+                p50 = stats.latency_percentiles()['p50']
+                healthy = self._is_healthy(backend)
+                # Healthy backends with measured latency first (fastest p50 wins), then
+                # unmeasured ones in configured order, then unhealthy ones by success rate
+                if healthy and p50 is not None and stats.samples >= self.min_samples:
+                    return (0, p50, position)
+                if healthy:
+                    return (1, 0.0, position)
+                return (2, -(stats.success_rate() or 0.0), position)
+
+            ranked = [backend for _, backend in sorted(enumerate(self.backends), key=sort_key)]
+
+        if len(ranked) > 1 and random.random() < self.exploration_rate:
+            # Exploration: give one of the other backends the first attempt
+            explored = random.choice(ranked[1:])
+            ranked.remove(explored)
+            ranked.insert(0, explored)
+        return ranked
+
+    def record(self, backend_name: str, success: bool, latency: float) -> None:
+        with self._lock:
+            self.stats[backend_name].record(success, latency)
+
+    def search(self, topic: str, subject: str = "", max_results: int = 5, transcripts: bool = True) -> List[Video]:
+        """Search the local corpus, then the preferred backend, failing over until one returns videos.
+
+        With transcripts=False, backends that download transcripts are only used
+        when no other backend is configured.
+        """
+        local_videos = search_local_corpus(topic, subject, max_results)
+        if local_videos:
+            registry = current_video_registry()
+            return registry.register_all(local_videos) if registry else local_videos
+
+        backends = self.ranked_backends()
+        if not transcripts:
+            backends = [backend for backend in backends if not backend.fetches_transcripts] or backends
+        for backend in backends:
+            start_time = time.time()
+            try:
+                print(f"    Using {backend.name} search backend...")
+                videos = backend.search(topic, subject, max_results)
+            except Exception as e:
+                print(f"    ⚠️ {backend.name} backend error: {str(e)[:100]}")
+                videos = []
+            self.record(backend.name, bool(videos), time.time() - start_time)
+            if videos:
+                return videos
+        return []
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+
+_selector = None
+_selector_lock = threading.Lock()
+
+
+def get_backend_selector() -> AdaptiveBackendSelector:
+    """Process-wide selector configured from the environment.
+
+    VIDEO_SEARCH_BACKENDS: comma-separated backend names in preference order
+    BACKEND_EXPLORATION_RATE: share of searches sent to a non-preferred backend
+    """
+    global _selector
+    if _selector is None:
+        with _selector_lock:
+            if _selector is None:
+                names = os.getenv('VIDEO_SEARCH_BACKENDS', 'basic,simple,enhanced,hybrid').split(',')
+                backends = [BACKEND_CLASSES[name.strip()]() for name in names if name.strip() in BACKEND_CLASSES]
+                _selector = AdaptiveBackendSelector(
+                    backends,
+                    exploration_rate=float(os.getenv('BACKEND_EXPLORATION_RATE', '0.1')),
+                )
+    return _selector
@@ -1,16 +1,31 @@
 """
 Enhanced YouTube video fetcher with anti-detection measures
 """
-import yt_dlp
 import json
-import time
 import random
+import threading
+from concurrent.futures import Future, CancelledError
 from typing import List, Dict, Any
 import requests
 
+from .subtitle_normalizer import (
+    SUPPORTED_FORMATS, normalize_subtitles, parse_vtt_subtitles, parse_json3_subtitles, clean_subtitle_text
+)
+from .ytdlp_rate_controller import (
+    get_ytdlp_controller, extract_info_checked, chain, gather, NoVideosFoundError, YtdlpBlockedError
+)
+from .candidate_ranker import shortlist_candidates, get_shortlist_size
+from .video_record import Video
+from .video_registry import current_video_registry
+from .bulkheads import run_in_bulkhead
 
-def create_enhanced_ydl_opts():
-    """Create yt-dlp options with enhanced anti-detection"""
+
+def create_enhanced_ydl_opts(flat: bool = True):
+    """
+    Create yt-dlp options with enhanced anti-detection.
+    flat=True only lists search results (ids, titles, durations); flat=False
+    extracts the full metadata and subtitle tracks of a single video.
+    """
     
     user_agents = [
         'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -23,11 +38,11 @@ def create_enhanced_ydl_opts():
     return {
         'quiet': True,
         'no_warnings': True,
-        'extract_flat': True,  # Only get basic info, no format processing
+        'extract_flat': flat,
         'writesubtitles': False,
         'writeautomaticsub': False,
         'skip_download': True,
-        'ignoreerrors': True,
+        'ignoreerrors': True,  # Continue on errors
         
         # Random user agent
         'user_agent': random.choice(user_agents),
@@ -56,18 +71,24 @@ def create_enhanced_ydl_opts():
         
         # Additional options
         'noplaylist': True,
-        'extract_flat': False,
-        'ignoreerrors': True,  # Continue on errors
         
         # Cookie handling
         'cookiesfrombrowser': None,  # Don't use browser cookies initially
     }
 
 
-def search_youtube_videos_enhanced(topic: str, subject: str = "", max_retries: int = 3) -> List[Dict[str, Any]]:
+def search_youtube_videos_enhanced_async(topic: str, subject: str = "", max_retries: int = 3, max_results: int = 5,
+                                         cancel_event: threading.Event = None) -> Future:
     """
-    Enhanced YouTube video search with multiple fallback strategies
+    Schedule an enhanced search on the shared yt-dlp rate controller.
+    A flat search is pre-ranked locally and only the shortlist is fully
+    extracted; the rest of the max_results best entries are returned as flat
+    Video records (no description or transcript). Retries and per-video extractions are delayed tasks, so no thread
+    sleeps while YouTube is throttling us. Cancelling the returned future (or
+    setting cancel_event) drops the work that has not started yet.
     """
+    controller = get_ytdlp_controller()
+    registry = current_video_registry()
     
     # Create search query
     if subject and subject.strip():
@@ -75,54 +96,78 @@ def search_youtube_videos_enhanced(topic: str, subject: str = "", max_retries: i
     else:
         search_query = topic
     
-    search_url = f"ytsearch5:{search_query}"
-    videos_info = []
+    search_url = f"ytsearch{max_results}:{search_query}"
     
-    for attempt in range(max_retries):
+    def search_attempt() -> List[Dict[str, Any]]:
+        # Phase 1: a cheap flat listing (fresh user agent on every attempt)
+        search_results = extract_info_checked(create_enhanced_ydl_opts(flat=True), search_url)
+        entries = [video for video in (search_results or {}).get('entries') or [] if video]
+        if not entries:
+            raise NoVideosFoundError(f"No videos found for '{search_query}'")
+        return entries
+    
+    def fetch_details(entries: List[Dict]) -> Future:
+        # Phase 2: full extraction only for the shortlist, one rate slot per video
+        ranked = shortlist_candidates(entries, topic, subject, k=max_results)
+        shortlist_size = get_shortlist_size()
+        print(f"    🎯 Shortlisted {min(len(ranked), shortlist_size)}/{len(entries)} videos for full extraction")
+        futures = []
+        for position, video in enumerate(ranked):
+            known = registry.get(video['id']) if registry else None
+            if known is not None and not known.flat:
+                # Already extracted for an earlier topic of this course
+                futures.append(Future())
+                futures[-1].set_result(known)
+            elif position >= shortlist_size:
+                # Past the shortlist: a candidate from the flat metadata alone
+                futures.append(Future())
+                futures[-1].set_result(Video.from_raw({**video, 'flat': True}, 'enhanced'))
+            else:
+                futures.append(controller.submit(extract_full_video_details, video, cancel_event, cancel_event=cancel_event))
+        return gather(futures)
+    
+    searched = controller.submit_with_retries(search_attempt, max_attempts=max_retries, cancel_event=cancel_event)
+    return chain(searched, fetch_details)
+
+
+def extract_full_video_details(flat_entry: Dict, cancel_event: threading.Event = None) -> Video:
+    """
+    Fully extract one shortlisted video and build its details.
+    Falls back to the flat search metadata if the full extraction fails.
+    """
+    video_data = flat_entry
+    if not (cancel_event is not None and cancel_event.is_set()):
+        video_url = flat_entry.get('webpage_url') or f"https://www.youtube.com/watch?v={flat_entry['id']}"
         try:
-            print(f"    Attempt {attempt + 1}/{max_retries}")
-            
-            # Create new options for each attempt
-            ydl_opts = create_enhanced_ydl_opts()
-            
-            # Add random delay between attempts
-            if attempt > 0:
-                delay = random.uniform(5, 15)
-                print(f"    Waiting {delay:.1f} seconds before retry...")
-                time.sleep(delay)
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                search_results = ydl.extract_info(search_url, download=False)
-                
-                if 'entries' in search_results:
-                    for video in search_results['entries']:
-                        if video:  # Sometimes entries can be None
-                            video_info = extract_video_details_safe(video, ydl)
-                            if video_info:
-                                videos_info.append(video_info)
-                    
-                    if videos_info:
-                        print(f"    ✅ Successfully found {len(videos_info)} videos")
-                        return videos_info
-            
+            video_data = extract_info_checked(create_enhanced_ydl_opts(flat=False), video_url) or flat_entry
+        except YtdlpBlockedError:
+            get_ytdlp_controller().record_block()
         except Exception as e:
-            error_msg = str(e)
-            print(f"    ❌ Attempt {attempt + 1} failed: {error_msg}")
-            
-            # Check for specific YouTube errors
-            if "Sign in to confirm" in error_msg or "HTTP Error 403" in error_msg:
-                print(f"    🤖 YouTube bot detection triggered, waiting longer...")
-                if attempt < max_retries - 1:
-                    time.sleep(random.uniform(30, 60))  # Wait 30-60 seconds
-            else:
-                if attempt < max_retries - 1:
-                    time.sleep(random.uniform(5, 10))
+            print(f"    ⚠️ Full extraction failed, using search metadata: {str(e)[:100]}")
+    return extract_video_details_safe(video_data, None, cancel_event)
+
+
+def search_youtube_videos_enhanced(topic: str, subject: str = "", max_retries: int = 3, max_results: int = 5,
+                                   cancel_event: threading.Event = None) -> List[Video]:
+    """
+    Enhanced YouTube video search with multiple fallback strategies.
+    Setting cancel_event (e.g. when a racing search already won) aborts pending retries.
+    """
+    future = search_youtube_videos_enhanced_async(topic, subject, max_retries, max_results, cancel_event)
+    try:
+        videos_info = [video for video in future.result() if video]
+    except CancelledError:
+        print("    ⏹️ Search cancelled")
+        return []
+    except Exception as e:
+        print(f"    ❌ All {max_retries} attempts failed: {str(e)[:100]}")
+        return []
     
-    print(f"    ❌ All {max_retries} attempts failed")
+    print(f"    ✅ Successfully found {len(videos_info)} videos")
     return videos_info
 
 
-def extract_video_details_safe(video_data: Dict, ydl: yt_dlp.YoutubeDL) -> Dict[str, Any]:
+def extract_video_details_safe(video_data: Dict, ydl=None, cancel_event: threading.Event = None) -> Video:
     """
     Safely extract video details with error handling
     """
@@ -144,28 +189,26 @@ def extract_video_details_safe(video_data: Dict, ydl: yt_dlp.YoutubeDL) -> Dict[
         
         # Try to get subtitles, but don't fail if we can't
         try:
-            if video_data.get('id'):
-                # Add small delay before subtitle extraction
-                time.sleep(random.uniform(1, 3))
-                
-                # Get subtitle text
-                subtitles_text = extract_subtitles_safe(video_data)
-                video_info['subtitles'] = subtitles_text
+            if video_data.get('id') and not (cancel_event is not None and cancel_event.is_set()):
+                # Text only, parsed up to the prompt's character cap; timed cues are
+                # fetched for the selected video alone (see fetch_subtitle_cues)
+                video_info['subtitles'] = extract_subtitles_safe(video_data)
                 
         except Exception as subtitle_error:
             print(f"    ⚠️ Could not extract subtitles: {str(subtitle_error)[:100]}...")
             video_info['subtitles'] = 'Subtitle extraction failed'
         
-        return video_info
+        return Video.from_raw(video_info, 'enhanced')
         
     except Exception as e:
         print(f"    ⚠️ Error extracting video details: {str(e)[:100]}...")
         return None
 
 
-def extract_subtitles_safe(video_info: Dict) -> str:
+def extract_subtitles_safe(video_info: Dict, cues_out: List = None) -> str:
     """
-    Safely extract subtitles with fallback strategies
+    Safely extract subtitles with fallback strategies.
+    When cues_out is given, timed (start_ms, end_ms, text) cues are appended to it.
     """
     try:
         # Try to get subtitles or automatic subtitles
@@ -183,12 +226,11 @@ def extract_subtitles_safe(video_info: Dict) -> str:
                     
                     # Find a suitable subtitle format
                     for entry in subtitle_entries:
-                        if entry.get('url') and entry.get('ext') in ['vtt', 'srv3', 'ttml', 'json3']:
+                        if entry.get('url') and entry.get('ext') in SUPPORTED_FORMATS:
                             try:
-                                # Add delay before subtitle download
-                                time.sleep(random.uniform(1, 2))
-                                
-                                response = requests.get(
+                                # Downloads have their own bulkhead so they cannot starve searches
+                                response = run_in_bulkhead(
+                                    'transcripts', requests.get,
                                     entry['url'], 
                                     timeout=15,
                                     headers={
@@ -197,15 +239,18 @@ def extract_subtitles_safe(video_info: Dict) -> str:
                                     }
                                 )
                                 
+                                if response.status_code == 429:
+                                    # Throttled: slow every yt-dlp fetcher down, not just this one
+                                    get_ytdlp_controller().record_block()
+                                    break
+                                
                                 if response.status_code == 200:
                                     subtitle_content = response.text
                                     
-                                    # Parse based on format
-                                    if entry.get('ext') == 'vtt':
-                                        return parse_vtt_subtitles(subtitle_content)
-                                    elif entry.get('ext') == 'json3':
-                                        return parse_json3_subtitles(subtitle_content)
-                                    else:
+                                    # Parse based on format in a single pass
+                                    try:
+                                        return normalize_subtitles(subtitle_content, entry['ext'], cues_out=cues_out)
+                                    except (ValueError, TypeError, AttributeError):
                                         return clean_subtitle_text(subtitle_content)
                                         
                             except Exception as download_error:
@@ -220,64 +265,3 @@ def extract_subtitles_safe(video_info: Dict) -> str:
         
     except Exception as e:
         return f"Subtitle extraction error: {str(e)[:100]}..."
-
-
-def parse_vtt_subtitles(vtt_content: str) -> str:
-    """Parse VTT subtitle format and extract text."""
-    try:
-        lines = vtt_content.split('\n')
-        subtitle_text = []
-        
-        for line in lines:
-            line = line.strip()
-            # Skip VTT headers, timestamps, and empty lines
-            if (line and 
-                not line.startswith('WEBVTT') and 
-                not line.startswith('NOTE') and
-                not '-->' in line and
-                not line.isdigit()):
-                # Remove VTT styling tags
-                import re
-                clean_line = re.sub(r'<[^>]+>', '', line)
-                if clean_line:
-                    subtitle_text.append(clean_line)
-        
-        return ' '.join(subtitle_text)[:5000]  # Limit to 5000 chars
-    except:
-        return "VTT parsing failed"
-
-
-def parse_json3_subtitles(json_content: str) -> str:
-    """Parse JSON3 subtitle format and extract text."""
-    try:
-        import json
-        data = json.loads(json_content)
-        
-        subtitle_text = []
-        if 'events' in data:
-            for event in data['events']:
-                if 'segs' in event:
-                    for seg in event['segs']:
-                        if 'utf8' in seg:
-                            subtitle_text.append(seg['utf8'])
-        
-        return ' '.join(subtitle_text)[:5000]  # Limit to 5000 chars
-    except:
-        return "JSON3 parsing failed"
-
-
-def clean_subtitle_text(raw_content: str) -> str:
-    """Clean raw subtitle content by removing timestamps and formatting."""
-    try:
-        import re
-        
-        # Remove common timestamp patterns
-        content = re.sub(r'\d{2}:\d{2}:\d{2}[.,]\d{3}\s*-->\s*\d{2}:\d{2}:\d{2}[.,]\d{3}', '', raw_content)
-        content = re.sub(r'\d+\s*\n', '', content)  # Remove sequence numbers
-        content = re.sub(r'<[^>]+>', '', content)    # Remove HTML/XML tags
-        content = re.sub(r'\n+', ' ', content)       # Replace multiple newlines with space
-        content = re.sub(r'\s+', ' ', content)       # Replace multiple spaces with single space
-        
-        return content.strip()[:5000]  # Limit to 5000 chars
-    except:
-        return "Text cleaning failed"
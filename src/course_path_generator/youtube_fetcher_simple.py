@@ -1,11 +1,12 @@
-import yt_dlp
 import json
-import time
 import random
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
 
+from .ytdlp_rate_controller import get_ytdlp_controller, extract_info_checked
+from .video_record import Video, TopicCandidates
 
-def search_youtube_videos_simple(topic: str, subject: str = "", max_results: int = 5) -> List[Dict[str, Any]]:
+
+def search_youtube_videos_simple(topic: str, subject: str = "", max_results: int = 5) -> List[Video]:
     """
     Simple and safe YouTube video search using yt-dlp
     """
@@ -33,44 +34,31 @@ def search_youtube_videos_simple(topic: str, subject: str = "", max_results: int
     try:
         print(f"    Searching with simple yt-dlp...")
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            search_results = ydl.extract_info(search_url, download=False)
+        search_results = get_ytdlp_controller().call(extract_info_checked, ydl_opts, search_url)
+        
+        if search_results and search_results.get('entries'):
+            for video in search_results['entries']:
+                if video and 'id' in video:
+                    # Subtitles are skipped; flat results carry numeric duration and counters
+                    videos_info.append(Video.from_raw(video, 'simple'))
+            
+            print(f"    ✅ Successfully found {len(videos_info)} videos")
+            return videos_info
+        else:
+            print(f"    ⚠️ No videos found in search results")
+            return []
             
-            if 'entries' in search_results and search_results['entries']:
-                for video in search_results['entries']:
-                    if video and 'id' in video:
-                        video_info = {
-                            'video_id': video.get('id', 'N/A'),
-                            'title': video.get('title', 'No Title'),
-                            'url': f"https://www.youtube.com/watch?v={video.get('id', '')}",
-                            'description': video.get('description', 'No description available'),
-                            'duration': video.get('duration_string', 'N/A'),
-                            'view_count': video.get('view_count', 0),
-                            'uploader': video.get('uploader', 'Unknown'),
-                            'upload_date': video.get('upload_date', 'N/A'),
-                            'channel_id': video.get('channel_id', 'N/A'),
-                            'channel_url': video.get('channel_url', 'N/A'),
-                            'subtitles': {},  # Skip subtitles for now
-                            'topic': topic
-                        }
-                        videos_info.append(video_info)
-                
-                print(f"    ✅ Successfully found {len(videos_info)} videos")
-                return videos_info
-            else:
-                print(f"    ⚠️ No videos found in search results")
-                return []
-                
     except Exception as e:
         print(f"    ❌ Error during search: {str(e)}")
         return []
 
 
-def get_youtube_videos_simple(topics: List[str], subject: str = "") -> List[Dict[str, Any]]:
+def iter_youtube_videos_simple(topics: Iterable[str], subject: str = "") -> Iterator[TopicCandidates]:
     """
-    Get YouTube videos for multiple topics using simple approach
+    Yield YouTube videos topic by topic using simple approach
     """
-    all_topics_data = []
+    topics = list(topics)
+    total_videos = 0
     
     print(f"Processing {len(topics)} topics with simple search...")
     
@@ -82,41 +70,26 @@ def get_youtube_videos_simple(topics: List[str], subject: str = "") -> List[Dict
             videos_for_topic = search_youtube_videos_simple(topic, subject)
             
             if videos_for_topic:
-                topic_data = {
-                    'topic': topic,
-                    'videos': videos_for_topic,
-                    'video_count': len(videos_for_topic)
-                }
-                all_topics_data.append(topic_data)
                 print(f"  ✓ Found {len(videos_for_topic)} videos for '{topic}'")
             else:
                 print(f"  ✗ No videos found for '{topic}'")
-                # Add empty topic data
-                topic_data = {
-                    'topic': topic,
-                    'videos': [],
-                    'video_count': 0
-                }
-                all_topics_data.append(topic_data)
-            
-            # Add a small delay between requests
-            if i < len(topics):
-                time.sleep(1)
                 
         except Exception as e:
             print(f"  ❌ Error processing topic '{topic}': {str(e)}")
-            # Add empty topic data for failed topics
-            topic_data = {
-                'topic': topic,
-                'videos': [],
-                'video_count': 0
-            }
-            all_topics_data.append(topic_data)
-    
-    total_videos = sum(topic_data['video_count'] for topic_data in all_topics_data)
-    print(f"\n✅ Simple search completed! Found {total_videos} videos across {len(all_topics_data)} topics")
+            # Yield empty topic data for failed topics
+            videos_for_topic = []
+        
+        total_videos += len(videos_for_topic)
+        yield TopicCandidates(topic, videos_for_topic)
     
-    return all_topics_data
+    print(f"\n✅ Simple search completed! Found {total_videos} videos across {len(topics)} topics")
+
+
+def get_youtube_videos_simple(topics: List[str], subject: str = "") -> List[TopicCandidates]:
+    """
+    Get YouTube videos for multiple topics using simple approach
+    """
+    return list(iter_youtube_videos_simple(topics, subject))
 
 
 if __name__ == "__main__":
@@ -126,7 +99,7 @@ if __name__ == "__main__":
     
     print(f"\nTest Results:")
     for topic_data in result:
-        print(f"Topic: {topic_data['topic']}")
-        print(f"Videos found: {topic_data['video_count']}")
-        for video in topic_data['videos'][:2]:  # Show first 2 videos
-            print(f"  - {video['title']}")
\ No newline at end of file
+        print(f"Topic: {topic_data.topic_name}")
+        print(f"Videos found: {topic_data.video_count}")
+        for video in topic_data.videos[:2]:  # Show first 2 videos
+            print(f"  - {video.title}")
@@ -1,32 +1,176 @@
 """
 Hybrid YouTube fetcher using YouTube Data API v3 + yt-dlp fallback
 This approach works well on Render without cookies
+
+Importing this module is cheap: the fetcher, the API client and the heavy
+googleapiclient / yt-dlp / pymongo imports are all deferred to first use.
 """
 import os
 import json
 import time
 import random
-from typing import List, Dict, Any
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-import yt_dlp
+import threading
+from concurrent.futures import Future
+from typing import List, Dict, Any, Callable, Optional
+
+from src.db.quota_ledger import SEARCH_LIST_COST, VIDEOS_LIST_COST
+from .video_record import Video
+from .video_registry import current_video_registry
+
+DISCOVERY_URL = 'https://youtube.googleapis.com/$discovery/rest?version=v3'
+# Discovery document cached on disk so `build` works offline after the first fetch
+DISCOVERY_CACHE_PATH = os.getenv(
+    'YOUTUBE_DISCOVERY_CACHE',
+    os.path.join(os.path.dirname(__file__), '.cache', 'youtube_v3_discovery.json')
+)
+
+
+# videos().list accepts up to 50 ids for the same 1-unit cost
+VIDEOS_LIST_MAX_IDS = 50
+
+
+class VideoDetailsBatcher:
+    """Coalesces videos().list lookups from concurrent topic searches into one call.
+
+    The first caller in a window becomes the leader: it waits up to window_seconds
+    (or until 50 ids are queued), resolves every queued id with a single call and
+    fans the items back out to each waiting caller. Ids shared by several topics
+    are requested once.
+    """
+    
+    def __init__(self, fetch_details: Callable[[List[str]], Dict[str, dict]], window_seconds: float = 0.05,
+                 max_ids: int = VIDEOS_LIST_MAX_IDS):
+        self.fetch_details = fetch_details
+        self.window_seconds = window_seconds
+        self.max_ids = max_ids
+        self.calls_made = 0
+        self.requests_served = 0
+        self._pending = []  # (video_ids, future)
+        self._pending_ids = set()
+        self._leader_active = False
+        self._cond = threading.Condition()
+    
+    def get(self, video_ids: List[str]) -> Dict[str, dict]:
+        """Return {video_id: videos().list item} for the requested ids."""
+        future = Future()
+        with self._cond:
+            self._pending.append((list(video_ids), future))
+            self._pending_ids.update(video_ids)
+            if len(self._pending_ids) >= self.max_ids:
+                self._cond.notify_all()
+            is_leader = not self._leader_active
+            self._leader_active = True
+        
+        if is_leader:
+            self._lead()
+        return future.result()
+    
+    def _take_batch(self) -> List[tuple]:
+        """Pop whole requests until the next one would push the batch past max_ids."""
+        batch, batch_ids = [], set()
+        while self._pending:
+            ids = set(self._pending[0][0])
+            if batch and len(batch_ids | ids) > self.max_ids:
+                break
+            batch.append(self._pending.pop(0))
+            batch_ids |= ids
+        self._pending_ids = {video_id for ids, _ in self._pending for video_id in ids}
+        return batch
+    
+    def _lead(self) -> None:
+        deadline = time.monotonic() + self.window_seconds
+        while True:
+            with self._cond:
+                while len(self._pending_ids) < self.max_ids:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take_batch()
+                if not batch:
+                    self._leader_active = False
+                    return
+            
+            unique_ids = list(dict.fromkeys(video_id for ids, _ in batch for video_id in ids))
+            try:
+                items = self.fetch_details(unique_ids[:self.max_ids])
+                self.calls_made += 1
+                self.requests_served += len(batch)
+                for ids, future in batch:
+                    future.set_result({video_id: items[video_id] for video_id in ids if video_id in items})
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            # Requests arriving before the original window closes join the next batch
+
+
+def _load_discovery_document() -> Optional[str]:
+    """Find the YouTube v3 discovery document without touching the network if possible.
+
+    Order: on-disk cache, the copy bundled with google-api-python-client, then a
+    one-off download that is written to the cache for the next process.
+    """
+    try:
+        with open(DISCOVERY_CACHE_PATH, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        pass
+    
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+        document = get_static_doc('youtube', 'v3')
+        if document:
+            return document
+    except ImportError:
+        pass
+    
+    try:
+        import requests
+        response = requests.get(DISCOVERY_URL, timeout=10)
+        response.raise_for_status()
+        document = response.text
+        os.makedirs(os.path.dirname(DISCOVERY_CACHE_PATH), exist_ok=True)
+        with open(DISCOVERY_CACHE_PATH, 'w', encoding='utf-8') as f:
+            f.write(document)
+        return document
+    except Exception as e:
+        print(f"⚠️ Could not load YouTube discovery document: {e}")
+        return None
+
+
+def build_youtube_service(api_key: str):
+    """Build a Data API client from the local discovery document."""
+    from googleapiclient.discovery import build_from_document
+    document = _load_discovery_document()
+    if not document:
+        raise RuntimeError("YouTube discovery document unavailable")
+    return build_from_document(document, developerKey=api_key)
 
 
 class HybridYoutubeFetcher:
     def __init__(self):
+        from src.db.quota_ledger import YoutubeQuotaLedger
         self.youtube_api_key = os.getenv('YOUTUBE_API_KEY')
         self.youtube_service = None
-        self.daily_quota_used = 0
-        self.max_daily_quota = 9000  # Conservative limit
+        # httplib2 connections are not thread-safe: one per thread, one client per process
+        self._http_local = threading.local()
+        # Daily quota is shared by every worker and replica through Mongo
+        self.quota_ledger = YoutubeQuotaLedger()
+        self.max_daily_quota = self.quota_ledger.daily_limit
+        # Concurrent topic searches share videos().list calls
+        self.details_batcher = VideoDetailsBatcher(
+            self._fetch_video_details,
+            window_seconds=int(os.getenv('YOUTUBE_DETAILS_BATCH_WINDOW_MS', '50')) / 1000,
+        )
         
         if self.youtube_api_key:
             try:
-                self.youtube_service = build('youtube', 'v3', developerKey=self.youtube_api_key)
+                self.youtube_service = build_youtube_service(self.youtube_api_key)
                 print("✅ YouTube Data API initialized")
             except Exception as e:
                 print(f"⚠️ YouTube Data API initialization failed: {e}")
     
-    def search_videos(self, topic: str, subject: str = "", max_results: int = 5) -> List[Dict[str, Any]]:
+    def search_videos(self, topic: str, subject: str = "", max_results: int = 5) -> List[Video]:
         """
         Search for videos using hybrid approach:
         1. Try YouTube Data API first (fast, reliable, no subtitles)
@@ -40,7 +184,7 @@ class HybridYoutubeFetcher:
         videos = []
         
         # Try YouTube Data API first
-        if self.youtube_service and self.daily_quota_used < self.max_daily_quota:
+        if self.youtube_service and self.has_api_quota():
             videos = self._search_with_api(query, max_results)
             
         # If API failed or no results, try yt-dlp
@@ -50,10 +194,31 @@ class HybridYoutubeFetcher:
         
         return videos
     
-    def _search_with_api(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+    def _http(self):
+        """Per-thread HTTP connection for executing requests on the shared client."""
+        http = getattr(self._http_local, 'http', None)
+        if http is None:
+            import httplib2
+            http = httplib2.Http(timeout=30)
+            self._http_local.http = http
+        return http
+    
+    @property
+    def daily_quota_used(self) -> int:
+        return self.quota_ledger.used_today()
+    
+    def has_api_quota(self, units: int = SEARCH_LIST_COST + VIDEOS_LIST_COST) -> bool:
+        return self.quota_ledger.remaining() >= units
+    
+    def _search_with_api(self, query: str, max_results: int) -> List[Video]:
         """Search using YouTube Data API v3"""
+        from googleapiclient.errors import HttpError
+        
         try:
-            # Search for videos (costs 100 quota units)
+            # Search for videos (costs 100 quota units), reserved before the call
+            if not self.quota_ledger.reserve(SEARCH_LIST_COST):
+                print("    💸 YouTube API daily quota spent, skipping API search")
+                return []
             search_response = self.youtube_service.search().list(
                 q=query,
                 part='id,snippet',
@@ -63,9 +228,7 @@ class HybridYoutubeFetcher:
                 videoDuration='medium',  # 4-20 minutes
                 videoDefinition='any',
                 videoCaption='any'
-            ).execute()
-            
-            self.daily_quota_used += 100
+            ).execute(http=self._http())
             
             video_ids = []
             videos_info = []
@@ -77,17 +240,24 @@ class HybridYoutubeFetcher:
             if not video_ids:
                 return []
             
-            # Get detailed video information (costs 1 quota unit per video)
-            videos_response = self.youtube_service.videos().list(
-                part='snippet,statistics,contentDetails',
-                id=','.join(video_ids)
-            ).execute()
+            # Videos already fetched for an earlier topic of this course need no details call
+            registry = current_video_registry()
+            known = {video_id: registry.get(video_id) for video_id in video_ids} if registry else {}
+            missing_ids = [video_id for video_id in video_ids if known.get(video_id) is None]
             
-            self.daily_quota_used += len(video_ids)
+            # Get detailed video information, batched with other topics' lookups
+            details = self.details_batcher.get(missing_ids) if missing_ids else {}
+            if not details and len(missing_ids) == len(video_ids):
+                return []
             
-            # Process video details
-            for video in videos_response['items']:
-                video_info = self._process_api_video(video)
+            # Process video details in search-relevance order
+            for video_id in video_ids:
+                if known.get(video_id) is not None:
+                    videos_info.append(known[video_id])
+                    continue
+                if video_id not in details:
+                    continue
+                video_info = self._process_api_video(details[video_id])
                 if video_info:
                     videos_info.append(video_info)
             
@@ -97,13 +267,24 @@ class HybridYoutubeFetcher:
         except HttpError as e:
             print(f"    ❌ YouTube API error: {e}")
             if "quotaExceeded" in str(e):
-                self.daily_quota_used = self.max_daily_quota  # Disable API for today
+                self.quota_ledger.mark_exhausted()  # Disable API for today on every replica
             return []
         except Exception as e:
             print(f"    ❌ YouTube API unexpected error: {e}")
             return []
     
-    def _process_api_video(self, video: dict) -> Dict[str, Any]:
+    def _fetch_video_details(self, video_ids: List[str]) -> Dict[str, dict]:
+        """One videos().list call (1 quota unit) for up to 50 ids."""
+        if not self.quota_ledger.reserve(VIDEOS_LIST_COST):
+            print("    💸 YouTube API daily quota spent, skipping video details")
+            return {}
+        videos_response = self.youtube_service.videos().list(
+            part='snippet,statistics,contentDetails',
+            id=','.join(video_ids)
+        ).execute(http=self._http())
+        return {item['id']: item for item in videos_response.get('items', [])}
+    
+    def _process_api_video(self, video: dict) -> Video:
         """Process video data from YouTube API"""
         try:
             snippet = video['snippet']
@@ -114,20 +295,19 @@ class HybridYoutubeFetcher:
             duration_str = content_details.get('duration', 'PT0S')
             duration_seconds = self._parse_duration(duration_str)
             
-            return {
-                'title': snippet.get('title', 'N/A'),
+            return Video.from_raw({
+                'title': snippet.get('title'),
                 'url': f"https://www.youtube.com/watch?v={video['id']}",
                 'video_id': video['id'],
-                'description': snippet.get('description', 'N/A'),
-                'view_count': int(statistics.get('viewCount', 0)),
-                'like_count': int(statistics.get('likeCount', 0)),
+                'description': snippet.get('description'),
+                'view_count': statistics.get('viewCount'),
+                'like_count': statistics.get('likeCount'),
                 'duration': duration_seconds,
-                'upload_date': snippet.get('publishedAt', 'N/A'),
-                'uploader': snippet.get('channelTitle', 'N/A'),
-                'channel': snippet.get('channelTitle', 'N/A'),
+                'upload_date': snippet.get('publishedAt'),
+                'uploader': snippet.get('channelTitle'),
+                'channel': snippet.get('channelTitle'),
                 'subtitles': 'API method - subtitles not available',
-                'source': 'youtube_api'
-            }
+            }, 'youtube_api')
         except Exception as e:
             print(f"    ⚠️ Error processing video: {e}")
             return None
@@ -146,8 +326,12 @@ class HybridYoutubeFetcher:
         except:
             return 0
     
-    def _search_with_ytdlp(self, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Fallback search using yt-dlp with enhanced configuration"""
+    def _search_with_ytdlp(self, query: str, max_results: int) -> List[Video]:
+        """
+        Fallback search using yt-dlp: a flat listing is pre-ranked locally and
+        only the shortlisted videos get full metadata and subtitle extraction;
+        the rest of the max_results best entries come back as flat records.
+        """
         
         search_url = f"ytsearch{max_results}:{query}"
         videos_info = []
@@ -156,7 +340,7 @@ class HybridYoutubeFetcher:
         ydl_opts = {
             'quiet': True,
             'no_warnings': True,
-            'extract_flat': False,
+            'extract_flat': True,
             'writesubtitles': True,
             'writeautomaticsub': True,
             'subtitleslangs': ['en'],
@@ -180,23 +364,48 @@ class HybridYoutubeFetcher:
             'retries': 2,
             'fragment_retries': 2,
             'socket_timeout': 30,
-            'format': 'best',
             'noplaylist': True,
         }
         
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                search_results = ydl.extract_info(search_url, download=False)
-                
-                if 'entries' in search_results:
-                    for video in search_results['entries']:
-                        if video and len(videos_info) < max_results:
-                            video_info = self._process_ytdlp_video(video)
-                            if video_info:
-                                videos_info.append(video_info)
-                
-                print(f"    ✅ yt-dlp found {len(videos_info)} videos")
-                return videos_info
+            from .ytdlp_rate_controller import get_ytdlp_controller, extract_info_checked, gather
+            from .candidate_ranker import shortlist_candidates, get_shortlist_size
+            
+            # Paced and backed off together with every other yt-dlp fetcher
+            controller = get_ytdlp_controller()
+            search_results = controller.call(extract_info_checked, ydl_opts, search_url)
+            entries = [video for video in (search_results or {}).get('entries') or [] if video]
+            ranked = shortlist_candidates(entries, query, k=max_results)
+            shortlist_ids = {video['id'] for video in ranked[:get_shortlist_size()]}
+            
+            # Videos already extracted for an earlier topic of this course are reused
+            registry = current_video_registry()
+            known = {video['id']: registry.get(video['id']) for video in ranked} if registry else {}
+            known = {video_id: video for video_id, video in known.items() if video is not None and not video.flat}
+            to_extract = [video for video in ranked if video['id'] in shortlist_ids and video['id'] not in known]
+            
+            full_opts = {**ydl_opts, 'extract_flat': False}
+            extracted = gather([
+                controller.submit(extract_info_checked, full_opts, f"https://www.youtube.com/watch?v={video['id']}")
+                for video in to_extract
+            ]).result()
+            full_by_id = {video['id']: full for video, full in zip(to_extract, extracted)}
+            
+            for flat_video in ranked:
+                if flat_video['id'] in known:
+                    videos_info.append(known[flat_video['id']])
+                    continue
+                if flat_video['id'] not in shortlist_ids:
+                    # Past the shortlist: a candidate from the flat metadata alone
+                    videos_info.append(Video.from_raw({**flat_video, 'flat': True}, 'ytdlp'))
+                    continue
+                # A failed full extraction still leaves the flat metadata
+                video_info = self._process_ytdlp_video(full_by_id.get(flat_video['id']) or flat_video)
+                if video_info:
+                    videos_info.append(video_info)
+            
+            print(f"    ✅ yt-dlp found {len(videos_info)} videos")
+            return videos_info
                 
         except Exception as e:
             error_msg = str(e)
@@ -206,23 +415,22 @@ class HybridYoutubeFetcher:
                 print(f"    ❌ yt-dlp error: {error_msg[:100]}...")
             return []
     
-    def _process_ytdlp_video(self, video: dict) -> Dict[str, Any]:
+    def _process_ytdlp_video(self, video: dict) -> Video:
         """Process video data from yt-dlp"""
         try:
-            return {
-                'title': video.get('title', 'N/A'),
-                'url': video.get('webpage_url', 'N/A'),
-                'video_id': video.get('id', 'N/A'),
-                'description': video.get('description', 'N/A')[:500],  # Limit description
-                'view_count': video.get('view_count', 0),
-                'like_count': video.get('like_count', 0),
-                'duration': video.get('duration', 0),
-                'upload_date': video.get('upload_date', 'N/A'),
-                'uploader': video.get('uploader', 'N/A'),
-                'channel': video.get('channel', 'N/A'),
+            return Video.from_raw({
+                'title': video.get('title'),
+                'url': video.get('webpage_url'),
+                'video_id': video.get('id'),
+                'description': (video.get('description') or '')[:500],  # Limit description
+                'view_count': video.get('view_count'),
+                'like_count': video.get('like_count'),
+                'duration': video.get('duration'),
+                'upload_date': video.get('upload_date'),
+                'uploader': video.get('uploader'),
+                'channel': video.get('channel'),
                 'subtitles': self._extract_subtitles_safe(video),
-                'source': 'ytdlp'
-            }
+            }, 'ytdlp')
         except Exception as e:
             print(f"    ⚠️ Error processing yt-dlp video: {e}")
             return None
@@ -247,13 +455,31 @@ class HybridYoutubeFetcher:
             return "Subtitle extraction failed"
 
 
-# Initialize the fetcher
-youtube_fetcher = HybridYoutubeFetcher()
+_youtube_fetcher = None
+_youtube_fetcher_lock = threading.Lock()
+
+
+def get_youtube_fetcher() -> HybridYoutubeFetcher:
+    """Shared fetcher (and API client) for this process, built on first use."""
+    global _youtube_fetcher
+    if _youtube_fetcher is None:
+        with _youtube_fetcher_lock:
+            if _youtube_fetcher is None:
+                _youtube_fetcher = HybridYoutubeFetcher()
+    return _youtube_fetcher
 
 
-def search_youtube_videos_hybrid(topic: str, subject: str = "") -> List[Dict[str, Any]]:
+def __getattr__(name: str):
+    # Keeps `from youtube_hybrid_fetcher import youtube_fetcher` working without building at import time
+    if name == 'youtube_fetcher':
+        return get_youtube_fetcher()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def search_youtube_videos_hybrid(topic: str, subject: str = "") -> List[Video]:
     """
     Main function to search YouTube videos using hybrid approach
     This works well on Render without cookies
     """
-    return youtube_fetcher.search_videos(topic, subject, max_results=5)
+    return get_youtube_fetcher().search_videos(topic, subject, max_results=5)
+
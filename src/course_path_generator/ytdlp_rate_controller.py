@@ -0,0 +1,303 @@
+"""
+Shared adaptive rate controller for yt-dlp requests to YouTube.
+
+All fetchers send their yt-dlp work through one AIMD controller: the allowed
+request rate grows additively while requests succeed and is cut in half when
+YouTube answers with a bot-detection block. Requests and retries are delayed
+tasks on a timer heap, so no worker thread is held sleeping while it waits for
+its slot.
+"""
+import os
+import time
+import heapq
+import random
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Error texts YouTube uses when it suspects automated traffic
+BLOCK_SIGNALS = ("Sign in to confirm", "HTTP Error 403", "HTTP Error 429", "Too Many Requests")
+
+
+def is_block_signal(error: Any) -> bool:
+    message = str(error)
+    return any(signal in message for signal in BLOCK_SIGNALS)
+
+
+class YtdlpBlockedError(Exception):
+    """YouTube refused a yt-dlp request as automated traffic."""
+
+
+class NoVideosFoundError(Exception):
+    """A search returned no entries; worth another attempt later."""
+
+
+class BlockSignalLogger:
+    """yt-dlp logger that remembers block errors swallowed by ignoreerrors."""
+
+    def __init__(self):
+        self.blocked_message = None
+
+    def debug(self, msg: str) -> None:
+        pass
+
+    def info(self, msg: str) -> None:
+        pass
+
+    def warning(self, msg: str) -> None:
+        self._check(msg)
+
+    def error(self, msg: str) -> None:
+        self._check(msg)
+
+    def _check(self, msg: str) -> None:
+        if self.blocked_message is None and is_block_signal(msg):
+            self.blocked_message = msg
+
+    def raise_if_blocked(self) -> None:
+        if self.blocked_message:
+            raise YtdlpBlockedError(self.blocked_message)
+
+
+def extract_info_checked(ydl_opts: Dict[str, Any], url: str) -> Optional[Dict[str, Any]]:
+    """Run ydl.extract_info, raising YtdlpBlockedError when YouTube blocked the request."""
+    import yt_dlp
+    logger = BlockSignalLogger()
+    with yt_dlp.YoutubeDL({**ydl_opts, 'logger': logger}) as ydl:
+        info = ydl.extract_info(url, download=False)
+    logger.raise_if_blocked()
+    return info
+
+
+def _resolve(future: Future, value: Any = None, error: Optional[BaseException] = None) -> None:
+    # A future cancelled by its consumer (e.g. the losing leg of a race) is left alone
+    if future.done() or not future.set_running_or_notify_cancel():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(value)
+
+
+def chain(future: Future, next_step: Callable[[Any], Future]) -> Future:
+    """Future of next_step(result of future), without blocking a thread in between."""
+    chained = Future()
+
+    def on_first(done: Future) -> None:
+        if done.cancelled():
+            chained.cancel()
+            return
+        if done.exception() is not None:
+            _resolve(chained, error=done.exception())
+            return
+        try:
+            second = next_step(done.result())
+        except Exception as e:
+            _resolve(chained, error=e)
+            return
+        chained.add_done_callback(lambda outer: second.cancel() if outer.cancelled() else None)
+        second.add_done_callback(
+            lambda inner: chained.cancel() if inner.cancelled()
+            else _resolve(chained, inner.result() if inner.exception() is None else None, inner.exception())
+        )
+
+    future.add_done_callback(on_first)
+    chained.add_done_callback(lambda outer: future.cancel() if outer.cancelled() else None)
+    return chained
+
+
+def gather(futures: List[Future]) -> Future:
+    """Future of all results in order; failed or cancelled entries become None."""
+    gathered = Future()
+    results = [None] * len(futures)
+    remaining = [len(futures)]
+    lock = threading.Lock()
+    if not futures:
+        _resolve(gathered, [])
+        return gathered
+
+    def on_done(index: int, done: Future) -> None:
+        if not done.cancelled() and done.exception() is None:
+            results[index] = done.result()
+        with lock:
+            remaining[0] -= 1
+            finished = remaining[0] == 0
+        if finished:
+            _resolve(gathered, results)
+
+    for index, future in enumerate(futures):
+        future.add_done_callback(lambda done, index=index: on_done(index, done))
+    gathered.add_done_callback(
+        lambda outer: [future.cancel() for future in futures] if outer.cancelled() else None
+    )
+    return gathered
+
+
+class AdaptiveRateController:
+    """AIMD pacing for yt-dlp requests with delayed, non-blocking retries.
+
+    rate is the number of request starts allowed per second. Each success adds
+    increase_step to it; each block multiplies it by decrease_factor and holds
+    every request back for a block cooldown.
+    """
+
+    def __init__(self, initial_rate: float = 1.0, min_rate: float = 1 / 60, max_rate: float = 4.0,
+                 increase_step: float = 0.1, decrease_factor: float = 0.5,
+                 block_cooldown: Tuple[float, float] = (30.0, 60.0), max_workers: int = 4):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.block_cooldown = block_cooldown
+        self.stats = {'requests': 0, 'successes': 0, 'blocks': 0, 'failures': 0, 'retries': 0}
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+        self._timers = []  # heap of (due, sequence, task)
+        self._sequence = itertools.count()
+        self._timer_condition = threading.Condition()
+        self._timer_thread = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ytdlp')
+
+    # --- AIMD ---
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.stats['successes'] += 1
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def record_block(self) -> None:
+        with self._lock:
+            self.stats['blocks'] += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            cooldown = max(1 / self.rate, random.uniform(*self.block_cooldown))
+            self._next_slot = max(self._next_slot, time.monotonic() + cooldown)
+        print(f"    🤖 YouTube bot detection: yt-dlp rate lowered to {self.rate:.2f} req/s, "
+              f"pausing new requests for {cooldown:.0f}s")
+
+    def _reserve_slot(self) -> float:
+        """Monotonic start time for the next request."""
+        with self._lock:
+            start = max(time.monotonic(), self._next_slot)
+            self._next_slot = start + 1 / self.rate
+            return start
+
+    # --- Timer heap ---
+
+    def _schedule(self, delay: float, task: Callable[[], None]) -> None:
+        if delay > 0:
+            # Take a rate slot only once the delay is over, so a far-off retry
+            # does not push back the requests queued in the meantime
+            self._push_timer(time.monotonic() + delay, lambda: self._schedule(0.0, task))
+        else:
+            self._push_timer(self._reserve_slot(), task)
+
+    def _push_timer(self, due: float, task: Callable[[], None]) -> None:
+        with self._timer_condition:
+            heapq.heappush(self._timers, (due, next(self._sequence), task))
+            if self._timer_thread is None:
+                self._timer_thread = threading.Thread(target=self._run_timers, name='ytdlp-timer', daemon=True)
+                self._timer_thread.start()
+            self._timer_condition.notify()
+
+    def _run_timers(self) -> None:
+        with self._timer_condition:
+            while True:
+                if not self._timers:
+                    self._timer_condition.wait()
+                    continue
+                due, _, task = self._timers[0]
+                wait_seconds = due - time.monotonic()
+                if wait_seconds > 0:
+                    self._timer_condition.wait(wait_seconds)
+                    continue
+                heapq.heappop(self._timers)
+                self._executor.submit(task)
+
+    # --- Public API ---
+
+    def submit_with_retries(self, fn: Callable, *args, max_attempts: int = 3,
+                            retry_delay: Tuple[float, float] = (5.0, 10.0),
+                            cancel_event: Optional[threading.Event] = None) -> Future:
+        """Run fn(*args) in its next rate slot, rescheduling failed attempts.
+
+        Blocked attempts are retried once the block cooldown is over; other
+        failures after retry_delay seconds. Setting cancel_event or cancelling
+        the returned future drops attempts that have not started yet.
+        """
+        result = Future()
+        attempts = itertools.count(1)
+
+        def run() -> None:
+            attempt = next(attempts)
+            if result.done():
+                return
+            if cancel_event is not None and cancel_event.is_set():
+                result.cancel()
+                return
+            if max_attempts > 1:
+                print(f"    Attempt {attempt}/{max_attempts}")
+            with self._lock:
+                self.stats['requests'] += 1
+            try:
+                value = fn(*args)
+            except Exception as e:
+                blocked = is_block_signal(e)
+                if blocked:
+                    self.record_block()
+                else:
+                    with self._lock:
+                        self.stats['failures'] += 1
+                if attempt < max_attempts and not result.done():
+                    print(f"    ❌ Attempt {attempt} failed: {str(e)[:100]}")
+                    with self._lock:
+                        self.stats['retries'] += 1
+                    # A block already pushed every slot past its cooldown
+                    self._schedule(0.0 if blocked else random.uniform(*retry_delay), run)
+                    return
+                _resolve(result, error=e)
+                return
+            self.record_success()
+            _resolve(result, value)
+
+        self._schedule(0.0, run)
+        return result
+
+    def submit(self, fn: Callable, *args, cancel_event: Optional[threading.Event] = None) -> Future:
+        """Run fn(*args) once in its next rate slot."""
+        return self.submit_with_retries(fn, *args, max_attempts=1, cancel_event=cancel_event)
+
+    def call(self, fn: Callable, *args) -> Any:
+        """Blocking form of submit for synchronous callers outside the controller's workers."""
+        return self.submit(fn, *args).result()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = dict(self.stats)
+            snapshot['ratePerSecond'] = round(self.rate, 3)
+            snapshot['nextSlotInSeconds'] = round(max(0.0, self._next_slot - time.monotonic()), 1)
+        return snapshot
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_ytdlp_controller() -> AdaptiveRateController:
+    """Process-wide controller shared by every yt-dlp fetcher.
+
+    YTDLP_INITIAL_RATE / YTDLP_MIN_RATE / YTDLP_MAX_RATE: request starts per second
+    YTDLP_MAX_WORKERS: threads running yt-dlp work
+    """
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdaptiveRateController(
+                    initial_rate=float(os.getenv('YTDLP_INITIAL_RATE', '1.0')),
+                    min_rate=float(os.getenv('YTDLP_MIN_RATE', str(1 / 60))),
+                    max_rate=float(os.getenv('YTDLP_MAX_RATE', '4.0')),
+                    max_workers=int(os.getenv('YTDLP_MAX_WORKERS', '4')),
+                )
+    return _controller
@@ -0,0 +1,153 @@
+import os
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Any
+
+JOB_COLLECTION = os.getenv("GENERATION_JOB_COLLECTION", "system_courseGenerationJob")
+# A running job whose heartbeat is older than this is considered orphaned and resumed
+JOB_STALE_SECONDS = int(os.getenv("GENERATION_JOB_STALE_SEC", "300"))
+
+# Identifies this process as the owner of the jobs it runs
+WORKER_ID = f"worker-{uuid.uuid4()}"
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class CourseCheckpoint:
+    """Checkpoint of one course generation job, backed by its job document.
+
+    Holds the generated topic list and every finished topic (its structure, or
+    None when it produced no video) so a restarted worker skips that work.
+    Checkpoint writes are best effort: a Mongo failure never stops generation.
+    """
+
+    def __init__(self, store: 'GenerationJobStore', job: Dict[str, Any]):
+        self.store = store
+        self.job_id = job["_id"]
+        self.params: Dict[str, Any] = job.get("params") or {}
+        self.topics: Optional[List[str]] = job.get("topics")
+        self.done: Dict[int, Optional[Dict[str, Any]]] = {
+            int(index): checkpoint.get("topic") for index, checkpoint in (job.get("checkpoints") or {}).items()
+        }
+
+    def record_topics(self, topics: List[str]) -> None:
+        self.topics = list(topics)
+        self.store._update(self.job_id, {"topics": self.topics})
+
+    def record_topic(self, index: int, topic_structure: Optional[Dict[str, Any]]) -> None:
+        self.done[index] = topic_structure
+        self.store._update(self.job_id, {f"checkpoints.{index}": {"topic": topic_structure, "at": _now_ms()}})
+
+
+class GenerationJobStore:
+    """Course generation jobs in Mongo, for checkpointing and resuming after a restart."""
+
+    def __init__(self, collection_name: str = JOB_COLLECTION, stale_seconds: int = JOB_STALE_SECONDS,
+                 heartbeat_seconds: Optional[float] = None):
+        self.collection_name = collection_name
+        self.stale_seconds = stale_seconds
+        # Several heartbeats per stale period, so one slow write does not orphan a live job
+        self.heartbeat_seconds = heartbeat_seconds if heartbeat_seconds is not None else max(1.0, stale_seconds / 3)
+        # Jobs this process is running; never claimed as orphans
+        self._running = set()
+        self._running_lock = threading.Lock()
+
+    def _collection(self):
+        from src.db.mongo_client import get_database
+        return get_database()[self.collection_name]
+
+    def _update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        from src.course_path_generator.bulkheads import run_in_bulkhead
+        try:
+            run_in_bulkhead(
+                "mongo", self._collection().update_one,
+                {"_id": job_id},
+                {"$set": {**fields, "heartbeatAt": _now_ms(), "owner": WORKER_ID}}
+            )
+        except Exception as e:
+            print(f"⚠️ Could not checkpoint job {job_id}: {str(e)[:100]}")
+
+    def start_job(self, job_id: str, params: Dict[str, Any]) -> CourseCheckpoint:
+        """Create (or re-open) a job and return its checkpoint."""
+        now = _now_ms()
+        job = {"_id": job_id, "params": params, "status": "running", "checkpoints": {}}
+        try:
+            self._collection().update_one(
+                {"_id": job_id},
+                {"$setOnInsert": {"params": params, "checkpoints": {}, "createdAt": now},
+                 "$set": {"status": "running", "heartbeatAt": now, "owner": WORKER_ID}},
+                upsert=True,
+            )
+            job = self._collection().find_one({"_id": job_id}) or job
+        except Exception as e:
+            print(f"⚠️ Could not record job {job_id}, continuing without checkpoints: {str(e)[:100]}")
+        return CourseCheckpoint(self, job)
+
+    def finish_job(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        """Mark a job 'completed' or 'failed'; it will not be resumed again."""
+        self._update(job_id, {"status": status, "error": error, "finishedAt": _now_ms()})
+
+    def _heartbeat(self, job_id: str) -> None:
+        # Straight to Mongo: a saturated mongo bulkhead must not let a live job go stale
+        try:
+            self._collection().update_one({"_id": job_id}, {"$set": {"heartbeatAt": _now_ms(), "owner": WORKER_ID}})
+        except Exception as e:
+            print(f"⚠️ Could not renew the lease on job {job_id}: {str(e)[:100]}")
+
+    @contextmanager
+    def lease(self, job_id: str):
+        """Own a job while the block runs: heartbeats every heartbeat_seconds and no claims by this process."""
+        with self._running_lock:
+            self._running.add(job_id)
+        stopped = threading.Event()
+
+        def renew():
+            while not stopped.wait(self.heartbeat_seconds):
+                self._heartbeat(job_id)
+
+        renewer = threading.Thread(target=renew, name=f"job-lease-{job_id}", daemon=True)
+        renewer.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            renewer.join(timeout=1)
+            with self._running_lock:
+                self._running.discard(job_id)
+
+    def claim_orphaned_job(self) -> Optional[Dict[str, Any]]:
+        """Atomically take over one running job whose owner stopped sending heartbeats, or None.
+
+        The claim sets heartbeatAt to now, so the caller must start lease() for
+        the job within stale_seconds or another worker may claim it again;
+        _resume_orphaned_jobs claims a job, then runs it under lease().
+        """
+        with self._running_lock:
+            running = list(self._running)
+        now = _now_ms()
+        try:
+            return self._collection().find_one_and_update(
+                {"_id": {"$nin": running}, "status": "running",
+                 "heartbeatAt": {"$lt": now - self.stale_seconds * 1000}},
+                {"$set": {"heartbeatAt": now, "owner": WORKER_ID}, "$inc": {"resumes": 1}},
+            )
+        except Exception as e:
+            print(f"⚠️ Could not look for orphaned generation jobs: {str(e)[:100]}")
+            return None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> GenerationJobStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = GenerationJobStore()
+    return _store
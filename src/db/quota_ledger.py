@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+
+# YouTube Data API costs (units) per call
+SEARCH_LIST_COST = 100
+VIDEOS_LIST_COST = 1
+
+# The Data API quota day starts at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+QUOTA_COLLECTION = os.getenv("QUOTA_LEDGER_COLLECTION", "system_youtubeQuotaLedger")
+DEFAULT_DAILY_QUOTA = int(os.getenv("YOUTUBE_API_DAILY_QUOTA", "10000"))
+
+# After a Mongo failure, use the local fallback for this long before retrying Mongo
+MONGO_RETRY_SECONDS = 60
+
+
+def quota_day(now: Optional[datetime] = None) -> str:
+    """Current quota day as 'YYYY-MM-DD' in Pacific time."""
+    now = now or datetime.now(QUOTA_TIMEZONE)
+    return now.astimezone(QUOTA_TIMEZONE).date().isoformat()
+
+
+class YoutubeQuotaLedger:
+    """Shared daily YouTube Data API quota ledger.
+
+    One Mongo document per Pacific quota day holds the units used by every worker
+    and replica. Units are reserved with an atomic conditional $inc before each
+    API call, so concurrent reservations can never push usage past the limit.
+    Other daily budgets (e.g. the units racing may spend) are separate counters
+    in the same document, each with its own limit.
+    If Mongo is unreachable, per-process counters take over until it is back.
+    """
+
+    def __init__(self, daily_limit: int = DEFAULT_DAILY_QUOTA, collection_name: str = QUOTA_COLLECTION):
+        self.daily_limit = daily_limit
+        self.collection_name = collection_name
+        self._indexes_ready = False
+        self._mongo_down_until = 0.0
+        self._local_day = None
+        self._local_used: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _collection(self):
+        if time.time() < self._mongo_down_until:
+            return None
+        try:
+            # Imported here so the fetchers can read the cost constants without loading pymongo
+            from src.db.mongo_client import get_database
+            collection = get_database()[self.collection_name]
+            if not self._indexes_ready:
+                # Old days clean themselves up
+                collection.create_index("expiresAt", expireAfterSeconds=0)
+                self._indexes_ready = True
+            return collection
+        except Exception as e:
+            self._mongo_unavailable(e)
+            return None
+
+    def _mongo_unavailable(self, error: Exception) -> None:
+        print(f"⚠️ Quota ledger falling back to local counter: {str(error)[:100]}")
+        self._mongo_down_until = time.time() + MONGO_RETRY_SECONDS
+
+    def _local_roll_day(self, day: str) -> None:
+        if self._local_day != day:
+            self._local_day = day
+            self._local_used = {}
+
+    def _ensure_day_document(self, collection, day: str) -> None:
+        expires_at = datetime.fromisoformat(day).replace(tzinfo=QUOTA_TIMEZONE) + timedelta(days=3)
+        collection.update_one(
+            {"_id": day},
+            {"$setOnInsert": {"used": 0, "limit": self.daily_limit, "expiresAt": expires_at}},
+            upsert=True,
+        )
+
+    def reserve(self, units: int, counter: str = "used", limit: Optional[int] = None) -> bool:
+        """Atomically reserve units for an upcoming API call. False means the quota is spent.
+
+        counter/limit select another daily budget than the API quota itself (limit defaults to daily_limit).
+        """
+        limit = self.daily_limit if limit is None else limit
+        day = quota_day()
+        collection = self._collection()
+        if collection is not None:
+            try:
+                from pymongo import ReturnDocument
+                self._ensure_day_document(collection, day)
+                # A counter missing from the day's document has nothing used yet
+                doc = collection.find_one_and_update(
+                    {"_id": day, counter: {"$not": {"$gt": limit - units}}},
+                    {"$inc": {counter: units}},
+                    return_document=ReturnDocument.AFTER,
+                )
+                return doc is not None
+            except Exception as e:
+                self._mongo_unavailable(e)
+
+        with self._lock:
+            self._local_roll_day(day)
+            used = self._local_used.get(counter, 0)
+            if used + units > limit:
+                return False
+            self._local_used[counter] = used + units
+            return True
+
+    def release(self, units: int, counter: str = "used") -> None:
+        """Return units reserved for a call that was never sent."""
+        day = quota_day()
+        collection = self._collection()
+        if collection is not None:
+            try:
+                collection.update_one({"_id": day, counter: {"$gte": units}}, {"$inc": {counter: -units}})
+                return
+            except Exception as e:
+                self._mongo_unavailable(e)
+        with self._lock:
+            self._local_roll_day(day)
+            self._local_used[counter] = max(0, self._local_used.get(counter, 0) - units)
+
+    def mark_exhausted(self) -> None:
+        """YouTube reported quotaExceeded: stop every replica from trying until the day rolls over."""
+        day = quota_day()
+        collection = self._collection()
+        if collection is not None:
+            try:
+                self._ensure_day_document(collection, day)
+                collection.update_one({"_id": day}, {"$max": {"used": self.daily_limit}})
+            except Exception as e:
+                self._mongo_unavailable(e)
+        with self._lock:
+            self._local_roll_day(day)
+            self._local_used["used"] = self.daily_limit
+
+    def used_today(self, counter: str = "used") -> int:
+        day = quota_day()
+        collection = self._collection()
+        if collection is not None:
+            try:
+                doc = collection.find_one({"_id": day}, {counter: 1})
+                return int(doc.get(counter, 0)) if doc else 0
+            except Exception as e:
+                self._mongo_unavailable(e)
+        with self._lock:
+            self._local_roll_day(day)
+            return self._local_used.get(counter, 0)
+
+    def remaining(self) -> int:
+        return max(0, self.daily_limit - self.used_today())
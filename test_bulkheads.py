@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test bulkhead executors: queue limits, isolation and saturation metrics (no network)
+"""
+import sys
+import os
+import threading
+import contextvars
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+from src.api_config import main as api
+from src.course_path_generator.bulkheads import Bulkhead, BulkheadFull, run_in_bulkhead
+
+
+def test_full_bulkhead_rejects_and_reports_saturation():
+    """Past its threads and queue a bulkhead rejects, and its metrics say why"""
+
+    print("🔍 Testing queue limit...")
+    release = threading.Event()
+    bulkhead = Bulkhead('slow', workers=1, queue_limit=1, queue_timeout=0.05)
+    running = bulkhead.submit(release.wait)
+    queued = bulkhead.submit(lambda: 'done')
+    try:
+        bulkhead.submit(lambda: 'never')
+        assert False, "third call should not fit"
+    except BulkheadFull:
+        pass
+
+    snapshot = bulkhead.snapshot()
+    assert snapshot['saturation'] == 1.0 and snapshot['rejected'] == 1
+    release.set()
+    assert running.result(timeout=2) and queued.result(timeout=2) == 'done'
+    snapshot = bulkhead.snapshot()
+    assert snapshot['completed'] == 2 and snapshot['saturation'] == 0.0 and snapshot['peakQueued'] >= 1
+    print("✅ Queue limit OK")
+
+
+def test_slow_dependency_cannot_take_other_threads():
+    """A saturated bulkhead leaves the others free"""
+
+    print("🔍 Testing isolation...")
+    release = threading.Event()
+    search = Bulkhead('search-test', workers=2, queue_limit=0, queue_timeout=0.05)
+    mongo = Bulkhead('mongo-test', workers=1, queue_limit=4)
+    stuck = [search.submit(release.wait) for _ in range(2)]
+    try:
+        assert mongo.run(lambda: 'written') == 'written'
+        try:
+            search.run(lambda: 'searched')
+            assert False, "search bulkhead should be full"
+        except BulkheadFull:
+            pass
+    finally:
+        release.set()
+    assert all(future.result(timeout=2) for future in stuck)
+    print("✅ Isolation OK")
+
+
+def test_context_and_nested_calls():
+    """Calls see the caller's context vars, and nested use of one bulkhead runs inline"""
+
+    print("🔍 Testing context and re-entrancy...")
+    course = contextvars.ContextVar('course', default=None)
+    bulkhead = Bulkhead('nested', workers=1, queue_limit=0, queue_timeout=0.05)
+    course.set('course-1')
+    assert bulkhead.run(lambda: bulkhead.run(course.get)) == 'course-1'
+
+    os.environ['BULKHEADS'] = 'off'
+    try:
+        assert run_in_bulkhead('search', threading.current_thread) is threading.current_thread()
+    finally:
+        del os.environ['BULKHEADS']
+    print("✅ Context and re-entrancy OK")
+
+
+def test_metrics_endpoint():
+    """Bulkhead saturation is exposed next to pipeline stage timings and the other component counters"""
+
+    print("🔍 Testing metrics endpoint...")
+    run_in_bulkhead('mongo', lambda: None)
+    body = TestClient(api.app).get("/api/v1/metrics").json()
+    assert body["bulkheads"]["mongo"]["completed"] >= 1
+    assert set(body["bulkheads"]["mongo"]) >= {"workers", "queueLimit", "active", "queued", "saturation", "rejected"}
+    assert set(body) >= {"pipeline", "heuristicRanking", "geminiRouter", "searchRace", "jsonRepair", "fanOut",
+                         "ytdlpRateController", "searchBackends"}
+    assert "ratePerSecond" in body["ytdlpRateController"]
+    print("✅ Metrics endpoint OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing bulkheads...")
+    print("=" * 50)
+    test_full_bulkhead_rejects_and_reports_saturation()
+    test_slow_dependency_cannot_take_other_threads()
+    test_context_and_nested_calls()
+    test_metrics_endpoint()
+    print("=" * 50)
+    print("🎉 All bulkhead tests passed!")
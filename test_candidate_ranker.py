@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test the flat-result pre-ranker and the two-phase enhanced search (no network)
+"""
+import sys
+import os
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator import ytdlp_rate_controller, youtube_fetcher_enhanced
+from src.course_path_generator.candidate_ranker import shortlist_candidates
+from src.course_path_generator.youtube_fetcher_enhanced import (
+    create_enhanced_ydl_opts, search_youtube_videos_enhanced
+)
+
+
+FLAT_ENTRIES = [
+    {'id': 'short', 'title': 'Python closures in 30 seconds #shorts', 'duration': 30, 'view_count': 900000},
+    {'id': 'offtopic', 'title': 'My morning routine', 'duration': 600, 'view_count': 5000000},
+    {'id': 'lecture', 'title': 'Python Closures Explained', 'duration': 900, 'view_count': 120000},
+    {'id': 'long', 'title': 'Closures and decorators full course', 'duration': 4 * 3600, 'view_count': 80000},
+    {'id': 'tutorial', 'title': 'Closures tutorial for beginners', 'duration': 1200, 'view_count': 30000},
+]
+
+
+def test_shortlist_prefers_relevant_course_length_videos():
+    """Title matches and a sensible duration beat raw popularity and shorts"""
+
+    print("🔍 Testing pre-ranker...")
+    shortlist = shortlist_candidates(FLAT_ENTRIES, 'closures', 'Python', k=2)
+    assert [entry['id'] for entry in shortlist] == ['lecture', 'tutorial']
+    assert len(shortlist_candidates(FLAT_ENTRIES + [None, {'title': 'no id'}], 'closures', k=10)) == 5
+    print("✅ Pre-ranker OK")
+
+
+def test_enhanced_opts_have_one_extract_flat():
+    """Flat and full option sets differ only where they should"""
+
+    print("🔍 Testing yt-dlp options...")
+    assert create_enhanced_ydl_opts()['extract_flat'] is True
+    assert create_enhanced_ydl_opts(flat=False)['extract_flat'] is False
+    print("✅ yt-dlp options OK")
+
+
+def test_two_phase_search_extracts_only_the_shortlist():
+    """One flat search, then a full extraction per shortlisted video; the others stay flat"""
+
+    print("🔍 Testing two-phase search...")
+    calls = []
+
+    def fake_extract(ydl_opts, url):
+        calls.append((ydl_opts['extract_flat'], url))
+        if url.startswith('ytsearch'):
+            return {'entries': FLAT_ENTRIES}
+        video_id = url.rsplit('=', 1)[1]
+        return {'id': video_id, 'title': f'full {video_id}', 'webpage_url': url, 'duration': 900}
+
+    saved = (youtube_fetcher_enhanced.extract_info_checked, ytdlp_rate_controller._controller)
+    youtube_fetcher_enhanced.extract_info_checked = fake_extract
+    ytdlp_rate_controller._controller = ytdlp_rate_controller.AdaptiveRateController(
+        initial_rate=100.0, max_rate=100.0, max_workers=2)
+    os.environ['SEARCH_SHORTLIST_SIZE'] = '2'
+    try:
+        videos = search_youtube_videos_enhanced('closures', 'Python', max_results=5)
+    finally:
+        youtube_fetcher_enhanced.extract_info_checked, ytdlp_rate_controller._controller = saved
+        del os.environ['SEARCH_SHORTLIST_SIZE']
+
+    # max_results candidates come back: the shortlist extracted, the rest from flat metadata
+    assert [video['video_id'] for video in videos][:2] == ['lecture', 'tutorial'] and len(videos) == 5
+    assert videos[0]['title'] == 'full lecture' and not videos[0].flat
+    assert all(video.flat and video.source == 'enhanced' for video in videos[2:])
+    flat_calls = [url for flat, url in calls if flat]
+    full_calls = sorted(url.rsplit('=', 1)[1] for flat, url in calls if not flat)
+    assert len(flat_calls) == 1 and full_calls == ['lecture', 'tutorial']
+    print("✅ Two-phase search OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing candidate pre-ranker...")
+    print("=" * 50)
+    test_shortlist_prefers_relevant_course_length_videos()
+    test_enhanced_opts_have_one_extract_flat()
+    test_two_phase_search_extracts_only_the_shortlist()
+    print("=" * 50)
+    print("🎉 All pre-ranker tests passed!")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Test the topics-only outline endpoint with stubbed generation and storage (no network)
+"""
+import sys
+import os
+import threading
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+from src.api_config import main as api
+from src.course_path_generator import main_course_creator
+from src.course_path_generator.pipeline import Stage
+
+
+def matches(document, query):
+    """The subset of Mongo query syntax the API uses: equality, $in, $nin, $ne, $lt and $or."""
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, option) for option in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = document.get(key)
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$nin" in condition and value in condition["$nin"]:
+                return False
+            if "$ne" in condition and (condition["$ne"] in value if isinstance(value, list)
+                                       else value == condition["$ne"]):
+                return False
+            if "$lt" in condition and not (value is not None and value < condition["$lt"]):
+                return False
+        elif document.get(key) != condition:
+            return False
+    return True
+
+
+class FakeCollection:
+    """Just enough of a pymongo collection for the outline flow, atomic like the real one."""
+
+    def __init__(self):
+        self.documents = {}
+        self.lock = threading.Lock()
+
+    def insert_one(self, document):
+        with self.lock:
+            self.documents[document["_id"]] = dict(document)
+
+    def insert_many(self, documents):
+        for document in documents:
+            self.insert_one(document)
+
+    def find_one(self, query):
+        with self.lock:
+            for document in self.documents.values():
+                if matches(document, query):
+                    return dict(document)
+        return None
+
+    @staticmethod
+    def _apply(document, update):
+        for key, value in update.get("$set", {}).items():
+            # Dotted keys set a field inside an embedded document
+            *parents, leaf = key.split(".")
+            target = document
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = value
+        for key, value in update.get("$inc", {}).items():
+            document[key] = document.get(key, 0) + value
+        for key, value in update.get("$push", {}).items():
+            document.setdefault(key, []).append(value)
+        for key, value in update.get("$addToSet", {}).items():
+            values = document.setdefault(key, [])
+            if value not in values:
+                values.append(value)
+
+    def find_one_and_update(self, query, update, upsert=False):
+        with self.lock:
+            for document in self.documents.values():
+                if matches(document, query):
+                    before = dict(document)
+                    self._apply(document, update)
+                    return before
+            if upsert:
+                document = {key: value for key, value in query.items() if not isinstance(value, dict)}
+                document.update(update.get("$setOnInsert", {}))
+                self._apply(document, update)
+                self.documents[document["_id"]] = document
+        return None
+
+    def update_one(self, query, update, upsert=False):
+        self.find_one_and_update(query, update, upsert=upsert)
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+def stages_running(analyze):
+    """Pipeline topic stages replaced by one fake analysis with analyze_single_topic's signature."""
+
+    def run(work, context):
+        work.finish(analyze(work.name, work.index, context.subject, context.difficulty_level,
+                            context.search_for(work.level), context.registry, work.level))
+
+    return lambda: [Stage('analyze', run)]
+
+
+def fake_analyze(topic, index, subject, difficulty_level, search, registry, degradation=0):
+    if topic == 'Hard topic':
+        return None
+    return {"id": "ignored", "name": topic, "description": f"Learn about {topic.lower()} - picked",
+            "videoInfo": {"youtubeUrl": f"https://www.youtube.com/watch?v={index}", "title": topic,
+                          "startTime": 0, "endTime": 60},
+            "prerequisites": ["wrong"], "tags": [], "qualityMetrics": {}}
+
+
+def test_outline_is_returned_then_filled():
+    """Topics come back pending at once; the background task fills them in storage"""
+
+    print("🔍 Testing course outline endpoint...")
+    database = FakeDatabase()
+    saved = (api.get_database, main_course_creator.generate_learning_topics,
+             main_course_creator.analyze_single_topic, main_course_creator.get_topic_search)
+    api.get_database = lambda: database
+    main_course_creator.generate_learning_topics = lambda subject, level: ['Variables', 'Hard topic', 'Loops']
+    main_course_creator.analyze_single_topic = fake_analyze
+    main_course_creator.get_topic_search = lambda latency_critical=False: None
+    try:
+        response = TestClient(api.app).post(
+            "/api/v1/course-outline", json={"subject": "Python", "difficulty": "Beginner"})
+    finally:
+        (api.get_database, main_course_creator.generate_learning_topics,
+         main_course_creator.analyze_single_topic, main_course_creator.get_topic_search) = saved
+
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert [topic["name"] for topic in body["topics"]] == ['Variables', 'Hard topic', 'Loops']
+    assert {topic["videoStatus"] for topic in body["topics"]} == {"pending"}
+
+    course = database[api.COURSE_COLLECTION].documents[body["courseId"]]
+    stored = [database[api.TOPIC_COLLECTION].documents[topic_id] for topic_id in course["topics"]]
+    assert [topic["videoStatus"] for topic in stored] == ["ready", "failed", "ready"]
+    assert stored[2]["videoInfo"]["youtubeUrl"].endswith("v=3")
+    assert stored[2]["prerequisites"] == [body["topics"][2]["prerequisites"][0]]
+    print("✅ Course outline endpoint OK")
+
+
+def test_outline_rejects_bad_difficulty():
+    """Validation matches the full generation endpoint"""
+
+    print("🔍 Testing outline validation...")
+    response = TestClient(api.app).post("/api/v1/course-outline", json={"subject": "Python", "difficulty": "expert"})
+    assert response.status_code == 400
+    print("✅ Outline validation OK")
+
+
+def test_outline_storage_failure_is_an_error():
+    """No 201 and no courseId when the outline was not stored"""
+
+    print("🔍 Testing outline storage failure...")
+
+    def broken_database():
+        raise RuntimeError("mongo down")
+
+    def full_bulkhead(name, fn, *args, **kwargs):
+        raise api.BulkheadFull("mongo bulkhead is full")
+
+    filled = []
+    saved = (api.get_database, api.run_in_bulkhead, main_course_creator.generate_learning_topics, api._background_fill_outline)
+    main_course_creator.generate_learning_topics = lambda subject, level: ['Variables', 'Loops']
+    api._background_fill_outline = lambda *args: filled.append(args)
+    try:
+        api.get_database = broken_database
+        failed = TestClient(api.app).post("/api/v1/course-outline", json={"subject": "Python", "difficulty": "beginner"})
+        api.run_in_bulkhead = full_bulkhead
+        busy = TestClient(api.app).post("/api/v1/course-outline", json={"subject": "Python", "difficulty": "beginner"})
+    finally:
+        (api.get_database, api.run_in_bulkhead, main_course_creator.generate_learning_topics,
+         api._background_fill_outline) = saved
+
+    assert failed.status_code == 500, failed.text
+    assert busy.status_code == 503, busy.text
+    assert filled == []
+    print("✅ Outline storage failure OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing course outline...")
+    print("=" * 50)
+    test_outline_is_returned_then_filled()
+    test_outline_rejects_bad_difficulty()
+    test_outline_storage_failure_is_an_error()
+    print("=" * 50)
+    print("🎉 All course outline tests passed!")
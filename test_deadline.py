@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test deadline-aware generation and its degradation levels with a fake clock (no network)
+"""
+import sys
+import os
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator import main_course_creator, pipeline
+from src.course_path_generator.deadline import GenerationDeadline, LEVEL_NAMES, make_deadline
+from src.course_path_generator.create_course_path import select_best_video_locally
+from src.course_path_generator.video_search_backends import VideoSearchBackend, AdaptiveBackendSelector
+from src.course_path_generator.video_record import Video
+from test_course_outline import stages_running
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_levels_follow_budget_share():
+    """Each threshold passed adds one degradation level"""
+
+    print("🔍 Testing degradation levels...")
+    clock = FakeClock()
+    deadline = GenerationDeadline(100, [0.5, 0.65, 0.8, 0.9], clock=clock)
+    levels = []
+    for now in (0, 49, 50, 70, 85, 95, 200):
+        clock.now = now
+        levels.append(deadline.next_level())
+    assert levels == [0, 0, 1, 2, 3, 4, 4]
+    summary = deadline.summary()
+    assert summary['levels'] == LEVEL_NAMES[1:]
+    assert summary['topicsPerLevel'] == {'full': 2, 'fewerCandidates': 1, 'skipTranscripts': 1,
+                                         'heuristicRanking': 1, 'outlineOnly': 2}
+    assert deadline.remaining() == 0.0
+    os.environ['GENERATION_TIME_BUDGET_SEC'] = 'off'
+    try:
+        assert make_deadline() is None and make_deadline(30).budget_sec == 30
+    finally:
+        del os.environ['GENERATION_TIME_BUDGET_SEC']
+    print("✅ Degradation levels OK")
+
+
+def test_course_degrades_as_deadline_nears():
+    """Later topics are analyzed more cheaply and the last ones are left as outline topics"""
+
+    print("🔍 Testing deadline-aware course generation...")
+    clock = FakeClock()
+    deadline = GenerationDeadline(100, [0.5, 0.65, 0.8, 0.9], clock=clock)
+    calls = []
+
+    def analyze(topic, index, subject, difficulty_level, search, registry, degradation=0):
+        calls.append((topic, degradation, search))
+        clock.now += 20
+        return {"id": f"topic-{topic}", "name": topic}
+
+    saved = (main_course_creator.generate_learning_topics, pipeline.default_topic_stages,
+             main_course_creator.get_topic_search)
+    main_course_creator.generate_learning_topics = lambda subject, level: ['a', 'b', 'c', 'd', 'e', 'f']
+    pipeline.default_topic_stages = stages_running(analyze)
+    main_course_creator.get_topic_search = lambda latency_critical=False, transcripts=True: (
+        'full search' if transcripts else 'quick search')
+    try:
+        result = main_course_creator.create_complete_course("Python", "beginner", deadline=deadline)
+    finally:
+        (main_course_creator.generate_learning_topics, pipeline.default_topic_stages,
+         main_course_creator.get_topic_search) = saved
+
+    assert [(topic, level) for topic, level, _ in calls] == [('a', 0), ('b', 0), ('c', 0), ('d', 1), ('e', 3)]
+    assert [search for _, _, search in calls] == ['full search'] * 4 + ['quick search']
+    topics = result["data"]["topics"]
+    assert topics[-1]["name"] == 'f' and topics[-1]["videoStatus"] == "pending"
+    degradation = result["data"]["coursePath"]["degradation"]
+    assert degradation["levels"] == ['fewerCandidates', 'heuristicRanking', 'outlineOnly']
+    print("✅ Deadline-aware course generation OK")
+
+
+class FakeBackend(VideoSearchBackend):
+    def __init__(self, name, fetches_transcripts):
+        self.name = name
+        self.fetches_transcripts = fetches_transcripts
+
+    def _search(self, topic, subject, max_results):
+        return [{'id': f'{self.name}{i}', 'title': topic} for i in range(max_results)]
+
+
+def test_skip_transcripts_avoids_transcript_backends():
+    """A transcript-free search never goes to a backend that downloads transcripts"""
+
+    print("🔍 Testing transcript-free search...")
+    selector = AdaptiveBackendSelector([FakeBackend('enhanced', True), FakeBackend('basic', False)],
+                                       exploration_rate=0.0)
+    assert selector.search('loops', 'Python', 2)[0]['video_id'] == 'enhanced0'
+    assert selector.search('loops', 'Python', 2, transcripts=False)[0]['video_id'] == 'basic0'
+    only_enhanced = AdaptiveBackendSelector([FakeBackend('enhanced', True)], exploration_rate=0.0)
+    assert only_enhanced.search('loops', 'Python', 2, transcripts=False)
+    print("✅ Transcript-free search OK")
+
+
+def test_local_selection_always_picks():
+    """Heuristic ranking picks a video even when no candidate clearly dominates"""
+
+    print("🔍 Testing local selection...")
+    videos = [Video(video_id=f'v{i}', title=f'Python closures part {i}', url=f'https://www.youtube.com/watch?v=v{i}',
+                    view_count=1000, duration=600) for i in range(3)]
+    analysis = select_best_video_locally('python closures', videos, 'Python', 'beginner')
+    assert analysis['selectedVideo']['selectionSource'] == 'heuristic'
+    unrelated = [Video(video_id='x', title='Cooking pasta', url='https://www.youtube.com/watch?v=x',
+                       description='python closures explained')]
+    assert select_best_video_locally('python closures', unrelated, 'Python', 'beginner')['selectedVideo']['videoNumber'] == 1
+    print("✅ Local selection OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing deadline-aware generation...")
+    print("=" * 50)
+    test_levels_follow_budget_share()
+    test_course_degrades_as_deadline_nears()
+    test_skip_transcripts_avoids_transcript_backends()
+    test_local_selection_always_picks()
+    print("=" * 50)
+    print("🎉 All deadline tests passed!")
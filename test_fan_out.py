@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test adaptive candidate fan-out with stubbed search and selection (no network)
+"""
+import sys
+import os
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator.fan_out import get_initial_fan_out, select_with_fan_out, get_fan_out_stats
+from src.course_path_generator.video_record import Video
+
+
+def make_videos(titles):
+    return [Video(video_id=title.replace(' ', '-'), title=title, duration=600, view_count=100000,
+                  like_count=4000, url=f'https://www.youtube.com/watch?v={i}')
+            for i, title in enumerate(titles)]
+
+
+class Recorder:
+    def __init__(self, scores, wider):
+        self.scores = list(scores)
+        self.wider = wider
+        self.searches = []
+        self.selections = []
+
+    def search(self, topic, subject, max_results):
+        self.searches.append(max_results)
+        return self.wider
+
+    def select(self, topic_name, videos, subject, difficulty_level):
+        self.selections.append(len(videos))
+        return {'selectedVideo': {'videoNumber': 1, 'relevanceScore': self.scores.pop(0)}}
+
+
+def test_initial_fan_out_per_difficulty():
+    """Defaults start small and are configurable per level, capped by FAN_OUT_MAX"""
+
+    print("🔍 Testing initial fan-out...")
+    assert get_initial_fan_out('beginner') == 3 and get_initial_fan_out('advanced') == 4
+    os.environ['FAN_OUT_BEGINNER'] = '9'
+    try:
+        assert get_initial_fan_out('beginner') == 5
+    finally:
+        del os.environ['FAN_OUT_BEGINNER']
+    print("✅ Initial fan-out OK")
+
+
+def test_clear_topic_is_not_widened():
+    """A matching candidate with a good score needs no second search"""
+
+    print("🔍 Testing clear topic...")
+    initial = make_videos(['Python loops explained', 'Loops in Python', 'For loops tutorial'])
+    recorder = Recorder([92], make_videos(['extra one', 'extra two']))
+    analysis, videos = select_with_fan_out('python loops', initial, 'Python', 'beginner',
+                                           recorder.select, recorder.search)
+    assert analysis['selectedVideo']['relevanceScore'] == 92
+    assert videos == initial and recorder.searches == [] and recorder.selections == [3]
+    print("✅ Clear topic OK")
+
+
+def test_low_relevance_widens_and_reanalyzes():
+    """A weak score fetches up to FAN_OUT_MAX candidates and analyzes them again"""
+
+    print("🔍 Testing low-relevance widening...")
+    before = get_fan_out_stats()
+    initial = make_videos(['Python loops explained', 'Loops in Python', 'For loops tutorial'])
+    wider = initial[:1] + make_videos(['While loops deep dive', 'Loop patterns', 'Iteration basics'])
+    recorder = Recorder([40, 85], wider)
+    analysis, videos = select_with_fan_out('python loops', initial, 'Python', 'beginner',
+                                           recorder.select, recorder.search)
+    assert analysis['selectedVideo']['relevanceScore'] == 85
+    assert recorder.searches == [5] and recorder.selections == [3, 5]
+    assert videos[:3] == initial and len(videos) == 5
+    assert get_fan_out_stats()['widenedAfterAnalysis'] - before['widenedAfterAnalysis'] == 1
+    print("✅ Low-relevance widening OK")
+
+
+def test_local_selection_is_not_widened():
+    """A heuristic or BM25 relevanceScore is not compared against Gemini's threshold"""
+
+    print("🔍 Testing local selection...")
+    initial = make_videos(['Python loops explained', 'Loops in Python', 'For loops tutorial'])
+    for source in ('heuristic', 'bm25'):
+        recorder = Recorder([63], make_videos(['extra one', 'extra two']))
+
+        def select(topic_name, videos, subject, difficulty_level):
+            analysis = recorder.select(topic_name, videos, subject, difficulty_level)
+            analysis['selectedVideo']['selectionSource'] = source
+            return analysis
+
+        analysis, videos = select_with_fan_out('python loops', initial, 'Python', 'beginner', select, recorder.search)
+        assert videos == initial and recorder.searches == [] and recorder.selections == [3], source
+    print("✅ Local selection OK")
+
+
+def test_weak_prerank_widens_before_analysis():
+    """When no candidate matches the topic, more are fetched before the one analysis"""
+
+    print("🔍 Testing pre-rank widening...")
+    initial = make_videos(['My vlog', 'Cooking pasta', 'Travel diary'])
+    recorder = Recorder([50], make_videos(['Python decorators explained']))
+    analysis, videos = select_with_fan_out('python decorators', initial, 'Python', 'beginner',
+                                           recorder.select, recorder.search)
+    assert recorder.searches == [5] and recorder.selections == [4] and len(videos) == 4
+    print("✅ Pre-rank widening OK")
+
+
+def test_widened_candidates_are_prepared():
+    """New candidates from a wider search pass through prepare (e.g. registry filtering) first"""
+
+    print("🔍 Testing prepared widening...")
+    initial = make_videos(['My vlog', 'Cooking pasta', 'Travel diary'])
+    overused = make_videos(['Python decorators explained', 'Decorators in depth'])
+    recorder = Recorder([50], overused)
+    prepared = []
+
+    def drop_overused(videos):
+        prepared.append([video.video_id for video in videos])
+        return videos[1:]
+
+    analysis, videos = select_with_fan_out('python decorators', initial, 'Python', 'beginner',
+                                           recorder.select, recorder.search, drop_overused)
+    assert prepared == [[video.video_id for video in overused]]
+    assert [video.video_id for video in videos] == [video.video_id for video in initial + overused[1:]]
+    print("✅ Prepared widening OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing adaptive fan-out...")
+    print("=" * 50)
+    test_initial_fan_out_per_difficulty()
+    test_clear_topic_is_not_widened()
+    test_low_relevance_widens_and_reanalyzes()
+    test_local_selection_is_not_widened()
+    test_weak_prerank_widens_before_analysis()
+    test_widened_candidates_are_prepared()
+    print("=" * 50)
+    print("🎉 All fan-out tests passed!")
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test tiered Gemini model routing with fake per-key clients (no network)
+"""
+import sys
+import os
+import json
+import threading
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+import google.ai.generativelanguage as glm
+
+from src.course_path_generator import gemini_router
+from src.course_path_generator.create_course_path import parse_analysis_response, analysis_generation_config
+from src.course_path_generator.get_topics import _call_gemini_api
+
+
+class FakeGemini:
+    """Stands in for the per-key Gemini clients: replies per model, fails per key."""
+
+    def __init__(self, replies, bad_keys=()):
+        self.replies = replies
+        self.bad_keys = set(bad_keys)
+        self.calls = []
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def client_for(self, api_key):
+        fake = self
+
+        class Client:
+            def generate_content(self, request):
+                model_name = request.model.split('/', 1)[1]
+                with fake.lock:
+                    fake.calls.append((model_name, api_key))
+                    fake.requests.append(request)
+                if api_key in fake.bad_keys:
+                    raise RuntimeError("429 quota exceeded")
+                content = glm.Content(parts=[glm.Part(text=fake.replies[model_name])])
+                return glm.GenerateContentResponse(candidates=[glm.Candidate(content=content, finish_reason=1)])
+        return Client()
+
+
+def analysis(score, quality='high'):
+    return json.dumps({'selectedVideo': {'videoNumber': 1, 'relevanceScore': score, 'contentQuality': quality}})
+
+
+def run_with(fake, fn, **env):
+    saved = gemini_router._client_for
+    gemini_router._client_for = fake.client_for
+    env = {'GEMINI_API_KEY': 'k1', 'GEMINI_API_KEY2': 'k2', **env}
+    previous = {name: os.environ.get(name) for name in env}
+    os.environ.update(env)
+    try:
+        return fn()
+    finally:
+        gemini_router._client_for = saved
+        for name, value in previous.items():
+            if value is None:
+                del os.environ[name]
+            else:
+                os.environ[name] = value
+
+
+def test_confident_answer_stays_on_fast_tier():
+    """A good answer from the first tier never reaches the stronger model"""
+
+    print("🔍 Testing fast tier...")
+    fake = FakeGemini({'fast': analysis(90), 'strong': analysis(95)}, bad_keys={'k1'})
+    result = run_with(fake, lambda: gemini_router.generate_with_tiers(
+        'p', 'analysis', parse_analysis_response, analysis_generation_config()), GEMINI_ANALYSIS_MODELS='fast,strong')
+    assert result['selectedVideo']['relevanceScore'] == 90
+    assert fake.calls == [('fast', 'k1'), ('fast', 'k2')]
+    # JSON mode and the response schema reach the request
+    config = fake.requests[-1].generation_config
+    assert config.response_mime_type == 'application/json' and 'selectedVideo' in config.response_schema.properties
+    print("✅ Fast tier OK")
+
+
+def test_concurrent_calls_keep_their_keys():
+    """Calls running side by side each fail over on their own key"""
+
+    print("🔍 Testing concurrent keys...")
+    fake = FakeGemini({'fast': analysis(90)}, bad_keys={'k1'})
+    results = []
+
+    def call():
+        results.append(gemini_router.generate_with_tiers('p', 'analysis', parse_analysis_response))
+
+    def run_all():
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    run_with(fake, run_all, GEMINI_ANALYSIS_MODELS='fast')
+    assert len(results) == 8 and all(result['selectedVideo']['relevanceScore'] == 90 for result in results)
+    assert sorted(fake.calls) == [('fast', 'k1')] * 8 + [('fast', 'k2')] * 8
+    print("✅ Concurrent keys OK")
+
+
+def test_low_confidence_and_malformed_escalate():
+    """Low scores, 'low' quality and broken JSON move up a tier"""
+
+    print("🔍 Testing escalation...")
+    before = gemini_router.get_gemini_router_stats().get('analysis', {}).get('escalations', 0)
+    fake = FakeGemini({'fast': analysis(30), 'mid': 'not json', 'strong': analysis(80, 'low')})
+    result = run_with(fake, lambda: gemini_router.generate_with_tiers('p', 'analysis', parse_analysis_response),
+                      GEMINI_ANALYSIS_MODELS='fast,mid,strong')
+    # Nobody was confident: the last parsed answer is still better than nothing
+    assert result['selectedVideo']['relevanceScore'] == 80
+    assert [model for model, _ in fake.calls] == ['fast', 'mid', 'strong']
+
+    stats = gemini_router.get_gemini_router_stats()['analysis']
+    assert stats['escalations'] - before == 2
+    assert stats['tiers']['mid']['successRate'] == 0.0 and stats['tiers']['fast']['p50Seconds'] is not None
+    print("✅ Escalation OK")
+
+
+def test_full_bulkhead_does_not_escalate():
+    """A rejected call stops at once instead of waiting for the same bulkhead on every tier"""
+
+    print("🔍 Testing full bulkhead...")
+    rejected = []
+
+    def full_bulkhead(name, fn, *args, **kwargs):
+        rejected.append(name)
+        raise gemini_router.BulkheadFull("analysis bulkhead is full")
+
+    before = gemini_router.get_gemini_router_stats().get('analysis', {}).get('escalations', 0)
+    saved = gemini_router.run_in_bulkhead
+    gemini_router.run_in_bulkhead = full_bulkhead
+    try:
+        fake = FakeGemini({'fast': analysis(90), 'strong': analysis(95)})
+        result = run_with(fake, lambda: gemini_router.generate_with_tiers('p', 'analysis', parse_analysis_response),
+                          GEMINI_ANALYSIS_MODELS='fast,strong')
+    finally:
+        gemini_router.run_in_bulkhead = saved
+    assert result is None and rejected == ['analysis'] and fake.calls == []
+    assert gemini_router.get_gemini_router_stats()['analysis']['escalations'] == before
+    print("✅ Full bulkhead OK")
+
+
+def test_topics_use_their_own_tiers():
+    """Topic generation reads GEMINI_TOPIC_MODELS and escalates past an empty list"""
+
+    print("🔍 Testing topic tiers...")
+    fake = FakeGemini({'topic-fast': 'Sure!', 'topic-strong': '1. Variables\n2. Loops'})
+    text = run_with(fake, lambda: _call_gemini_api('p'),
+                    GEMINI_TOPIC_MODELS='topic-fast,topic-strong', GEMINI_ANALYSIS_MODELS='other')
+    assert text == '1. Variables\n2. Loops'
+    assert {model for model, _ in fake.calls} == {'topic-fast', 'topic-strong'}
+    print("✅ Topic tiers OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing Gemini model routing...")
+    print("=" * 50)
+    test_confident_answer_stays_on_fast_tier()
+    test_concurrent_calls_keep_their_keys()
+    test_low_confidence_and_malformed_escalate()
+    test_full_bulkhead_does_not_escalate()
+    test_topics_use_their_own_tiers()
+    print("=" * 50)
+    print("🎉 All model routing tests passed!")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test checkpointed, resumable course generation with stubbed analysis and storage (no network)
+"""
+import sys
+import os
+import time
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.db import mongo_client
+from src.db.generation_jobs import GenerationJobStore
+from src.course_path_generator import main_course_creator, pipeline
+from test_course_outline import FakeDatabase, stages_running
+
+
+class Crash(Exception):
+    pass
+
+
+def run_course(store, job_id, analyzed, crash_on=None):
+    """Generate a course under a job, optionally dying when a given topic is reached."""
+
+    def analyze(topic, index, subject, difficulty_level, search, registry, degradation=0):
+        if topic == crash_on:
+            raise Crash()
+        analyzed.append(topic)
+        return None if topic == 'empty' else {"id": f"topic-{topic}", "name": topic}
+
+    saved = (main_course_creator.generate_learning_topics, pipeline.default_topic_stages,
+             main_course_creator.get_topic_search)
+    main_course_creator.generate_learning_topics = lambda subject, level: analyzed.append('TOPICS') or [
+        'a', 'empty', 'b', 'c']
+    pipeline.default_topic_stages = stages_running(analyze)
+    main_course_creator.get_topic_search = lambda latency_critical=False: None
+    try:
+        checkpoint = store.start_job(job_id, {"subject": "Python", "difficulty": "beginner"})
+        return main_course_creator.create_complete_course("Python", "beginner", checkpoint=checkpoint)
+    finally:
+        (main_course_creator.generate_learning_topics, pipeline.default_topic_stages,
+         main_course_creator.get_topic_search) = saved
+
+
+def test_restart_skips_checkpointed_topics():
+    """After a crash, topics and finished analyses come from the checkpoint"""
+
+    print("🔍 Testing resume from checkpoint...")
+    database = FakeDatabase()
+    saved = mongo_client.get_database
+    mongo_client.get_database = lambda: database
+    try:
+        store = GenerationJobStore(stale_seconds=0)
+        first_run = []
+        # A failed topic is not checkpointed, so 'b' is retried on resume
+        run_course(store, "job-1", first_run, crash_on='b')
+        assert first_run == ['TOPICS', 'a', 'empty', 'c']
+
+        # Drop 'c' as if the worker had died before reaching it
+        job = database[store.collection_name].documents["job-1"]
+        del job["checkpoints"]["4"]
+        time.sleep(0.01)
+        assert store.claim_orphaned_job()["_id"] == "job-1"
+
+        second_run = []
+        result = run_course(store, "job-1", second_run)
+        store.finish_job("job-1", "completed")
+    finally:
+        mongo_client.get_database = saved
+
+    assert second_run == ['b', 'c'], second_run
+    assert [topic["name"] for topic in result["data"]["topics"]] == ['a', 'b', 'c']
+    assert database[store.collection_name].documents["job-1"]["status"] == "completed"
+    assert store.claim_orphaned_job() is None
+    print("✅ Resume from checkpoint OK")
+
+
+def test_leased_job_is_never_claimed():
+    """A job this process runs keeps its heartbeat and is not taken over, however slow its topics"""
+
+    print("🔍 Testing job lease...")
+    database = FakeDatabase()
+    saved = mongo_client.get_database
+    mongo_client.get_database = lambda: database
+    try:
+        store = GenerationJobStore(stale_seconds=0, heartbeat_seconds=0.01)
+        store.start_job("job-3", {"subject": "Python"})
+        job = database[store.collection_name].documents["job-3"]
+        with store.lease("job-3"):
+            first_beat = job["heartbeatAt"]
+            time.sleep(0.05)
+            assert job["heartbeatAt"] > first_beat
+            assert store.claim_orphaned_job() is None
+        time.sleep(0.01)
+        assert store.claim_orphaned_job()["_id"] == "job-3"
+    finally:
+        mongo_client.get_database = saved
+    print("✅ Job lease OK")
+
+
+def test_checkpoints_never_block_generation():
+    """Without Mongo the job still runs, just without checkpoints"""
+
+    print("🔍 Testing Mongo outage...")
+    saved = mongo_client.get_database
+
+    def unavailable():
+        raise RuntimeError("no mongo")
+
+    mongo_client.get_database = unavailable
+    try:
+        analyzed = []
+        result = run_course(GenerationJobStore(), "job-2", analyzed)
+    finally:
+        mongo_client.get_database = saved
+    assert result["success"] and len(result["data"]["topics"]) == 3
+    print("✅ Mongo outage OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing generation jobs...")
+    print("=" * 50)
+    test_restart_skips_checkpointed_topics()
+    test_leased_job_is_never_claimed()
+    test_checkpoints_never_block_generation()
+    print("=" * 50)
+    print("🎉 All generation job tests passed!")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test the local heuristic ranker and its Gemini bypass (no network)
+"""
+import sys
+import os
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator.heuristic_ranker import (
+    candidate_features, heuristic_selection, select_or_defer, get_heuristic_stats
+)
+from src.course_path_generator.video_record import Video
+
+
+def make_videos():
+    return [
+        Video(video_id='vlog', title='My week in Tokyo', url='https://www.youtube.com/watch?v=vlog',
+              view_count=2_000_000, like_count=20_000, duration=700, upload_date='20240101'),
+        Video(video_id='lecture', title='Python Closures Explained', url='https://www.youtube.com/watch?v=lecture',
+              view_count=300_000, like_count=15_000, duration=900, upload_date='2023-05-01T10:00:00Z'),
+        Video(video_id='old', title='Closures', url='https://www.youtube.com/watch?v=old',
+              view_count=500, like_count=2, duration=7200, upload_date=''),
+    ]
+
+
+def test_features_are_bounded():
+    """Every feature lands in [0, 1], with unknown dates and durations neutral"""
+
+    print("🔍 Testing feature matrix...")
+    features = candidate_features('python closures', 'Python', make_videos(), 'beginner')
+    assert features.shape == (3, 5)
+    assert (features >= 0).all() and (features <= 1).all()
+    assert features[1, 0] == 1.0 and features[0, 0] == 0.0
+    assert features[2, 4] == 0.5
+    print("✅ Feature matrix OK")
+
+
+def test_dominant_candidate_is_selected_locally():
+    """A clear winner gets a selectedVideo without start/end times; a close call defers"""
+
+    print("🔍 Testing heuristic selection...")
+    analysis = heuristic_selection('python closures', 'Python', make_videos(), 'beginner', margin=0.2)
+    selected = analysis['selectedVideo']
+    assert selected['videoNumber'] == 2 and selected['youtubeUrl'].endswith('lecture')
+    assert selected['selectionSource'] == 'heuristic' and 'startTimeMs' not in selected
+    assert heuristic_selection('python closures', 'Python', make_videos(), 'beginner', margin=0.9) is None
+    assert heuristic_selection('rust lifetimes', 'Rust', make_videos(), 'beginner', margin=0.0) is None
+    print("✅ Heuristic selection OK")
+
+
+def test_bypass_and_shadow_stats():
+    """Bypasses skip Gemini; shadow samples call it and record agreement"""
+
+    print("🔍 Testing bypass and shadow sampling...")
+    calls = []
+
+    def fake_gemini(topic_name, videos, subject, difficulty_level):
+        calls.append(topic_name)
+        return {'selectedVideo': {'videoNumber': 2, 'youtubeUrl': videos[1].url}}
+
+    os.environ['HEURISTIC_BYPASS_MARGIN'] = '0.2'
+    before = get_heuristic_stats()
+    try:
+        os.environ['HEURISTIC_SHADOW_RATE'] = '0'
+        local = select_or_defer('python closures', 'Python', make_videos(), 'beginner', fake_gemini)
+        assert local['selectedVideo']['selectionSource'] == 'heuristic' and not calls
+
+        os.environ['HEURISTIC_SHADOW_RATE'] = '1'
+        shadowed = select_or_defer('python closures', 'Python', make_videos(), 'beginner', fake_gemini)
+        assert 'selectionSource' not in shadowed['selectedVideo'] and calls == ['python closures']
+
+        os.environ['HEURISTIC_BYPASS_MARGIN'] = 'off'
+        select_or_defer('python closures', 'Python', make_videos(), 'beginner', fake_gemini)
+        assert len(calls) == 2
+    finally:
+        del os.environ['HEURISTIC_BYPASS_MARGIN'], os.environ['HEURISTIC_SHADOW_RATE']
+
+    after = get_heuristic_stats()
+    assert after['evaluated'] - before['evaluated'] == 3
+    assert after['bypassed'] - before['bypassed'] == 1
+    assert after['shadowAgreements'] - before['shadowAgreements'] == 1
+    assert 0 < after['bypassRate'] <= 1 and after['shadowAgreementRate'] == 1.0
+    print("✅ Bypass and shadow stats OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing heuristic ranker...")
+    print("=" * 50)
+    test_features_are_bounded()
+    test_dominant_candidate_is_selected_locally()
+    test_bypass_and_shadow_stats()
+    print("=" * 50)
+    print("🎉 All heuristic ranker tests passed!")
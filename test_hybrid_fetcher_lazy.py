@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Test that the hybrid fetcher is built lazily and its API client works offline
+"""
+import sys
+import os
+import subprocess
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+
+def test_import_does_not_build_fetcher():
+    """Importing the module loads neither googleapiclient, yt-dlp nor pymongo"""
+
+    print("🔍 Testing lazy import...")
+    code = (
+        "import sys; import src.course_path_generator.youtube_hybrid_fetcher as m; "
+        "heavy = [name for name in ('googleapiclient', 'yt_dlp', 'pymongo') if name in sys.modules]; "
+        "assert not heavy, heavy; assert m._youtube_fetcher is None"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    print("✅ Import is lazy")
+
+
+def test_offline_client_and_shared_fetcher():
+    """The client builds from a local discovery document and the fetcher is shared"""
+
+    print("🔍 Testing offline build and shared fetcher...")
+    from src.course_path_generator import youtube_hybrid_fetcher as hybrid
+
+    service = hybrid.build_youtube_service("offline-test-key")
+    assert hasattr(service, 'search') and hasattr(service, 'videos')
+
+    first = hybrid.get_youtube_fetcher()
+    assert hybrid.get_youtube_fetcher() is first
+    assert hybrid.youtube_fetcher is first
+    print("✅ Offline build and shared fetcher OK")
+
+
+if __name__ == "__main__":
+    test_import_does_not_build_fetcher()
+    test_offline_client_and_shared_fetcher()
+    print("\n🎉 Lazy hybrid fetcher tests passed!")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test topic-by-topic course persistence with stubbed analysis and storage (no network)
+"""
+import sys
+import os
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.api_config import main as api
+from src.db import mongo_client
+from src.course_path_generator import main_course_creator, pipeline
+from test_course_outline import FakeDatabase, stages_running
+
+
+def generate(database, request_id, seen_courses, failing_writes=None):
+    """Run a background generation, recording the stored course as each topic starts.
+
+    failing_writes(topic_id) says whether storing that topic raises this time.
+    """
+
+    def analyze(topic, index, subject, difficulty_level, search, registry, degradation=0):
+        course = next(iter(database[api.COURSE_COLLECTION].documents.values()))
+        seen_courses.append((course["_id"], course["status"], list(course["topics"])))
+        if topic == 'empty':
+            return None
+        return {"id": f"topic-{topic}", "name": topic, "description": topic,
+                "videoInfo": {"youtubeUrl": f"https://www.youtube.com/watch?v={index}"}, "tags": []}
+
+    saved = (api.get_database, mongo_client.get_database, main_course_creator.generate_learning_topics,
+             pipeline.default_topic_stages, main_course_creator.get_topic_search)
+    api.get_database = mongo_client.get_database = lambda: database
+    main_course_creator.generate_learning_topics = lambda subject, level: ['a', 'empty', 'b']
+    pipeline.default_topic_stages = stages_running(analyze)
+    main_course_creator.get_topic_search = lambda latency_critical=False: None
+    add_topic = api.IncrementalCoursePersister.add_topic
+
+    def flaky_add_topic(persister, topic):
+        if failing_writes and failing_writes(topic["id"]):
+            raise api.BulkheadFull("mongo bulkhead is full")
+        return add_topic(persister, topic)
+
+    api.IncrementalCoursePersister.add_topic = flaky_add_topic
+    try:
+        api._background_generate_and_store("Python", "beginner", request_id)
+    finally:
+        (api.get_database, mongo_client.get_database, main_course_creator.generate_learning_topics,
+         pipeline.default_topic_stages, main_course_creator.get_topic_search) = saved
+        api.IncrementalCoursePersister.add_topic = add_topic
+
+
+def test_topics_are_visible_while_generating():
+    """The course exists from the start and grows one topic at a time"""
+
+    print("🔍 Testing incremental persistence...")
+    database = FakeDatabase()
+    seen = []
+    generate(database, "req-1", seen)
+
+    assert [(status, topics) for _, status, topics in seen] == [
+        ("generating", []), ("generating", ["topic-a"]), ("generating", ["topic-a"])]
+    course = database[api.COURSE_COLLECTION].documents[seen[0][0]]
+    assert course["status"] == "complete"
+    assert course["topics"] == ["topic-a", "topic-b"]
+    assert set(database[api.TOPIC_COLLECTION].documents) == {"topic-a", "topic-b"}
+    print("✅ Incremental persistence OK")
+
+
+def test_resumed_job_keeps_its_course():
+    """A resumed job writes into the same course without duplicating topics"""
+
+    print("🔍 Testing resume into the same course...")
+    database = FakeDatabase()
+    generate(database, "req-2", [])
+    course_id = next(iter(database[api.COURSE_COLLECTION].documents))
+
+    # Pretend the worker died before topic 'b' was checkpointed
+    job = database[api.get_job_store().collection_name].documents["req-2"]
+    job["status"] = "running"
+    del job["checkpoints"]["3"]
+    generate(database, "req-2", [])
+
+    assert list(database[api.COURSE_COLLECTION].documents) == [course_id]
+    course = database[api.COURSE_COLLECTION].documents[course_id]
+    assert course["topics"] == ["topic-a", "topic-b"] and course["status"] == "complete"
+    print("✅ Resume into the same course OK")
+
+
+def test_unstored_topics_are_retried_or_fail_the_job():
+    """A topic write rejected during generation is retried at the end; if it still fails, so does the job"""
+
+    print("🔍 Testing failed topic writes...")
+    database = FakeDatabase()
+    attempts = []
+
+    def fails_once(topic_id):
+        attempts.append(topic_id)
+        return topic_id == "topic-a" and attempts.count(topic_id) == 1
+
+    generate(database, "req-3", [], fails_once)
+    course = next(iter(database[api.COURSE_COLLECTION].documents.values()))
+    assert course["status"] == "complete"
+    assert course["topics"] == ["topic-a", "topic-b"], "retried topics keep their course position"
+    assert database[api.get_job_store().collection_name].documents["req-3"]["status"] == "completed"
+
+    database = FakeDatabase()
+    generate(database, "req-4", [], lambda topic_id: topic_id == "topic-b")
+    course = next(iter(database[api.COURSE_COLLECTION].documents.values()))
+    assert course["status"] == "failed"
+    assert database[api.get_job_store().collection_name].documents["req-4"]["status"] == "failed"
+    print("✅ Failed topic writes OK")
+
+
+def test_replayed_finish_links_the_creator_once():
+    """Finishing a course again (a resumed job) does not seed a second progress"""
+
+    print("🔍 Testing replayed finish...")
+    database = FakeDatabase()
+    database[api.USER_COLLECTION].insert_one({"_id": "user-1", "email": "ada@example.com"})
+    saved = api.get_database
+    api.get_database = lambda: database
+    try:
+        persister = api.IncrementalCoursePersister("course-1", "Python", "beginner", "ada@example.com")
+        persister.start()
+        persister.add_topic({"id": "topic-a", "name": "a"})
+        persister.finish()
+        persister.finish()
+    finally:
+        api.get_database = saved
+
+    progress = list(database[api.PROGRESS_COLLECTION].documents.values())
+    assert len(progress) == 1
+    assert progress[0]["coursePathId"] == "course-1" and progress[0]["userId"] == "user-1"
+    assert [entry["topicId"] for entry in progress[0]["progress"]] == ["topic-a"]
+    user = database[api.USER_COLLECTION].documents["user-1"]
+    assert user["courseProgressList"] == [progress[0]["_id"]]
+    assert user["createdCoursePaths"] == user["enrolledCoursePaths"] == ["course-1"]
+    print("✅ Replayed finish OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing incremental persistence...")
+    print("=" * 50)
+    test_topics_are_visible_while_generating()
+    test_resumed_job_keeps_its_course()
+    test_unstored_topics_are_retried_or_fail_the_job()
+    test_replayed_finish_links_the_creator_once()
+    print("=" * 50)
+    print("🎉 All incremental persistence tests passed!")
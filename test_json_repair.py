@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test local JSON repair of Gemini analysis responses (no network)
+"""
+import sys
+import os
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator.json_repair import loads_tolerant, extract_json_object, coerce_selected_video
+from src.course_path_generator.create_course_path import parse_analysis_response, analysis_generation_config
+
+
+def test_common_malformations_are_repaired():
+    """Prose, fences, trailing commas, Python literals and truncation"""
+
+    print("🔍 Testing JSON repair...")
+    assert loads_tolerant('{"a": 1}') == {'a': 1}
+    assert loads_tolerant('Here you go:\n```json\n{"a": 1}\n```\nHope it helps!') == {'a': 1}
+    assert loads_tolerant('Sure! {"a": {"b": "x}"}, "c": [1, 2,],} trailing') == {'a': {'b': 'x}'}, 'c': [1, 2]}
+    assert loads_tolerant('{"ok": True, "none": None}') == {'ok': True, 'none': None}
+    assert loads_tolerant('{"selectedVideo": {"title": "Loops", "reason": "cut off her') == {
+        'selectedVideo': {'title': 'Loops', 'reason': 'cut off her'}}
+    assert extract_json_object('```\n{"a": 1}\n```') == '{"a": 1}'
+    # Curly quotes are only JSON delimiters outside strings; inside values they are text
+    assert loads_tolerant('{"selectedVideo": {"reason": "uses “quotes”"') == {
+        'selectedVideo': {'reason': 'uses “quotes”'}}
+    assert loads_tolerant('{“title”: “Say “hi” again”, “n”: True,}') == {'title': 'Say “hi” again', 'n': True}
+    assert loads_tolerant('{"reason": "lists [a, b,] and True}", "x": 1,}') == {
+        'reason': 'lists [a, b,] and True}', 'x': 1}
+    try:
+        loads_tolerant('I cannot help with that.')
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("✅ JSON repair OK")
+
+
+def test_selected_video_fields_are_coerced():
+    """String numbers, percentages, timestamps and odd qualities are normalized"""
+
+    print("🔍 Testing field coercion...")
+    analysis = coerce_selected_video({'selectedVideo': {
+        'videoNumber': 'Video 2', 'relevanceScore': '130%', 'startTimeMs': '1:30',
+        'endTimeMs': 300000.0, 'contentQuality': 'High', 'reason': 'x' * 300}})
+    selected = analysis['selectedVideo']
+    assert selected['videoNumber'] == 2 and selected['relevanceScore'] == 100
+    assert selected['startTimeMs'] == 90000 and selected['endTimeMs'] == 300000
+    assert selected['contentQuality'] == 'high' and len(selected['reason']) == 200
+    assert coerce_selected_video({'selectedVideo': {'contentQuality': 'great'}})['selectedVideo']['contentQuality'] == 'medium'
+    print("✅ Field coercion OK")
+
+
+def test_analysis_parser_and_json_mode():
+    """The analysis parser repairs instead of escalating; JSON mode can be switched off"""
+
+    print("🔍 Testing analysis parsing...")
+    result, confident = parse_analysis_response(
+        'Best pick:\n```json\n{"selectedVideo": {"videoNumber": "1", "relevanceScore": "88", '
+        '"contentQuality": "medium",},}\n```')
+    assert confident and result['selectedVideo']['videoNumber'] == 1
+
+    assert analysis_generation_config()['response_mime_type'] == 'application/json'
+    os.environ['GEMINI_JSON_MODE'] = 'off'
+    try:
+        assert analysis_generation_config() is None
+    finally:
+        del os.environ['GEMINI_JSON_MODE']
+    print("✅ Analysis parsing OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing JSON repair...")
+    print("=" * 50)
+    test_common_malformations_are_repaired()
+    test_selected_video_fields_are_coerced()
+    test_analysis_parser_and_json_mode()
+    print("=" * 50)
+    print("🎉 All JSON repair tests passed!")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test the stage-based course pipeline engine with fake stages (no network)
+"""
+import sys
+import os
+import time
+import threading
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator.pipeline import (
+    CoursePipeline, Stage, TopicWork, PipelineContext, get_pipeline_stats
+)
+from src.course_path_generator.video_registry import video_registry_scope, current_video_registry
+
+
+def test_concurrent_stage_keeps_course_order():
+    """A stage with several workers runs topics side by side but yields them in order"""
+
+    print("🔍 Testing concurrent stage...")
+    active, peak, lock = [0], [0], threading.Lock()
+    registries = []
+
+    def slow_search(work, context):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        registries.append(current_video_registry())
+        time.sleep(0.05 if work.index == 1 else 0.01)
+        with lock:
+            active[0] -= 1
+        work.videos = [work.name]
+
+    def build(work, context):
+        work.finish({"name": work.videos[0]})
+
+    pipeline = CoursePipeline([Stage('search', slow_search, workers=3), Stage('build', build)])
+    with video_registry_scope() as registry:
+        works = [TopicWork(i, f"topic-{i}") for i in range(1, 6)]
+        names = [work.structure["name"] for work in pipeline.run(works, PipelineContext('Python', 'beginner'))]
+
+    assert names == [f"topic-{i}" for i in range(1, 6)]
+    assert peak[0] > 1, "searches should overlap"
+    assert registries == [registry] * 5, "workers see the course registry"
+    print("✅ Concurrent stage OK")
+
+
+def test_workers_are_capped():
+    """One topic runs without a thread pool; max_workers=1 pulls one topic at a time"""
+
+    print("🔍 Testing worker caps...")
+    threads, pulled = [], []
+
+    def search(work, context):
+        threads.append(threading.current_thread())
+        work.videos = [work.name]
+
+    def build(work, context):
+        work.finish({"name": work.videos[0], "pulledAhead": len(pulled) - work.index})
+
+    stages = [Stage('search', search, workers=4), Stage('build', build)]
+    list(CoursePipeline(stages).run([TopicWork(1, "only")], PipelineContext('Python', 'beginner')))
+    assert threads == [threading.current_thread()]
+
+    def works():
+        for i in range(1, 6):
+            pulled.append(i)
+            yield TopicWork(i, f"topic-{i}")
+
+    results = list(CoursePipeline(stages, max_workers=1).run(works(), PipelineContext('Python', 'beginner')))
+    assert [work.structure["pulledAhead"] for work in results] == [0] * 5
+    print("✅ Worker caps OK")
+
+
+def test_errors_cache_and_hooks():
+    """A failing topic is finished with its error, cached fields skip the stage, hooks see every run"""
+
+    print("🔍 Testing error isolation, caching and hooks...")
+    searches = []
+
+    def search(work, context):
+        searches.append(work.name)
+        if work.name == 'broken':
+            raise RuntimeError("backend down")
+        work.videos = [f"{work.name}-video"]
+
+    def build(work, context):
+        work.finish({"video": work.videos[0]})
+
+    def persist(work, context):
+        persisted.append((work.name, work.structure, work.error))
+
+    persisted, timings = [], []
+    stages = [Stage('cached-search', search, cache_key=lambda work, context: work.name, cached_field='videos',
+                    cache_size=8),
+              Stage('build', build),
+              Stage('cached-persist', persist, runs_on_done=True)]
+    pipeline = CoursePipeline(stages, hooks=[lambda name, work, seconds: timings.append(name)])
+    works = [TopicWork(i, name) for i, name in enumerate(['loops', 'broken', 'loops'], 1)]
+    list(pipeline.run(works, PipelineContext('Python', 'beginner')))
+
+    assert searches == ['loops', 'broken']
+    assert persisted == [('loops', {"video": "loops-video"}, None), ('broken', None, "backend down"),
+                         ('loops', {"video": "loops-video"}, None)]
+    assert timings.count('build') == 2 and timings.count('cached-persist') == 3
+    stats = get_pipeline_stats()
+    assert stats['cached-search']['cacheHits'] == 1 and stats['cached-search']['errors'] == 1
+    print("✅ Error isolation, caching and hooks OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing course pipeline...")
+    print("=" * 50)
+    test_concurrent_stage_keeps_course_order()
+    test_workers_are_capped()
+    test_errors_cache_and_hooks()
+    print("=" * 50)
+    print("🎉 All pipeline tests passed!")
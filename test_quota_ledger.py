@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test the YouTube quota ledger's day boundary, shared Mongo counter and local fallback (no MongoDB needed)
+"""
+import sys
+import os
+import threading
+from datetime import datetime, timezone
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.db import mongo_client, quota_ledger
+from src.db.quota_ledger import YoutubeQuotaLedger, quota_day, SEARCH_LIST_COST, VIDEOS_LIST_COST
+
+
+class LedgerCollection:
+    """The few Mongo operations the ledger uses, atomic per call like single-document updates"""
+
+    def __init__(self):
+        self.documents = {}
+        self.lock = threading.Lock()
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def _matches(self, doc, query):
+        for key, condition in query.items():
+            value = doc.get(key)
+            if isinstance(condition, dict):
+                if '$not' in condition and value is not None and value > condition['$not']['$gt']:
+                    return False
+                if '$gte' in condition and (value is None or value < condition['$gte']):
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def _update(self, doc, update, inserted):
+        for key, value in update.get('$setOnInsert', {}).items() if inserted else ():
+            doc[key] = value
+        for key, amount in update.get('$inc', {}).items():
+            doc[key] = doc.get(key, 0) + amount
+        for key, value in update.get('$max', {}).items():
+            doc[key] = max(doc.get(key, value), value)
+
+    def update_one(self, query, update, upsert=False):
+        with self.lock:
+            doc = self.documents.get(query['_id'])
+            if doc is None and upsert:
+                doc = self.documents[query['_id']] = {'_id': query['_id']}
+                self._update(doc, update, True)
+            elif doc is not None and self._matches(doc, query):
+                self._update(doc, update, False)
+
+    def find_one_and_update(self, query, update, return_document=None):
+        with self.lock:
+            doc = self.documents.get(query['_id'])
+            if doc is None or not self._matches(doc, query):
+                return None
+            self._update(doc, update, False)
+            return dict(doc)
+
+    def find_one(self, query, projection=None):
+        with self.lock:
+            doc = self.documents.get(query['_id'])
+            return dict(doc) if doc else None
+
+
+def mongo_ledger(daily_limit):
+    """A ledger on a stubbed quota collection, with a restore function"""
+    collection = LedgerCollection()
+    saved = mongo_client.get_database
+    mongo_client.get_database = lambda: {quota_ledger.QUOTA_COLLECTION: collection}
+
+    def restore():
+        mongo_client.get_database = saved
+    return YoutubeQuotaLedger(daily_limit=daily_limit), collection, restore
+
+
+def test_quota_day_is_pacific():
+    """The quota day rolls over at Pacific midnight, not UTC midnight"""
+
+    print("🔍 Testing quota day boundary...")
+    # 07:59 UTC on March 2nd is still March 1st in Los Angeles (PST, UTC-8)
+    assert quota_day(datetime(2026, 3, 2, 7, 59, tzinfo=timezone.utc)) == '2026-03-01'
+    assert quota_day(datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)) == '2026-03-02'
+    print("✅ Quota day OK")
+
+
+def test_local_fallback_never_overshoots():
+    """Without MongoDB the per-process counter still enforces the limit"""
+
+    print("🔍 Testing local fallback...")
+    ledger = YoutubeQuotaLedger(daily_limit=250)
+    ledger._collection = lambda: None  # Simulate MongoDB being unreachable
+
+    assert ledger.reserve(SEARCH_LIST_COST) and ledger.reserve(VIDEOS_LIST_COST)
+    assert ledger.reserve(SEARCH_LIST_COST)
+    assert not ledger.reserve(SEARCH_LIST_COST)
+    assert ledger.used_today() == 201 and ledger.remaining() == 49
+
+    ledger.release(SEARCH_LIST_COST)
+    assert ledger.remaining() == 149
+    ledger.mark_exhausted()
+    assert ledger.remaining() == 0 and not ledger.reserve(VIDEOS_LIST_COST)
+    print("✅ Local fallback OK")
+
+
+def test_mongo_reserve_is_denied_at_the_cap():
+    """The conditional $inc refuses a reservation that would pass the limit, on every counter"""
+
+    print("🔍 Testing Mongo reservations at the cap...")
+    ledger, collection, restore = mongo_ledger(250)
+    try:
+        assert ledger.reserve(SEARCH_LIST_COST) and ledger.reserve(SEARCH_LIST_COST)
+        assert not ledger.reserve(SEARCH_LIST_COST)
+        assert ledger.reserve(50) and not ledger.reserve(VIDEOS_LIST_COST)
+        assert ledger.used_today() == 250 and ledger.remaining() == 0
+
+        # A separate counter (e.g. racing) has its own limit and starts from nothing
+        assert ledger.reserve(SEARCH_LIST_COST, 'raceUsed', 150) and not ledger.reserve(SEARCH_LIST_COST, 'raceUsed', 150)
+        ledger.release(SEARCH_LIST_COST, 'raceUsed')
+        assert ledger.used_today('raceUsed') == 0 and ledger.used_today() == 250
+
+        ledger.release(SEARCH_LIST_COST)
+        assert ledger.remaining() == 100
+        ledger.mark_exhausted()
+        assert not ledger.reserve(VIDEOS_LIST_COST)
+        assert collection.documents[quota_day()]['limit'] == 250
+    finally:
+        restore()
+    print("✅ Mongo cap OK")
+
+
+def test_concurrent_reserves_never_overshoot():
+    """Workers reserving at the same time share the limit exactly"""
+
+    print("🔍 Testing concurrent reservations...")
+    ledger, collection, restore = mongo_ledger(1000)
+    workers = [YoutubeQuotaLedger(daily_limit=1000) for _ in range(4)]
+    results = []
+    results_lock = threading.Lock()
+
+    def reserve(worker):
+        for _ in range(5):
+            granted = worker.reserve(SEARCH_LIST_COST + VIDEOS_LIST_COST)
+            with results_lock:
+                results.append(granted)
+
+    try:
+        threads = [threading.Thread(target=reserve, args=(worker,)) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results.count(True) == 9 and len(results) == 20
+        assert ledger.used_today() == 9 * (SEARCH_LIST_COST + VIDEOS_LIST_COST)
+    finally:
+        restore()
+    print("✅ Concurrent reservations OK")
+
+
+def test_mongo_counter_rolls_over_at_pacific_midnight():
+    """A spent quota is available again once the Pacific day changes, in a new day document"""
+
+    print("🔍 Testing Pacific rollover...")
+    ledger, collection, restore = mongo_ledger(200)
+    now = [datetime(2026, 3, 2, 7, 59, tzinfo=timezone.utc)]  # 23:59 on March 1st in Los Angeles
+    saved_quota_day = quota_ledger.quota_day
+    quota_ledger.quota_day = lambda when=None: saved_quota_day(when or now[0])
+    try:
+        assert ledger.reserve(200) and not ledger.reserve(VIDEOS_LIST_COST)
+        now[0] = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)  # Pacific midnight
+        assert ledger.remaining() == 200 and ledger.reserve(SEARCH_LIST_COST)
+        assert collection.documents['2026-03-01']['used'] == 200
+        assert collection.documents['2026-03-02']['used'] == SEARCH_LIST_COST
+        assert collection.documents['2026-03-02']['expiresAt'].date().isoformat() == '2026-03-05'
+    finally:
+        quota_ledger.quota_day = saved_quota_day
+        restore()
+    print("✅ Pacific rollover OK")
+
+
+if __name__ == "__main__":
+    test_quota_day_is_pacific()
+    test_local_fallback_never_overshoots()
+    test_mongo_reserve_is_denied_at_the_cap()
+    test_concurrent_reserves_never_overshoot()
+    test_mongo_counter_rolls_over_at_pacific_midnight()
+    print("\n🎉 Quota ledger tests passed!")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test race mode with stubbed search legs (no network, no API quota)
+"""
+import sys
+import os
+import time
+import threading
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator import search_race
+from src.db.quota_ledger import YoutubeQuotaLedger
+
+
+def local_ledger():
+    """A quota ledger on its per-process fallback (MongoDB unreachable)"""
+    ledger = YoutubeQuotaLedger(daily_limit=10000)
+    ledger._collection = lambda: None
+    return ledger
+
+
+def _with_legs(api_leg, ytdlp_leg, budget=1000):
+    """Swap in fake legs and a fresh quota guard, returning a restore function"""
+    saved = (search_race._api_leg, search_race._ytdlp_leg, search_race._api_leg_possible, search_race.race_quota_guard)
+    search_race._api_leg = api_leg
+    # The real yt-dlp leg hands back a future from the rate controller
+    search_race._ytdlp_leg = lambda *args: search_race._race_executor.submit(ytdlp_leg, *args)
+    search_race._api_leg_possible = lambda: True
+    search_race.race_quota_guard = search_race.RaceQuotaGuard(budget, local_ledger())
+
+    def restore():
+        (search_race._api_leg, search_race._ytdlp_leg,
+         search_race._api_leg_possible, search_race.race_quota_guard) = saved
+    return restore
+
+
+def test_fast_leg_wins_and_loser_is_cancelled():
+    """The API answer is returned without waiting for a throttled yt-dlp search"""
+
+    print("🔍 Testing race winner and cancellation...")
+    started = threading.Event()
+    cancelled = threading.Event()
+
+    def slow_ytdlp(topic, subject, max_results, cancel_event):
+        # Simulates the 30-60 s bot-detection wait; wakes up as soon as the race is decided
+        started.set()
+        if cancel_event.wait(30):
+            cancelled.set()
+        return []
+
+    restore = _with_legs(lambda topic, subject, max_results: [{'video_id': 'api1', 'title': topic}], slow_ytdlp)
+    try:
+        start = time.time()
+        videos = search_race.race_search('closures', 'Python', max_results=5)
+        assert time.time() - start < 5
+        assert videos and videos[0]['video_id'] == 'api1' and videos[0]['source'] == 'youtube_api'
+        # The loser either never started or woke up from its wait
+        assert not started.is_set() or cancelled.wait(5), "yt-dlp leg was not cancelled"
+        assert search_race.race_quota_guard.used_units == 101
+    finally:
+        restore()
+    print("✅ Race winner OK")
+
+
+def test_empty_or_junk_leg_does_not_win():
+    """An empty or malformed result from the fast leg waits for the other one"""
+
+    print("🔍 Testing empty and junk results...")
+    for fast_result in ([], [None, 'garbage', {'title': 'no id'}, {'video_id': 'untitled'}]):
+        restore = _with_legs(
+            lambda topic, subject, max_results: fast_result,
+            lambda topic, subject, max_results, cancel_event: (
+                time.sleep(0.2), [None, {'video_id': 'yt1', 'title': 'Closures'}])[1],
+        )
+        try:
+            videos = search_race.race_search('closures', 'Python')
+            assert [video['video_id'] for video in videos] == ['yt1'], fast_result
+        finally:
+            restore()
+    print("✅ Empty and junk results OK")
+
+
+def test_quota_guard():
+    """Racing never reserves more API units than the budget"""
+
+    print("🔍 Testing quota guard...")
+    ledger = local_ledger()
+    # Two workers' guards draw on the one ledger's racing counter
+    guard, other_worker = search_race.RaceQuotaGuard(250, ledger), search_race.RaceQuotaGuard(250, ledger)
+    assert guard.try_reserve(101) and other_worker.try_reserve(101)
+    assert not guard.try_reserve(101) and not other_worker.try_reserve(101)
+    guard.release(101)
+    assert other_worker.try_reserve(101) and guard.used_units == 202
+    assert ledger.used_today() == 0, "racing has its own counter next to the API quota"
+    print("✅ Quota guard OK")
+
+
+if __name__ == "__main__":
+    test_fast_leg_wins_and_loser_is_cancelled()
+    test_empty_or_junk_leg_does_not_win()
+    test_quota_guard()
+    print("\n🎉 Search race tests passed!")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test the local segment locator (no network, no Gemini)
+"""
+import sys
+import os
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator.segment_locator import parse_chapter_markers, locate_segment, apply_segment_locator
+from src.course_path_generator.subtitle_normalizer import parse_vtt_cues
+from src.course_path_generator import get_youtube_videos
+
+
+def _filler_cues(start_s: int, end_s: int, text: str):
+    return [(t * 1000, (t + 4) * 1000, text) for t in range(start_s, end_s, 4)]
+
+
+def test_chapter_markers():
+    """Chapter lines in descriptions are parsed and matched to the topic"""
+
+    print("🔍 Testing chapter markers...")
+    description = "Learn Python!\n00:00 Intro\n02:30 Variables\n7:45 - For loops and while loops\n1:02:03 Wrap up"
+    chapters = parse_chapter_markers(description)
+    assert [c['startMs'] for c in chapters] == [0, 150000, 465000, 3723000], chapters
+    assert chapters[2]['title'] == "For loops and while loops"
+
+    segment = locate_segment("Loops in Python", description=description, duration_seconds=4000)
+    assert segment and segment['source'] == 'chapters', segment
+    assert segment['startTimeMs'] == 465000 and segment['endTimeMs'] == 3723000, segment
+    print("✅ Chapter markers OK")
+
+
+def test_transcript_density():
+    """The densest keyword span of the transcript is selected"""
+
+    print("🔍 Testing transcript keyword density...")
+    cues = (_filler_cues(0, 300, "welcome to the channel and today we talk about many things")
+            + _filler_cues(300, 420, "a decorator wraps a function, decorators return a new function")
+            + _filler_cues(420, 600, "thanks for watching please subscribe"))
+    segment = locate_segment("Python decorators", cues=cues, duration_seconds=600)
+    assert segment and segment['source'] == 'transcript', segment
+    assert 270000 <= segment['startTimeMs'] <= 310000, segment
+    assert 400000 <= segment['endTimeMs'] <= 450000, segment
+    print(f"✅ Transcript span {segment['startTimeMs']}ms - {segment['endTimeMs']}ms")
+
+
+def test_vtt_cues_and_fill_mode():
+    """VTT cues are timed and invalid Gemini times are replaced"""
+
+    print("🔍 Testing VTT cues and fill mode...")
+    vtt = "WEBVTT\n\n00:00:01.000 --> 00:00:04.500\n<c>hello</c> world\n\n00:01:00.000 --> 00:01:03.000\nsecond cue\n"
+    cues = parse_vtt_cues(vtt)
+    assert cues == [(1000, 4500, "hello world"), (60000, 63000, "second cue")], cues
+
+    videos = [{
+        'url': 'https://www.youtube.com/watch?v=abc',
+        'video_id': 'abc',
+        'duration': 600,
+        'description': "00:00 Intro\n05:00 Recursion explained\n08:00 Outro",
+    }]
+    analysis = {'selectedVideo': {'videoNumber': 1, 'startTimeMs': 0, 'endTimeMs': 0}}
+    apply_segment_locator(analysis, videos, "Recursion")
+    selected = analysis['selectedVideo']
+    assert (selected['startTimeMs'], selected['endTimeMs']) == (300000, 480000), selected
+
+    # Valid Gemini times are kept in the default 'fill' mode
+    analysis = {'selectedVideo': {'videoNumber': 1, 'startTimeMs': 1000, 'endTimeMs': 90000}}
+    apply_segment_locator(analysis, videos, "Recursion")
+    assert analysis['selectedVideo']['endTimeMs'] == 90000
+    print("✅ VTT cues and fill mode OK")
+
+
+def test_selected_flat_video_gets_its_captions():
+    """A basic (flat) candidate has no transcript; the selected one's captions are fetched for the locator"""
+
+    print("🔍 Testing caption fetch for the selected video...")
+    # What an extract_flat ytsearch entry looks like: no description, no caption tracks
+    flat_entry = {'_type': 'url', 'ie_key': 'Youtube', 'id': 'abc', 'url': 'https://www.youtube.com/watch?v=abc',
+                  'title': 'Python recursion', 'duration': 600, 'channel': 'Teacher', 'view_count': 1000}
+    video = get_youtube_videos.extract_video_details(flat_entry)
+    assert video.subtitle_cues is None
+
+    vtt = "WEBVTT\n\n" + "".join(
+        f"00:0{minute}:{second:02d}.000 --> 00:0{minute}:{second + 4:02d}.000\n{text}\n\n"
+        for minute, text in ((1, 'welcome everyone'), (4, 'recursion means a function calls itself, recursion'))
+        for second in range(0, 56, 4))
+
+    class FakeResponse:
+        status_code = 200
+        text = vtt
+
+    extracted = []
+
+    def fake_extract(ydl_opts, url):
+        extracted.append((ydl_opts['extract_flat'], url))
+        return {'id': 'abc', 'automatic_captions': {'en': [{'url': 'https://x/en.vtt', 'ext': 'vtt'}]}}
+
+    import requests
+    saved = (requests.get, get_youtube_videos.extract_info_checked)
+    requests.get = lambda url, timeout=None: FakeResponse()
+    get_youtube_videos.extract_info_checked = fake_extract
+    try:
+        analysis = {'selectedVideo': {'videoNumber': 1}}
+        apply_segment_locator(analysis, [video], "Recursion", get_youtube_videos.fetch_subtitle_cues)
+    finally:
+        requests.get, get_youtube_videos.extract_info_checked = saved
+
+    selected = analysis['selectedVideo']
+    assert extracted == [(False, 'https://www.youtube.com/watch?v=abc')]
+    assert selected['segmentSource'] == 'transcript' and 200000 <= selected['startTimeMs'] <= 240000, selected
+    print("✅ Caption fetch OK")
+
+
+if __name__ == "__main__":
+    test_chapter_markers()
+    test_transcript_density()
+    test_vtt_cues_and_fill_mode()
+    test_selected_flat_video_gets_its_captions()
+    print("\n🎉 Segment locator tests passed!")
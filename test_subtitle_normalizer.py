@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test the shared subtitle normalizer on every supported format (no network)
+"""
+import sys
+import os
+import json
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator.subtitle_normalizer import (
+    iter_subtitle_cues, normalize_subtitles, parse_json3_subtitles, clean_subtitle_text
+)
+
+
+VTT_SAMPLE = """WEBVTT
+Kind: captions
+Language: en
+
+1
+00:00:01.000 --> 00:00:03.000 align:start position:0%
+hello <c.colorE5E5E5>world</c>
+
+2
+00:00:03.000 --> 00:00:05.000
+hello world
+
+00:00:05.000 --> 00:00:08.500
+functions &amp; loops
+"""
+
+SRV3_SAMPLE = '<timedtext format="3"><body><p t="1000" d="2000">hello <s ac="0">world</s></p><p t="3000" d="1500">again</p></body></timedtext>'
+
+TTML_SAMPLE = '<tt><body><div><p begin="00:00:01.000" end="00:00:03.000">first<br/>line</p><p begin="4.5s" dur="1s">second</p></div></body></tt>'
+
+JSON3_SAMPLE = json.dumps({'events': [
+    {'tStartMs': 0, 'dDurationMs': 1000},
+    {'tStartMs': 1000, 'dDurationMs': 2000, 'segs': [{'utf8': 'hello'}, {'utf8': ' world'}]},
+    {'tStartMs': 3000, 'dDurationMs': 500, 'segs': [{'utf8': '\n'}]},
+]})
+
+
+def test_formats():
+    """All four formats produce the same timed cue shape"""
+
+    print("🔍 Testing subtitle formats...")
+    vtt_cues = list(iter_subtitle_cues(VTT_SAMPLE, 'vtt'))
+    assert vtt_cues == [(1000, 3000, 'hello world'), (3000, 5000, 'hello world'), (5000, 8500, 'functions & loops')], vtt_cues
+    assert normalize_subtitles(VTT_SAMPLE, 'vtt') == 'hello world functions & loops'
+
+    assert list(iter_subtitle_cues(SRV3_SAMPLE, 'srv3')) == [(1000, 3000, 'hello world'), (3000, 4500, 'again')]
+    assert list(iter_subtitle_cues(TTML_SAMPLE, 'ttml')) == [(1000, 3000, 'first line'), (4500, 5500, 'second')]
+    assert list(iter_subtitle_cues(JSON3_SAMPLE, 'json3')) == [(1000, 3000, 'hello world')]
+    print("✅ VTT, SRV3, TTML and JSON3 OK")
+
+
+def test_character_cap_and_fallbacks():
+    """Output is capped, and bad JSON3 falls back to raw cleaning"""
+
+    print("🔍 Testing character cap and fallbacks...")
+    long_vtt = "WEBVTT\n\n" + "".join(
+        f"00:00:{i % 60:02d}.000 --> 00:00:{i % 60:02d}.500\nline number {i}\n\n" for i in range(2000)
+    )
+    text = normalize_subtitles(long_vtt, 'vtt', max_chars=100)
+    assert len(text) == 100 and text.startswith('line number 0 line number 1')
+
+    cues = []
+    normalize_subtitles(long_vtt, 'vtt', max_chars=100, cues_out=cues)
+    assert len(cues) == 2000
+
+    assert parse_json3_subtitles('<b>not json</b>') == 'not json'
+    assert clean_subtitle_text("1\n00:00:01,000 --> 00:00:02,000\n<i>Hi</i>\n\n2\nthere") == 'Hi there'
+    print("✅ Character cap and fallbacks OK")
+
+
+if __name__ == "__main__":
+    test_formats()
+    test_character_cap_and_fallbacks()
+    print("\n🎉 Subtitle normalizer tests passed!")
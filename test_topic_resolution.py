@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test lazy per-topic video resolution with stubbed selection and storage (no network)
+"""
+import sys
+import os
+import time
+import threading
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from fastapi import Response, BackgroundTasks
+
+from src.api_config import main as api
+from src.course_path_generator import main_course_creator
+from test_course_outline import FakeDatabase
+
+
+def build_course(database, names):
+    topics = [{"_id": f"t{i}", "name": name, "videoStatus": "pending", "prerequisites": []}
+              for i, name in enumerate(names)]
+    database[api.TOPIC_COLLECTION].insert_many(topics)
+    database[api.COURSE_COLLECTION].insert_one({"_id": "c1", "subject": "Python", "targetLevel": "beginner",
+                                                "topics": [topic["_id"] for topic in topics]})
+
+
+class Stubs:
+    """Counts resolutions; each one takes a moment so concurrent requests overlap."""
+
+    def __init__(self, database):
+        self.database = database
+        self.resolved = []
+
+    def analyze(self, topic, index, subject, difficulty_level, search, registry, degradation=0):
+        self.resolved.append(topic)
+        time.sleep(0.2)
+        return {"id": "x", "name": topic, "description": topic, "tags": [], "prerequisites": [],
+                "videoInfo": {"youtubeUrl": f"https://www.youtube.com/watch?v={topic}", "title": topic,
+                              "startTime": 0, "endTime": 60}}
+
+    def __enter__(self):
+        self.saved = (api.get_database, main_course_creator.analyze_single_topic, main_course_creator.get_topic_search)
+        api.get_database = lambda: self.database
+        main_course_creator.analyze_single_topic = self.analyze
+        main_course_creator.get_topic_search = lambda latency_critical=False: None
+        return self
+
+    def __exit__(self, *exc):
+        api.get_database, main_course_creator.analyze_single_topic, main_course_creator.get_topic_search = self.saved
+
+
+def resolve(topic_id, lookahead=0):
+    response, tasks = Response(), BackgroundTasks()
+    body = api.resolve_topic_endpoint("c1", topic_id, response, tasks, lookahead=lookahead)
+    return body, tasks
+
+
+def test_concurrent_first_access_resolves_once():
+    """Two simultaneous first accesses share one resolution; later ones hit the cache"""
+
+    print("🔍 Testing concurrent first access...")
+    database = FakeDatabase()
+    build_course(database, ["loops", "functions"])
+    results = []
+    with Stubs(database) as stubs:
+        threads = [threading.Thread(target=lambda: results.append(resolve("t0")[0])) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        again, _ = resolve("t0")
+
+    assert stubs.resolved == ["loops"]
+    assert [result["status"] for result in results] == ["ready", "ready"]
+    assert again["topic"]["videoInfo"]["youtubeUrl"].endswith("loops")
+    print("✅ Concurrent first access OK")
+
+
+def test_lookahead_resolves_next_topics():
+    """Opening a topic schedules the next N pending topics"""
+
+    print("🔍 Testing lookahead...")
+    database = FakeDatabase()
+    build_course(database, ["a", "b", "c", "d", "e"])
+    with Stubs(database) as stubs:
+        body, tasks = resolve("t0", lookahead=2)
+        assert body["lookahead"] == ["t1", "t2"]
+        for task in tasks.tasks:
+            task.func(*task.args, **task.kwargs)
+    statuses = [database[api.TOPIC_COLLECTION].documents[f"t{i}"]["videoStatus"] for i in range(5)]
+    assert statuses == ["ready", "ready", "ready", "pending", "pending"]
+    assert stubs.resolved == ["a", "b", "c"]
+    print("✅ Lookahead OK")
+
+
+def test_failed_write_releases_the_claim():
+    """A resolution whose result cannot be stored leaves the topic retryable, not stuck resolving"""
+
+    print("🔍 Testing claim release...")
+    database = FakeDatabase()
+    build_course(database, ["a"])
+
+    def broken_write(topic):
+        raise RuntimeError("write failed")
+
+    saved = api._update_outline_topic
+    api._update_outline_topic = broken_write
+    try:
+        with Stubs(database) as stubs:
+            started = time.time()
+            body, _ = resolve("t0")
+            assert time.time() - started < api.TOPIC_RESOLVE_WAIT_SEC / 2
+            assert body["status"] == "failed"
+            api._update_outline_topic = saved
+            again, _ = resolve("t0")
+    finally:
+        api._update_outline_topic = saved
+    assert stubs.resolved == ["a", "a"] and again["status"] == "ready"
+    print("✅ Claim release OK")
+
+
+def test_unknown_topic_is_404():
+    print("🔍 Testing unknown topic...")
+    database = FakeDatabase()
+    build_course(database, ["a"])
+    with Stubs(database):
+        try:
+            resolve("missing")
+            assert False, "expected HTTPException"
+        except api.HTTPException as e:
+            assert e.status_code == 404
+    print("✅ Unknown topic OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing lazy topic resolution...")
+    print("=" * 50)
+    test_concurrent_first_access_resolves_once()
+    test_lookahead_resolves_next_topics()
+    test_failed_write_releases_the_claim()
+    test_unknown_topic_is_404()
+    print("=" * 50)
+    print("🎉 All topic resolution tests passed!")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test the local video corpus and its on-disk inverted index (no network)
+"""
+import sys
+import os
+import tempfile
+import threading
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator import video_corpus
+from src.course_path_generator.video_corpus import VideoCorpus
+from src.course_path_generator.video_record import Video
+from src.course_path_generator.video_search_backends import VideoSearchBackend, AdaptiveBackendSelector
+
+
+def make_video(video_id, title, subtitles=''):
+    return Video(video_id=video_id, title=title, url=f'https://www.youtube.com/watch?v={video_id}',
+                 subtitles=subtitles, duration=600, subtitle_cues=[(0, 5000, 'hello')])
+
+
+def test_index_survives_rebuild_and_reopen():
+    """Videos are found before and after the index is rebuilt and reloaded from disk"""
+
+    print("🔍 Testing corpus index...")
+    with tempfile.TemporaryDirectory() as directory:
+        corpus = VideoCorpus(directory, rebuild_every=3)
+        assert corpus.add_videos([make_video('a', 'Python closures explained'),
+                                  make_video('b', 'Cooking pasta')]) == 2
+        assert corpus.add_videos([make_video('a', 'duplicate')]) == 0
+        assert [video.video_id for video, _, _ in corpus.query('closures', 'Python')] == ['a']
+
+        corpus.add_videos([make_video('c', 'Decorators', subtitles='closures capture variables')])
+        corpus.wait_for_rebuild()
+        assert corpus.stats['rebuilds'] == 1 and corpus.delta == []
+        corpus.add_videos([make_video('d', 'Closures in JavaScript')])
+
+        reopened = VideoCorpus(directory, rebuild_every=3)
+        assert len(reopened) == 4 and reopened.indexed_count == 3
+        results = reopened.query('python closures', '', limit=5)
+        assert results[0][0].video_id == 'a' and results[0][2] == 1.0
+        assert {video.video_id for video, _, _ in results} == {'a', 'c', 'd'}
+        assert results[0][0].subtitle_cues == [[0, 5000, 'hello']]
+        assert results[0][0].source == 'corpus'
+
+        # A second generation merges the new videos into the existing postings
+        reopened.add_videos([make_video('e', 'Python generators'), make_video('f', 'Closures and generators')])
+        reopened.wait_for_rebuild()
+        assert reopened.stats['rebuilds'] == 1 and reopened.indexed_count == 6
+        again = VideoCorpus(directory, rebuild_every=3)
+        assert [video.video_id for video, _, _ in again.query('closures', '', limit=10)] == \
+               [video.video_id for video, _, _ in reopened.query('closures', '', limit=10)]
+        assert {video.video_id for video, _, _ in again.query('generators')} == {'e', 'f'}
+        assert len(again.query('closures', '', limit=10)) == 4
+    print("✅ Corpus index OK")
+
+
+def test_queries_do_not_wait_for_rebuilds():
+    """A rebuild merges in the background; queries answer from the old generation meanwhile"""
+
+    print("🔍 Testing background rebuild...")
+    merging, release = threading.Event(), threading.Event()
+    merge = video_corpus._merge_postings
+
+    def slow_merge(*args):
+        merging.set()
+        release.wait(5)
+        return merge(*args)
+
+    video_corpus._merge_postings = slow_merge
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            corpus = VideoCorpus(directory, rebuild_every=2)
+            corpus.add_videos([make_video('a', 'Python closures'), make_video('b', 'Python generators')])
+            assert merging.wait(5)
+            # Mid-rebuild: queries and appends still work
+            assert [video.video_id for video, _, _ in corpus.query('closures')] == ['a']
+            corpus.add_videos([make_video('c', 'More closures')])
+            assert corpus.stats['rebuilds'] == 0
+            release.set()
+            corpus.wait_for_rebuild()
+
+            assert corpus.stats['rebuilds'] == 1 and corpus.indexed_count == 2 and len(corpus.delta) == 1
+            assert {video.video_id for video, _, _ in corpus.query('closures')} == {'a', 'c'}
+            reopened = VideoCorpus(directory, rebuild_every=2)
+            assert reopened.indexed_count == 2 and len(reopened) == 3
+            assert [video.video_id for video, _, _ in reopened.query('generators')] == ['b']
+    finally:
+        video_corpus._merge_postings = merge
+    print("✅ Background rebuild OK")
+
+
+def test_processes_sharing_a_directory_stay_consistent():
+    """Two corpora on one directory (two workers) agree on document numbers and generations"""
+
+    print("🔍 Testing shared corpus directory...")
+    merge = video_corpus._merge_postings
+    with tempfile.TemporaryDirectory() as directory:
+        first, second = VideoCorpus(directory, rebuild_every=100), VideoCorpus(directory, rebuild_every=100)
+        first.add_videos([make_video('a', 'Python closures'), make_video('b', 'Python generators')])
+        # The second worker indexes the first one's appends before its own, and skips their duplicates
+        assert second.add_videos([make_video('c', 'Closures in depth'), make_video('a', 'again')]) == 1
+        assert {video.video_id for video, _, _ in second.query('closures')} == {'a', 'c'}
+
+        first.rebuild()
+        second.rebuild()
+        assert first.generation == second.generation == 1 and second.stats['rebuilds'] == 0
+        assert second.indexed_count == 3 and second.delta == []
+
+        # Both rebuild at once: the one publishing second adopts the other's generation
+        first.add_videos([make_video('d', 'Generators tutorial')])
+
+        def racing_merge(*args):
+            video_corpus._merge_postings = merge
+            second.rebuild()
+            return merge(*args)
+
+        video_corpus._merge_postings = racing_merge
+        try:
+            first.rebuild()
+        finally:
+            video_corpus._merge_postings = merge
+        assert first.generation == second.generation == 2 and first.indexed_count == 4
+        assert sorted(name for name in os.listdir(directory) if name.endswith('.npy')) == \
+               ['lengths-2.npy', 'postings-2.npy']
+        reopened = VideoCorpus(directory)
+        assert first.stats['rebuilds'] == 1 and second.stats['rebuilds'] == 1
+        for corpus in (first, second, reopened):
+            assert {video.video_id for video, _, _ in corpus.query('generators')} == {'b', 'd'}
+    print("✅ Shared corpus directory OK")
+
+
+class CountingBackend(VideoSearchBackend):
+    name = 'counting'
+
+    def __init__(self):
+        self.calls = 0
+
+    def _search(self, topic, subject, max_results):
+        self.calls += 1
+        return [{'id': f'{topic}-{i}', 'title': f'{topic} lesson {i}', 'duration': 600} for i in range(3)]
+
+
+def test_selector_queries_corpus_first():
+    """A repeated topic is served locally; an unknown one still reaches the backend"""
+
+    print("🔍 Testing corpus-first search...")
+    backend = CountingBackend()
+    selector = AdaptiveBackendSelector([backend], exploration_rate=0.0)
+    saved = video_corpus._corpus
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['VIDEO_CORPUS_DIR'] = directory
+        video_corpus._corpus = None
+        try:
+            assert len(selector.search('recursion', 'Python', 3)) == 3 and backend.calls == 1
+            local = selector.search('recursion', 'Python', 3)
+            assert backend.calls == 1 and {video.source for video in local} == {'corpus'}
+            selector.search('iterators', 'Python', 3)
+            assert backend.calls == 2
+        finally:
+            del os.environ['VIDEO_CORPUS_DIR']
+            video_corpus._corpus = saved
+    print("✅ Corpus-first search OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing local video corpus...")
+    print("=" * 50)
+    test_index_survives_rebuild_and_reopen()
+    test_queries_do_not_wait_for_rebuilds()
+    test_processes_sharing_a_directory_stay_consistent()
+    test_selector_queries_corpus_first()
+    print("=" * 50)
+    print("🎉 All video corpus tests passed!")
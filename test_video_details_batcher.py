@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test that concurrent topic searches share videos().list calls (no network)
+"""
+import sys
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator.youtube_hybrid_fetcher import VideoDetailsBatcher
+from src.course_path_generator import pipeline
+
+
+def test_concurrent_lookups_are_batched():
+    """Ten topics with five ids each resolve in a single 50-id call"""
+
+    print("🔍 Testing videos().list batching...")
+    calls = []
+    lock = threading.Lock()
+
+    def fake_videos_list(video_ids):
+        with lock:
+            calls.append(list(video_ids))
+        return {video_id: {'id': video_id} for video_id in video_ids}
+
+    batcher = VideoDetailsBatcher(fake_videos_list, window_seconds=0.5)
+    topic_ids = [[f't{topic}v{video}' for video in range(5)] for topic in range(10)]
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(executor.map(batcher.get, topic_ids))
+
+    assert len(calls) == 1 and len(calls[0]) == 50, [len(call) for call in calls]
+    for ids, result in zip(topic_ids, results):
+        assert sorted(result) == sorted(ids)
+    print(f"✅ {len(topic_ids)} topic lookups served by {len(calls)} call")
+
+
+def test_batches_split_at_fifty_and_dedupe():
+    """Shared ids are requested once and no call exceeds 50 ids"""
+
+    print("🔍 Testing batch limits...")
+    calls = []
+
+    def fake_videos_list(video_ids):
+        calls.append(list(video_ids))
+        return {video_id: {'id': video_id} for video_id in video_ids}
+
+    batcher = VideoDetailsBatcher(fake_videos_list, window_seconds=0.3)
+    requests = [['shared'] + [f't{topic}v{video}' for video in range(9)] for topic in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(batcher.get, requests))
+
+    assert all(len(call) <= 50 for call in calls) and len(calls) == 2, [len(call) for call in calls]
+    assert sum(call.count('shared') for call in calls) == len(calls)
+    assert all('shared' in result for result in results)
+    print(f"✅ Calls of {[len(call) for call in calls]} ids")
+
+
+def test_errors_fan_out():
+    """An API error reaches every waiting caller"""
+
+    print("🔍 Testing error fan-out...")
+
+    def failing_videos_list(video_ids):
+        raise RuntimeError("quotaExceeded")
+
+    batcher = VideoDetailsBatcher(failing_videos_list, window_seconds=0.05)
+    try:
+        batcher.get(['a'])
+        assert False, "expected the error to propagate"
+    except RuntimeError as e:
+        assert 'quotaExceeded' in str(e)
+    print("✅ Error fan-out OK")
+
+
+def test_course_searches_share_calls():
+    """With the Data API configured, the course pipeline searches topics side by side and their lookups batch"""
+
+    print("🔍 Testing batching in the course pipeline...")
+    calls = []
+    lock = threading.Lock()
+
+    def fake_videos_list(video_ids):
+        with lock:
+            calls.append(list(video_ids))
+        return {video_id: {'id': video_id} for video_id in video_ids}
+
+    batcher = VideoDetailsBatcher(fake_videos_list, window_seconds=0.2)
+
+    def api_search(topic, subject, max_results):
+        details = batcher.get([f'{topic}-{video}' for video in range(max_results)])
+        return [{'id': video_id} for video_id in details]
+
+    saved = {name: os.environ.get(name) for name in ('YOUTUBE_API_KEY', 'PIPELINE_SEARCH_WORKERS')}
+    os.environ['YOUTUBE_API_KEY'] = 'key'
+    os.environ.pop('PIPELINE_SEARCH_WORKERS', None)
+    try:
+        workers = pipeline.get_search_workers()
+        stages = [pipeline.Stage('search', pipeline.search_stage, workers=workers)]
+        context = pipeline.PipelineContext('Python', 'beginner', search=api_search)
+        works = [pipeline.TopicWork(i, f'topic{i}') for i in range(1, 9)]
+        done = list(pipeline.CoursePipeline(stages).run(works, context))
+        del os.environ['YOUTUBE_API_KEY']
+        assert pipeline.get_search_workers() == 1
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    assert workers == pipeline.DATA_API_SEARCH_WORKERS
+    assert [work.name for work in done] == [f'topic{i}' for i in range(1, 9)]
+    assert all(work.videos for work in done)
+    assert len(calls) <= 8 // workers, [len(call) for call in calls]
+    print(f"✅ {len(done)} topic searches served by {len(calls)} calls")
+
+
+if __name__ == "__main__":
+    test_concurrent_lookups_are_batched()
+    test_batches_split_at_fifty_and_dedupe()
+    test_errors_fan_out()
+    test_course_searches_share_calls()
+    print("\n🎉 Video details batcher tests passed!")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test the canonical Video / TopicCandidates records (no network)
+"""
+import sys
+import os
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator.video_record import Video, TopicCandidates, normalize_video
+
+
+def test_simple_fetcher_shape_is_normalized():
+    """duration_string, missing like_count and placeholders become typed fields"""
+
+    print("🔍 Testing simple fetcher normalization...")
+    video = Video.from_raw({
+        'id': 'abc', 'title': 'No Title', 'duration_string': '12:30', 'view_count': '1200',
+        'description': 'No description available', 'uploader': 'Corey', 'subtitles': {},
+    }, 'simple')
+    assert video.video_id == 'abc' and video.url == 'https://www.youtube.com/watch?v=abc'
+    assert video.duration == 750 and video.view_count == 1200 and video.like_count == 0
+    assert video.title == '' and video.description == '' and video.subtitles == ''
+    assert video.channel == 'Corey' and video.source == 'simple'
+    assert Video.from_raw(video, 'other') is video
+    print("✅ Simple fetcher normalization OK")
+
+
+def test_records_are_slotted_and_interned():
+    """No per-instance __dict__, and repeated channel names share one string"""
+
+    print("🔍 Testing slots and interning...")
+    channel = ''.join(['freeCode', 'Camp'])
+    first = normalize_video({'id': 'a', 'channel': channel}, 'basic')
+    second = normalize_video({'id': 'b', 'channel': ''.join(['freeCode', 'Camp'])}, 'basic')
+    assert not hasattr(first, '__dict__')
+    assert first.channel is second.channel
+    print("✅ Slots and interning OK")
+
+
+def test_prompt_block_and_dict_access():
+    """Prompt formatting needs no defaults; old dict-style callers still work"""
+
+    print("🔍 Testing prompt block and item access...")
+    video = normalize_video({'id': 'xyz', 'title': 'Loops', 'view_count': 1234567, 'duration': 600}, 'enhanced')
+    block = video.prompt_block(2)
+    assert 'Video 2:' in block and 'Views: 1,234,567' in block and 'Likes: 0' in block
+    assert 'Channel: N/A' in block
+    assert video['title'] == 'Loops' and video.get('subtitle_cues') is None
+    assert video.get('subtitle_cues', []) == [] and 'subtitle_cues' not in video
+    try:
+        video['missing']
+        assert False, "unknown keys should raise KeyError"
+    except KeyError:
+        pass
+    assert video.to_dict()['video_id'] == 'xyz' and 'subtitle_cues' not in video.to_dict()
+
+    topic = TopicCandidates('loops', [video])
+    assert topic.video_count == 1 and topic['videos'][0] is video and topic['topic_name'] == 'loops'
+    assert TopicCandidates('empty').video_count == 0
+    print("✅ Prompt block and item access OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing video records...")
+    print("=" * 50)
+    test_simple_fetcher_shape_is_normalized()
+    test_records_are_slotted_and_interned()
+    test_prompt_block_and_dict_access()
+    print("=" * 50)
+    print("🎉 All video record tests passed!")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test per-course video deduplication with stubbed fetchers (no network)
+"""
+import sys
+import os
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator import ytdlp_rate_controller, youtube_fetcher_enhanced
+from src.course_path_generator.video_record import normalize_video
+from src.course_path_generator.video_registry import (
+    CourseVideoRegistry, current_video_registry, video_registry_scope, prompt_blocks
+)
+from src.course_path_generator.video_search_backends import VideoSearchBackend
+
+
+class FakeBackend(VideoSearchBackend):
+    name = 'fake'
+
+    def _search(self, topic, subject, max_results):
+        return [{'id': 'shared', 'title': 'Python full course', 'description': 'long ' * 200},
+                {'id': topic, 'title': topic}]
+
+
+def test_registry_shares_records_between_topics():
+    """The same video id found for two topics is one record, described in full once"""
+
+    print("🔍 Testing shared records and compact prompts...")
+    backend = FakeBackend()
+    with video_registry_scope() as registry:
+        first = backend.search('loops')
+        second = backend.search('functions')
+        assert first[0] is second[0]
+        assert registry.stats['registered'] == 3
+
+        full = prompt_blocks(first, 'loops')
+        compact = prompt_blocks(second, 'functions')
+        assert 'Description: long' in full[0]
+        assert 'also a candidate for "loops"' in compact[0] and 'Description' not in compact[0]
+        assert 'Description: N/A' in compact[1]
+        assert registry.stats['compactPrompts'] == 1
+    assert current_video_registry() is None
+    print("✅ Shared records OK")
+
+
+def test_richer_record_wins():
+    """A later record carrying a transcript replaces a flat one"""
+
+    print("🔍 Testing record upgrade...")
+    registry = CourseVideoRegistry()
+    flat = registry.register(normalize_video({'id': 'v1'}, 'basic'))
+    full = normalize_video({'id': 'v1', 'subtitle_cues': [(0, 1000, 'hi')]}, 'enhanced')
+    assert registry.register(full) is full and registry.get('v1') is full
+    assert registry.register(flat) is full
+
+    # An unextracted search candidate gives way to any extracted record
+    candidate = registry.register(normalize_video({'id': 'v2', 'flat': True}, 'enhanced'))
+    extracted = normalize_video({'id': 'v2', 'title': 'Loops'}, 'basic')
+    assert registry.register(extracted) is extracted and registry.register(candidate) is extracted
+    print("✅ Record upgrade OK")
+
+
+def test_full_records_are_bounded():
+    """Only the most recently used full records are kept; older ids are still counted once"""
+
+    print("🔍 Testing bounded registry...")
+    registry = CourseVideoRegistry(max_videos=3)
+    videos = [registry.register(normalize_video({'id': f'v{i}', 'description': 'long ' * 200}, 'x'))
+              for i in range(3)]
+    assert registry.get('v0') is videos[0]
+    registry.register(normalize_video({'id': 'v3'}, 'x'))
+    assert list(registry.videos) == ['v2', 'v0', 'v3'] and registry.get('v1') is None
+    registry.register(normalize_video({'id': 'v1'}, 'x'))
+    assert registry.stats['registered'] == 4 and registry.stats['evicted'] == 2
+    print("✅ Bounded registry OK")
+
+
+def test_max_topics_per_video():
+    """An overused video is dropped from the candidates unless nothing else is left"""
+
+    print("🔍 Testing max topics per video...")
+    registry = CourseVideoRegistry(max_topics_per_video=1)
+    popular, other = normalize_video({'id': 'pop'}, 'x'), normalize_video({'id': 'other'}, 'x')
+    registry.record_selection({'selectedVideo': {'videoNumber': 1}}, [popular, other], 'loops')
+    assert registry.filter_overused([popular, other]) == [other]
+    assert registry.filter_overused([popular]) == [popular]
+    assert CourseVideoRegistry(max_topics_per_video=0).filter_overused([popular]) == [popular]
+    print("✅ Max topics per video OK")
+
+
+def test_enhanced_search_skips_known_videos():
+    """A shortlisted video already in the registry is not extracted again"""
+
+    print("🔍 Testing extraction skip...")
+    extracted = []
+
+    def fake_extract(ydl_opts, url):
+        if url.startswith('ytsearch'):
+            return {'entries': [{'id': 'known', 'title': 'Closures explained', 'duration': 900},
+                                {'id': 'new', 'title': 'Closures tutorial', 'duration': 900}]}
+        extracted.append(url)
+        return {'id': url.rsplit('=', 1)[1], 'title': 'full', 'duration': 900}
+
+    saved = (youtube_fetcher_enhanced.extract_info_checked, ytdlp_rate_controller._controller)
+    youtube_fetcher_enhanced.extract_info_checked = fake_extract
+    ytdlp_rate_controller._controller = ytdlp_rate_controller.AdaptiveRateController(
+        initial_rate=100.0, max_rate=100.0, max_workers=2)
+    try:
+        with video_registry_scope() as registry:
+            known = registry.register(normalize_video({'id': 'known', 'title': 'from topic 1'}, 'enhanced'))
+            videos = youtube_fetcher_enhanced.search_youtube_videos_enhanced('closures', 'Python')
+    finally:
+        youtube_fetcher_enhanced.extract_info_checked, ytdlp_rate_controller._controller = saved
+
+    assert extracted == ['https://www.youtube.com/watch?v=new']
+    assert known in videos and registry.stats['reused'] == 1
+    print("✅ Extraction skip OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing course video registry...")
+    print("=" * 50)
+    test_registry_shares_records_between_topics()
+    test_richer_record_wins()
+    test_full_records_are_bounded()
+    test_max_topics_per_video()
+    test_enhanced_search_skips_known_videos()
+    print("=" * 50)
+    print("🎉 All video registry tests passed!")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test the unified search backends and the adaptive selector with fake backends (no network)
+"""
+import sys
+import os
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator.video_search_backends import (
+    VideoSearchBackend, AdaptiveBackendSelector, normalize_video
+)
+
+
+class FakeBackend(VideoSearchBackend):
+    def __init__(self, name, latency, fail=False):
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+
+    def _search(self, topic, subject, max_results):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("HTTP Error 403")
+        return [{'id': f'{self.name}{i}', 'title': topic, 'duration': '4:13'} for i in range(max_results)]
+
+
+def test_normalize_video():
+    """Different fetcher shapes end up identical"""
+
+    print("🔍 Testing video normalization...")
+    simple = normalize_video({'video_id': 'abc', 'title': 'T', 'duration': '1:02:03', 'subtitles': {}}, 'simple')
+    assert simple['url'] == 'https://www.youtube.com/watch?v=abc'
+    assert simple['duration'] == 3723 and simple['like_count'] == 0 and simple['subtitles'] == ''
+    assert simple['source'] == 'simple'
+    print("✅ Normalization OK")
+
+
+def test_selector_failover_and_preference():
+    """Broken backends are failed over and the fastest healthy one is preferred"""
+
+    print("🔍 Testing selector failover...")
+    broken = FakeBackend('broken', 0.0, fail=True)
+    slow = FakeBackend('slow', 0.0)
+    fast = FakeBackend('fast', 0.0)
+    selector = AdaptiveBackendSelector([broken, slow, fast], exploration_rate=0.0, min_samples=2)
+
+    videos = selector.search('loops', 'Python', max_results=3)
+    assert len(videos) == 3 and videos[0]['video_id'] == 'slow0'
+    assert broken.calls == 1 and slow.calls == 1
+
+    # Feed latency history: 'fast' is quicker than 'slow', 'broken' keeps failing
+    for _ in range(3):
+        selector.record('broken', False, 0.1)
+        selector.record('slow', True, 5.0)
+        selector.record('fast', True, 0.5)
+    ranked = [backend.name for backend in selector.ranked_backends()]
+    assert ranked == ['fast', 'slow', 'broken'], ranked
+
+    snapshot = selector.snapshot()
+    assert snapshot['broken']['successRate'] == 0.0
+    assert snapshot['fast']['p50Seconds'] == 0.5
+    print("✅ Selector OK")
+
+
+def test_selector_exploration():
+    """With exploration enabled, non-preferred backends still get traffic"""
+
+    print("🔍 Testing selector exploration...")
+    first, second = FakeBackend('first', 0.0), FakeBackend('second', 0.0)
+    selector = AdaptiveBackendSelector([first, second], exploration_rate=0.5)
+    for _ in range(200):
+        selector.search('topic', max_results=1)
+    assert second.calls > 20, second.calls
+    print(f"✅ Exploration sent {second.calls}/200 searches to the second backend")
+
+
+if __name__ == "__main__":
+    test_normalize_video()
+    test_selector_failover_and_preference()
+    test_selector_exploration()
+    print("\n🎉 Search backend tests passed!")
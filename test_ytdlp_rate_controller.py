@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test the shared yt-dlp rate controller with fake requests (no network)
+"""
+import sys
+import os
+import time
+import threading
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(__file__))
+
+from src.course_path_generator.ytdlp_rate_controller import (
+    AdaptiveRateController, BlockSignalLogger, YtdlpBlockedError, chain, gather, is_block_signal
+)
+
+
+def test_aimd_rate_changes():
+    """Successes raise the rate additively, blocks cut it multiplicatively"""
+
+    print("🔍 Testing AIMD rate updates...")
+    controller = AdaptiveRateController(initial_rate=1.0, min_rate=0.1, max_rate=1.3,
+                                        increase_step=0.1, block_cooldown=(0.0, 0.0), max_workers=1)
+    controller.record_success()
+    assert abs(controller.rate - 1.1) < 1e-9
+    for _ in range(5):
+        controller.record_success()
+    assert abs(controller.rate - 1.3) < 1e-9
+    controller.record_block()
+    assert abs(controller.rate - 0.65) < 1e-9
+    for _ in range(10):
+        controller.record_block()
+    assert controller.rate == 0.1
+    print("✅ AIMD OK")
+
+
+def test_requests_are_paced():
+    """Request starts are spaced by 1 / rate"""
+
+    print("🔍 Testing pacing...")
+    controller = AdaptiveRateController(initial_rate=20.0, max_rate=20.0, max_workers=4)
+    futures = [controller.submit(time.monotonic) for _ in range(5)]
+    starts = sorted(future.result(timeout=5) for future in futures)
+    gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+    assert min(gaps) > 0.04, gaps
+    print("✅ Pacing OK")
+
+
+def test_retry_does_not_hold_a_worker():
+    """While a retry waits, the only worker keeps serving other requests"""
+
+    print("🔍 Testing delayed retries...")
+    controller = AdaptiveRateController(initial_rate=50.0, max_rate=50.0, max_workers=1)
+    calls = []
+
+    def flaky():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RuntimeError("connection reset")
+        return ['video']
+
+    retried = controller.submit_with_retries(flaky, max_attempts=2, retry_delay=(0.5, 0.5))
+    time.sleep(0.1)
+    quick = controller.submit(lambda: 'quick')
+    assert quick.result(timeout=0.3) == 'quick'
+    assert not retried.done()
+    assert retried.result(timeout=5) == ['video']
+    assert calls[1] - calls[0] >= 0.45
+    assert controller.stats['retries'] == 1 and controller.stats['failures'] == 1
+    print("✅ Delayed retries OK")
+
+
+def test_block_backs_off_everyone():
+    """A block signal lowers the rate and delays the next request by the cooldown"""
+
+    print("🔍 Testing block backoff...")
+    controller = AdaptiveRateController(initial_rate=50.0, max_rate=50.0,
+                                        block_cooldown=(0.3, 0.3), max_workers=2)
+
+    def blocked():
+        raise YtdlpBlockedError("ERROR: Sign in to confirm you're not a bot")
+
+    failed = controller.submit(blocked)
+    try:
+        failed.result(timeout=5)
+        assert False, "blocked request should fail"
+    except YtdlpBlockedError:
+        pass
+    assert controller.rate == 25.0 and controller.stats['blocks'] == 1
+
+    start = time.monotonic()
+    controller.submit(lambda: None).result(timeout=5)
+    assert time.monotonic() - start >= 0.25
+    print("✅ Block backoff OK")
+
+
+def test_cancellation_drops_pending_attempts():
+    """Setting the cancel event stops scheduled retries from running"""
+
+    print("🔍 Testing cancellation...")
+    controller = AdaptiveRateController(initial_rate=50.0, max_rate=50.0, max_workers=1)
+    cancel_event = threading.Event()
+    calls = []
+
+    def always_empty():
+        calls.append(1)
+        raise RuntimeError("no entries")
+
+    future = controller.submit_with_retries(always_empty, max_attempts=3, retry_delay=(0.3, 0.3),
+                                            cancel_event=cancel_event)
+    time.sleep(0.1)
+    cancel_event.set()
+    time.sleep(0.5)
+    assert future.cancelled()
+    assert len(calls) == 1
+    print("✅ Cancellation OK")
+
+
+def test_chain_and_gather():
+    """Chained and gathered futures resolve without blocking threads"""
+
+    print("🔍 Testing chain/gather...")
+    controller = AdaptiveRateController(initial_rate=50.0, max_rate=50.0, max_workers=2)
+
+    def failing_detail():
+        raise ValueError("bad video")
+
+    entries = controller.submit(lambda: [1, 2, 3])
+    details = chain(entries, lambda values: gather(
+        [controller.submit(lambda value=value: value * 10) for value in values] + [controller.submit(failing_detail)]
+    ))
+    assert details.result(timeout=5) == [10, 20, 30, None]
+    assert gather([]).result(timeout=1) == []
+    print("✅ Chain/gather OK")
+
+
+def test_block_signal_logger():
+    """Errors swallowed by ignoreerrors are still recognised as blocks"""
+
+    print("🔍 Testing block signal detection...")
+    logger = BlockSignalLogger()
+    logger.warning("Falling back on generic information extractor")
+    logger.raise_if_blocked()
+    logger.error("ERROR: [youtube] abc: Sign in to confirm you're not a bot")
+    try:
+        logger.raise_if_blocked()
+        assert False, "block should raise"
+    except YtdlpBlockedError:
+        pass
+    assert is_block_signal("HTTP Error 429: Too Many Requests")
+    assert not is_block_signal("HTTP Error 404: Not Found")
+    print("✅ Block signal detection OK")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing yt-dlp rate controller...")
+    print("=" * 50)
+    test_aimd_rate_changes()
+    test_requests_are_paced()
+    test_retry_does_not_hold_a_worker()
+    test_block_backs_off_everyone()
+    test_cancellation_drops_pending_attempts()
+    test_chain_and_gather()
+    test_block_signal_logger()
+    print("=" * 50)
+    print("🎉 All rate controller tests passed!")